@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import shutil
 import sys  # Add this at the top
 
 # Update BASE_DIR calculation (in backend/backend/settings.py)
@@ -84,16 +85,73 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'database', 'windrush.db'),  # Verify this line
+        # A file rather than the in-memory default, so tests see WAL and real
+        # lock contention between threads
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'database', 'test_windrush.db')},
     }
 }
 
+# The committed snapshot seeds the working database on first run. The working
+# file is git-ignored, so WAL mode and new submissions never dirty the tree.
+DATABASE_SEED = os.path.join(BASE_DIR, 'database', 'windrush.seed.db')
+if not os.path.exists(DATABASES['default']['NAME']) and os.path.exists(DATABASE_SEED):
+    shutil.copyfile(DATABASE_SEED, DATABASES['default']['NAME'])
+
+# Applied to every SQLite connection (evaluations.signals.apply_sqlite_profile).
+# WAL lets dashboard reads run alongside form writes; busy_timeout makes a
+# writer wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',   # Safe with WAL: a power cut can only lose the last commits
+    'busy_timeout': 10000,     # Milliseconds
+    'cache_size': -32000,      # Negative means KiB, so ~32 MB of page cache
+    'mmap_size': 268435456,    # 256 MB of memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+# In-process LRU in front of a SQLite file kept apart from the submissions
+# database; counters are shown at /admin/cache-stats/
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'my_cache_table',
+        'BACKEND': 'evaluations.utils.tiered_cache.TieredCache',
+        'LOCATION': os.path.join(BASE_DIR, 'database', 'cache.db'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L1_MAX_BYTES': 16 * 1024 * 1024,
+            'L1_TTL': 5,       # Seconds another process's write can go unseen
+            'MAX_BYTES': 256 * 1024 * 1024,
+        },
     }
 }
 
+# Submission ingestion: 'direct' writes each form in the request, 'spool'
+# appends it to EVALUATION_SPOOL_PATH for `manage.py drain_submissions`
+EVALUATION_INGEST_MODE = 'direct'
+EVALUATION_SPOOL_PATH = os.path.join(BASE_DIR, 'database', 'spool.db')
+
+# Threads the async views use for ORM work (one SQLite connection each)
+EVALUATION_DB_WORKERS = 4
+
+# Offline kiosks upload queued forms to /api/submissions/ in batches; a
+# batch of a few thousand forms is several megabytes of JSON
+EVALUATION_BULK_MAX_SUBMISSIONS = 5000
+DATA_UPLOAD_MAX_MEMORY_SIZE = 32 * 1024 * 1024
+
+# Where the dashboard's aggregate queries run: 'orm' through Django on
+# SQLite, 'duckdb' in an embedded DuckDB attached read-only to the database
+# (needs `pip install duckdb`; its sqlite extension is downloaded on first
+# use unless EVALUATION_DUCKDB_SQLITE_EXTENSION is the path to a local copy)
+EVALUATION_ANALYTICS_ENGINE = 'orm'
+EVALUATION_DUCKDB_SQLITE_EXTENSION = None
+
+# Offline postcode geocoder for the dashboard map, built from the ONS
+# Postcode Directory by `manage.py build_postcode_index`
+EVALUATION_POSTCODE_INDEX = os.path.join(BASE_DIR, 'database', 'postcodes')
+
+# Dashboard maps show participants summed into grid cells; cells (and
+# demographic slices of a cell) with fewer participants are not shown
+EVALUATION_MAP_MIN_COUNT = 5
+
 
 
 # settings.py
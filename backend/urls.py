@@ -18,7 +18,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from evaluations import views
-from evaluations.views import home_view, evaluation_form, download_pdf
+from evaluations.admin import cache_stats_view
+from evaluations.views import home_view, evaluation_form, download_pdf, validate_field, validate_page, form_schema, submit_batch
 
 urlpatterns = [
     path('admin/', admin.site.urls),  # Admin site
@@ -32,9 +33,14 @@ urlpatterns = [
 ]
 
 urlpatterns = [
+    path('admin/cache-stats/', admin.site.admin_view(cache_stats_view), name='cache_stats'),
     path('admin/', admin.site.urls),
     path('', evaluation_form, name='evaluation_form'),
+    path('api/submissions/', submit_batch, name='submit_batch'),
     path('download-pdf/<str:session_key>/', download_pdf, name='download_pdf'),
+    path('api/validate-field/', validate_field, name='validate_field'),
+    path('api/validate-page/', validate_page, name='validate_page'),
+    path('form-schema/<str:schema_hash>.json', form_schema, name='form_schema'),
 ]
 
 
@@ -0,0 +1,79 @@
+# benchmarks/bench_analytics.py
+"""The dashboard's aggregate queries on the ORM and on DuckDB.
+
+Fills a scratch SQLite file like bench_snapshot.py, rebuilds the daily
+answer counts and the demographic cube, stores a position for each of its
+postcodes, then times each analytics query on
+both engines over the whole range (best of --repeat runs):
+
+    python benchmarks/bench_analytics.py
+    python benchmarks/bench_analytics.py --responses 100000 1000000 --duckdb-extension /path/to/sqlite_scanner.duckdb_extension
+"""
+import argparse
+import datetime
+
+from common import Timer, print_table, scratch_database, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from bench_snapshot import DAYS, START, fill  # noqa: E402
+from evaluations.models import Question, GeocodedPostcode  # noqa: E402
+from evaluations.utils import cube, rollup  # noqa: E402
+from evaluations.utils.analytics import DuckDBEngine, OrmEngine  # noqa: E402
+
+
+def queries(question_id, start, end):
+    return {
+        'answer_totals': lambda engine: engine.answer_totals(question_id, start, end),
+        'daily_totals': lambda engine: engine.daily_totals(question_id, start, end),
+        'cube_cells': lambda engine: engine.cube_cells(start, end),
+        'completion': lambda engine: engine.completion(start, end),
+        'answer_counts': lambda engine: engine.answer_counts(question_id, start, end),
+        'map_cells': lambda engine: engine.map_cells(start, end),
+    }
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            func()
+        times.append(timer.elapsed)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--responses', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--duckdb-extension', default=settings.EVALUATION_DUCKDB_SQLITE_EXTENSION)
+    args = parser.parse_args()
+
+    start, end = START.date(), (START + datetime.timedelta(days=DAYS)).date()
+    rows = []
+    for responses in args.responses:
+        with scratch_database() as path:
+            fill(responses)
+            rollup.rebuild()
+            cube.rebuild()
+            GeocodedPostcode.objects.bulk_create([
+                GeocodedPostcode(postcode=f'SW{n}1AA', lat=51.4 + n / 100, lon=-0.1, precision='postcode',
+                                 source='benchmark')
+                for n in range(20)
+            ])
+            orm, duck = OrmEngine(), DuckDBEngine(path, extension=args.duckdb_extension)
+            question_id = Question.objects.order_by('id').values_list('id', flat=True).first()
+            for name, query in queries(question_id, start, end).items():
+                assert query(orm) == query(duck), name
+                orm_ms = best_of(args.repeat, lambda: query(orm)) * 1000
+                duck_ms = best_of(args.repeat, lambda: query(duck)) * 1000
+                rows.append((f'{responses:,}', name, f'{orm_ms:.1f}', f'{duck_ms:.1f}', f'{orm_ms / duck_ms:.1f}x'))
+
+    print(f"{DAYS}-day range, best of {args.repeat}")
+    print_table(('responses', 'query', 'ORM ms', 'DuckDB ms', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_asgi.py
+"""Throughput and latency of the evaluation views under WSGI and ASGI.
+
+Both deployments get the same load: every kiosk loads the form and then
+submits it, `--per-kiosk` times. The WSGI side models a threaded worker
+(`--wsgi-threads` request threads, like gunicorn --threads); the ASGI side
+runs every kiosk as a task on one event loop, with ORM work on the views'
+bounded executor (settings.EVALUATION_DB_WORKERS).
+
+    python benchmarks/bench_asgi.py
+    python benchmarks/bench_asgi.py --kiosks 10 50 200 --wsgi-threads 8
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from common import Timer, print_table, scratch_database, setup_django
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+
+from evaluations.models import Question  # noqa: E402
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+
+def run_wsgi(kiosks, per_kiosk, form, threads):
+    workers = threading.Semaphore(threads)
+    latencies, errors = [], []
+    barrier = threading.Barrier(kiosks + 1)
+
+    def kiosk():
+        client = Client()
+        barrier.wait()
+        for _ in range(per_kiosk):
+            for method, data in (('get', None), ('post', form)):
+                start = time.perf_counter()
+                # A request queues until one of the worker threads is free
+                with workers:
+                    response = getattr(client, method)('/', data)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+        connection.close()
+
+    pool = [threading.Thread(target=kiosk) for _ in range(kiosks)]
+    for t in pool:
+        t.start()
+    with Timer() as timer:
+        barrier.wait()
+        for t in pool:
+            t.join()
+    return len(latencies) / timer.elapsed, latencies, errors
+
+
+def run_asgi(kiosks, per_kiosk, form):
+    latencies, errors = [], []
+
+    async def kiosk():
+        client = AsyncClient()
+        for _ in range(per_kiosk):
+            for method, data in (('get', None), ('post', form)):
+                start = time.perf_counter()
+                response = await getattr(client, method)('/', data)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+    async def all_kiosks():
+        await asyncio.gather(*(kiosk() for _ in range(kiosks)))
+
+    with Timer() as timer:
+        asyncio.run(all_kiosks())
+    return len(latencies) / timer.elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kiosks', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--per-kiosk', type=int, default=3)
+    parser.add_argument('--questions', type=int, default=30)
+    parser.add_argument('--wsgi-threads', type=int, default=8)
+    args = parser.parse_args()
+
+    rows = []
+    with scratch_database():
+        questions = Question.objects.bulk_create([
+            Question(text=f"Question {i}", question_type='TX', section='post_event')
+            for i in range(args.questions)
+        ])
+        form = {'gender': 'F', 'ethnicity': 'C', 'age': '25-34'}
+        form.update({f'q_{q.id}': f"answer to {q.id}" for q in questions})
+
+        for kiosks in args.kiosks:
+            for name, result in (
+                ('wsgi', run_wsgi(kiosks, args.per_kiosk, form, args.wsgi_threads)),
+                ('asgi', run_asgi(kiosks, args.per_kiosk, form)),
+            ):
+                throughput, latencies, errors = result
+                rows.append((
+                    kiosks, name, f'{throughput:.1f}',
+                    f'{statistics.median(latencies) * 1000:.0f}',
+                    f'{percentile(latencies, 95) * 1000:.0f}',
+                    len(errors),
+                ))
+
+    print(f"{args.questions}-question form, {args.per_kiosk} GET+POST pairs per kiosk, "
+          f"{args.wsgi_threads} WSGI threads")
+    print_table(('kiosks', 'server', 'req/s', 'p50 ms', 'p95 ms', 'errors'), rows)
+
+
+if __name__ == '__main__':
+    main()
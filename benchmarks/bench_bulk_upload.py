@@ -0,0 +1,68 @@
+# benchmarks/bench_bulk_upload.py
+"""Time for an offline kiosk to upload its queue: one POST per form vs /api/submissions/.
+
+Requests go through the Django test client (the full view stack, no
+network) against a scratch SQLite file:
+
+    python benchmarks/bench_bulk_upload.py
+    python benchmarks/bench_bulk_upload.py --queued 1000 5000 --batch-size 1000
+"""
+import argparse
+import json
+import uuid
+
+from common import Timer, print_table, scratch_database, setup_django
+
+setup_django()
+
+from django.test import Client  # noqa: E402
+
+from evaluations.models import Question  # noqa: E402
+
+
+def one_by_one(client, forms):
+    for form in forms:
+        client.post('/', form['fields'])
+
+
+def batched(client, forms, batch_size):
+    for start in range(0, len(forms), batch_size):
+        body = json.dumps({'submissions': forms[start:start + batch_size]})
+        response = client.post('/api/submissions/', body, content_type='application/json')
+        assert response.json()['created'] == len(forms[start:start + batch_size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queued', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--questions', type=int, default=30)
+    args = parser.parse_args()
+
+    rows = []
+    with scratch_database():
+        questions = Question.objects.bulk_create([
+            Question(text=f"Question {i}", question_type='TX', section='post_event')
+            for i in range(args.questions)
+        ])
+        fields = {'gender': 'F', 'ethnicity': 'C', 'age': '25-34'}
+        fields.update({f'q_{q.id}': f"answer to {q.id}" for q in questions})
+        client = Client()
+
+        for queued in args.queued:
+            forms = [{'submission_key': uuid.uuid4().hex, 'fields': fields} for _ in range(queued)]
+            # The per-form path is slow enough that the largest queues are extrapolated
+            sample = forms[:min(queued, 500)]
+            with Timer() as before:
+                one_by_one(client, sample)
+            with Timer() as after:
+                batched(client, forms, args.batch_size)
+            estimate = before.elapsed * queued / len(sample)
+            rows.append((queued, f'{estimate:.2f}', f'{after.elapsed:.2f}', f'{estimate / after.elapsed:.0f}x'))
+
+    print(f"{args.questions}-question form, batches of {args.batch_size}")
+    print_table(('queued', 'one POST each (s)', 'batched (s)', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
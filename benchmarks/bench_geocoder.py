@@ -0,0 +1,90 @@
+# benchmarks/bench_geocoder.py
+"""Building and querying the offline postcode index.
+
+Writes a synthetic postcode directory of N postcodes (ONSPD has about 2.7
+million, live and terminated), builds the index from it, then times opening
+the index and geocoding a column of participant postcodes: full postcodes
+in the directory, unknown ones, bare districts and junk.
+
+    python benchmarks/bench_geocoder.py
+    python benchmarks/bench_geocoder.py --postcodes 2700000 --lookups 3000 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import string
+import tempfile
+from io import StringIO
+
+from common import Timer, print_table, setup_django
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+
+from evaluations.utils.geocoder import PostcodeGeocoder  # noqa: E402
+
+AREAS = ['AB', 'B', 'BS', 'CF', 'E', 'EH', 'G', 'L', 'LS', 'M', 'N', 'NW', 'SE', 'SW', 'W', 'WC']
+
+
+def random_postcode(rng):
+    outward = f"{rng.choice(AREAS)}{rng.randrange(1, 30)}{rng.choice(['', 'A'])}"
+    return f"{outward} {rng.randrange(10)}{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}"
+
+
+def write_directory(path, count, rng):
+    postcodes = set()
+    while len(postcodes) < count:
+        postcodes.add(random_postcode(rng))
+    with open(path, 'w') as f:
+        f.write("pcds,lat,long\n")
+        for postcode in postcodes:
+            f.write(f"{postcode},{rng.uniform(50, 58):.6f},{rng.uniform(-5, 1.5):.6f}\n")
+    return sorted(postcodes)
+
+
+def participant_postcodes(known, count, rng):
+    """Mostly real postcodes, typed carelessly, with some partial and junk ones"""
+    kinds = [
+        lambda: rng.choice(known).lower().replace(' ', rng.choice(['', ' ', '  '])),
+        lambda: random_postcode(rng),
+        lambda: rng.choice(known).split()[0].lower(),
+        lambda: rng.choice(['London', 'n/a', '', '12345']),
+    ]
+    return [rng.choices(kinds, weights=[80, 10, 8, 2])[0]() for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--postcodes', type=int, default=1_700_000)
+    parser.add_argument('--lookups', type=int, nargs='+', default=[3000, 100_000])
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    tmpdir = tempfile.mkdtemp(prefix='windrush-bench-')
+    try:
+        source, index = os.path.join(tmpdir, 'directory.csv'), os.path.join(tmpdir, 'index')
+        known = write_directory(source, args.postcodes, rng)
+        with Timer() as build:
+            call_command('build_postcode_index', source, '--output', index, stdout=StringIO())
+
+        rows = []
+        for count in args.lookups:
+            postcodes = participant_postcodes(known, count, rng)
+            with Timer() as opened:
+                geocoder = PostcodeGeocoder(index)
+            with Timer() as looked_up:
+                lat, lon, level = geocoder.lookup(postcodes)
+            resolved = (level >= 0).mean() * 100
+            rows.append((f'{count:,}', f'{opened.elapsed * 1000:.1f}', f'{looked_up.elapsed * 1000:.1f}',
+                         f'{resolved:.1f}%'))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"Index of {args.postcodes:,} postcodes built in {build.elapsed:.1f}s")
+    print_table(('lookups', 'open ms', 'lookup ms', 'resolved'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_incremental.py
+"""Refresh cost of the dashboard's incrementally loaded response table.
+
+Fills a scratch SQLite file like bench_snapshot.py, loads every response
+into an IncrementalTable, then times a refresh with nothing new, one after
+NEW responses arrive, and one after a delete (a full reload):
+
+    python benchmarks/bench_incremental.py
+    python benchmarks/bench_incremental.py --responses 100000 1000000 --new 1000
+"""
+import argparse
+
+from common import Timer, print_table, scratch_database, setup_django
+
+setup_django()
+
+from django.db.models import Max  # noqa: E402
+
+from bench_snapshot import fill  # noqa: E402
+from evaluations.models import Response  # noqa: E402
+from evaluations.utils.incremental import IncrementalTable  # noqa: E402
+
+
+def add_responses(count):
+    latest = Response.objects.order_by('-id').first()
+    Response.objects.bulk_create([
+        Response(participant_id=latest.participant_id, question_id=latest.question_id,
+                 answer="Yes", created_at=latest.created_at)
+        for _ in range(count)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--responses', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--new', type=int, default=1000)
+    args = parser.parse_args()
+
+    rows = []
+    for responses in args.responses:
+        with scratch_database():
+            fill(responses)
+            table = IncrementalTable(Response)
+            with Timer() as first:
+                table.refresh()
+            with Timer() as unchanged:
+                table.refresh()
+            add_responses(args.new)
+            with Timer() as appended:
+                table.refresh()
+            Response.objects.filter(id=Response.objects.aggregate(first=Max('id'))['first'] - args.new).delete()
+            with Timer() as reloaded:
+                table.refresh()
+            rows.append((f'{responses:,}', f'{first.elapsed:.2f}', f'{unchanged.elapsed * 1000:.1f}',
+                         f'{appended.elapsed * 1000:.1f}', f'{reloaded.elapsed:.2f}'))
+
+    print(f"Refresh after {args.new:,} new responses; reload after deleting one")
+    print_table(('responses', 'first load s', 'unchanged ms', 'appended ms', 'reload s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_snapshot.py
+"""Latency and memory of the dashboard snapshot against plain ORM DataFrames.
+
+Fills a scratch SQLite file with N responses (ten per participant, one
+session each, spread over 90 days), then loads the whole range both ways:
+
+    python benchmarks/bench_snapshot.py
+    python benchmarks/bench_snapshot.py --responses 10000 100000 1000000
+"""
+import argparse
+import datetime
+import json
+import random
+
+from common import Timer, print_table, scratch_database, setup_django
+
+setup_django()
+
+import pandas as pd  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from evaluations.models import Question, Response, Participant, EvaluationSession  # noqa: E402
+from evaluations.utils.snapshot import load_snapshot  # noqa: E402
+
+ANSWERS_PER_PARTICIPANT = 10
+DAYS = 90
+START = datetime.datetime(2025, 1, 1)
+
+
+def fill(responses):
+    """Insert participants, sessions and responses with plain executemany"""
+    questions = Question.objects.bulk_create([
+        Question(text=f"Question {i}", question_type='SC', section='post_event') for i in range(ANSWERS_PER_PARTICIPANT)
+    ])
+    answers = [json.dumps(a) for a in ("Yes", "No", 3, 5, ["Talks", "Music"], "Longer breaks please")]
+    rng = random.Random(1)
+    participants = responses // ANSWERS_PER_PARTICIPANT
+    stamps = [(START + datetime.timedelta(seconds=rng.randrange(DAYS * 86400))).isoformat(' ')
+              for _ in range(participants)]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {Participant._meta.db_table} (id, session_key, gender, age, ethnicity, country, postcode, '
+            'accessibility_needs, referral_source, mailing_list_optin, books_requested, created_at) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 0, 0, %s)',
+            [(i + 1, f'kiosk-{i % 50}', rng.choice('MF'), rng.choice(['18-24', '25-34', '45-54']),
+              rng.choice(['C', 'AA', 'W']), 'England', f'SW{i % 20} 1AA', 'No accessibility needs',
+              rng.choice(['email', 'radio', '']), stamps[i]) for i in range(participants)]
+        )
+        cursor.executemany(
+            f'INSERT INTO {EvaluationSession._meta.db_table} (participant_id, completed, started_at, completed_at) '
+            'VALUES (%s, 1, %s, %s)',
+            [(i + 1, stamps[i], stamps[i]) for i in range(participants)]
+        )
+        cursor.executemany(
+            f'INSERT INTO {Response._meta.db_table} (participant_id, question_id, answer, created_at) '
+            'VALUES (%s, %s, %s, %s)',
+            [(i // ANSWERS_PER_PARTICIPANT + 1, questions[i % ANSWERS_PER_PARTICIPANT].id, rng.choice(answers),
+              stamps[i // ANSWERS_PER_PARTICIPANT]) for i in range(participants * ANSWERS_PER_PARTICIPANT)]
+        )
+
+
+def orm_frames(start, end):
+    """What the widgets did before: ORM rows into object-dtype DataFrames"""
+    return [
+        pd.DataFrame(list(Participant.objects.filter(created_at__date__gte=start, created_at__date__lte=end).values())),
+        pd.DataFrame(list(Response.objects.filter(created_at__date__gte=start, created_at__date__lte=end)
+                          .values('question', 'answer', 'participant', 'created_at'))),
+        pd.DataFrame(list(EvaluationSession.objects.filter(completed_at__date__gte=start,
+                                                           completed_at__date__lte=end).values())),
+    ]
+
+
+def megabytes(frames):
+    return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames) / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--responses', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    start, end = START.date(), (START + datetime.timedelta(days=DAYS)).date()
+    rows = []
+    for responses in args.responses:
+        with scratch_database():
+            fill(responses)
+            with Timer() as before:
+                frames = orm_frames(start, end)
+            before_mb = megabytes(frames)
+            del frames
+            with Timer() as after:
+                snapshot = load_snapshot(start, end)
+            after_mb = snapshot.memory_usage() / 1024 / 1024
+            rows.append((f'{responses:,}', f'{before.elapsed:.2f}', f'{before_mb:.1f}',
+                         f'{after.elapsed:.2f}', f'{after_mb:.1f}', f'{before.elapsed / after.elapsed:.1f}x'))
+
+    print(f"{ANSWERS_PER_PARTICIPANT} responses per participant over {DAYS} days, whole range loaded")
+    print_table(('responses', 'ORM s', 'ORM MB', 'snapshot s', 'snapshot MB', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
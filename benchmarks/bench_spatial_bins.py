@@ -0,0 +1,57 @@
+# benchmarks/bench_spatial_bins.py
+"""Binning participant locations into map cells.
+
+Scatters N distinct participant locations (postcode and demographic slice)
+over Great Britain, clustered around a few cities, then times bin_points()
+at each dashboard "Map detail" zoom and reports how many points the map
+would send to the browser before and after binning:
+
+    python benchmarks/bench_spatial_bins.py
+    python benchmarks/bench_spatial_bins.py --points 10000 1000000 --min-count 5
+"""
+import argparse
+
+import numpy as np
+
+from common import Timer, print_table, setup_django
+
+setup_django()
+
+from evaluations.utils.spatial_bins import bin_points  # noqa: E402
+
+# (lat, lon) of the cities the points cluster around
+CITIES = [(51.51, -0.13), (52.48, -1.90), (53.48, -2.24), (53.80, -1.55), (55.86, -4.25), (51.45, -2.59)]
+ZOOMS = (5, 7, 9, 11)
+
+
+def points(count, seed=1):
+    rng = np.random.default_rng(seed)
+    centres = np.array(CITIES)[rng.integers(len(CITIES), size=count)]
+    spread = rng.exponential(0.15, size=(count, 1)) * rng.standard_normal((count, 2))
+    lat, lon = (centres + spread).T
+    return lat, lon, rng.integers(1, 4, size=count), rng.integers(8, size=count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--min-count', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.points:
+        lat, lon, counts, groups = points(count)
+        for zoom in ZOOMS:
+            with Timer() as plain:
+                cells = bin_points(lat, lon, counts, zoom, min_count=args.min_count)
+            with Timer() as grouped:
+                slices = bin_points(lat, lon, counts, zoom, groups=groups, min_count=args.min_count)
+            rows.append((f'{count:,}', zoom, f'{len(cells[2]):,}', f'{plain.elapsed * 1000:.1f}',
+                         f'{len(slices[2]):,}', f'{grouped.elapsed * 1000:.1f}'))
+
+    print(f"Cells under {args.min_count} participants dropped; grouped = 8 demographic groups per cell")
+    print_table(('points', 'zoom', 'cells', 'ms', 'grouped cells', 'grouped ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
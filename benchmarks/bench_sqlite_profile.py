@@ -0,0 +1,120 @@
+# benchmarks/bench_sqlite_profile.py
+"""Write/read contention on SQLite as each SQLITE_PRAGMAS setting is added.
+
+Kiosk threads submit forms while dashboard threads run the aggregate
+queries the widgets use, for a fixed time per profile. Each profile starts
+from Django's defaults and adds the settings one at a time, on a freshly
+migrated scratch database:
+
+    python benchmarks/bench_sqlite_profile.py
+    python benchmarks/bench_sqlite_profile.py --writers 20 --readers 4 --seconds 5
+"""
+import argparse
+import threading
+import time
+import uuid
+
+from common import print_table, scratch_database, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, OperationalError  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.db.models.functions import TruncDate  # noqa: E402
+
+from evaluations.models import Question, Response, Participant  # noqa: E402
+from evaluations.utils.submissions import save_submission  # noqa: E402
+
+# Django's defaults: rollback journal, full sync, sqlite3's 5 s busy handler
+BASELINE = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+STEPS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 10000),
+    ('mmap_size', 268435456),
+    ('cache_size', -32000),
+    ('temp_store', 'MEMORY'),
+]
+
+
+def profiles():
+    pragmas = dict(BASELINE)
+    yield 'defaults', dict(pragmas)
+    for name, value in STEPS:
+        pragmas[name] = value
+        yield f'+ {name}={value}', dict(pragmas)
+
+
+def dashboard_queries(question):
+    list(Participant.objects.annotate(date=TruncDate('created_at')).values('date').annotate(count=Count('id')))
+    list(Response.objects.filter(question=question).values('answer').annotate(count=Count('id')))
+    list(Participant.objects.values('gender', 'ethnicity').annotate(count=Count('id')))
+
+
+def run(pragmas, writers, readers, seconds, form, question):
+    settings.SQLITE_PRAGMAS = pragmas
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(work, counter):
+        while time.perf_counter() < deadline:
+            try:
+                work()
+                outcome = counter
+            except OperationalError:
+                outcome = 'locked'
+            with lock:
+                counts[outcome] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=loop, args=(lambda: save_submission(uuid.uuid4().hex, form), 'writes'))
+               for _ in range(writers)]
+    threads += [threading.Thread(target=loop, args=(lambda: dashboard_queries(question), 'reads'))
+                for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=20)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--seed-participants', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    for label, pragmas in profiles():
+        settings.SQLITE_PRAGMAS = pragmas
+        with scratch_database():
+            questions = Question.objects.bulk_create([
+                Question(text=f"Question {i}", question_type='SC', section='post_event', options=["Yes", "No"])
+                for i in range(30)
+            ])
+            form = {'gender': 'F', 'ethnicity': 'C', 'age': '25-34'}
+            form.update({f'q_{q.id}': "Yes" for q in questions})
+            for _ in range(args.seed_participants):
+                save_submission(uuid.uuid4().hex, form)
+            connection.close()
+
+            counts = run(pragmas, args.writers, args.readers, args.seconds, form, questions[0])
+            connection.close()
+        rows.append((
+            label,
+            f"{counts['writes'] / args.seconds:.1f}",
+            f"{counts['reads'] / args.seconds:.1f}",
+            counts['locked'],
+        ))
+
+    print(f"{args.writers} kiosk threads, {args.readers} dashboard threads, "
+          f"{args.seconds:g}s per profile, {args.seed_participants} seeded participants")
+    print_table(('profile', 'writes/s', 'reads/s', 'locked'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_submissions.py
+"""Submissions per second for the per-row and bulk evaluation_form write paths.
+
+Every kiosk is a thread with its own database connection, submitting a
+30-question form in a loop against a scratch SQLite file:
+
+    python benchmarks/bench_submissions.py
+    python benchmarks/bench_submissions.py --kiosks 10 50 200 --per-kiosk 5
+"""
+import argparse
+import json
+import threading
+import uuid
+
+from common import Timer, print_table, scratch_database, setup_django
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from evaluations.models import Question, Response, Participant, EvaluationSession  # noqa: E402
+from evaluations.utils.submissions import PARTICIPANT_DEFAULTS, save_submission  # noqa: E402
+
+
+def legacy_submission(session_key, data):
+    """The original loop: one Question.get and one Response.create per answer"""
+    with transaction.atomic():
+        participant = Participant.objects.create(
+            session_key=session_key,
+            **{field: data.get(field, default) for field, default in PARTICIPANT_DEFAULTS.items()}
+        )
+        for key, value in data.items():
+            if key.startswith('q_'):
+                try:
+                    question = Question.objects.get(id=key.split('_')[1])
+                    Response.objects.create(participant=participant, question=question, answer=json.dumps(value))
+                except Question.DoesNotExist:
+                    continue
+        EvaluationSession.objects.update_or_create(
+            participant=participant,
+            defaults={'completed': True, 'completed_at': timezone.now()}
+        )
+
+
+def run(submit, kiosks, per_kiosk, form):
+    """Run `kiosks` threads of `per_kiosk` submissions; return (submissions/s, errors)"""
+    errors = []
+    barrier = threading.Barrier(kiosks + 1)
+
+    def kiosk():
+        barrier.wait()
+        for _ in range(per_kiosk):
+            try:
+                submit(uuid.uuid4().hex, form)
+            except Exception as e:
+                errors.append(e)
+        connection.close()
+
+    threads = [threading.Thread(target=kiosk) for _ in range(kiosks)]
+    for t in threads:
+        t.start()
+    with Timer() as timer:
+        barrier.wait()
+        for t in threads:
+            t.join()
+    done = kiosks * per_kiosk - len(errors)
+    return done / timer.elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kiosks', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--per-kiosk', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=30)
+    args = parser.parse_args()
+
+    rows = []
+    with scratch_database():
+        questions = Question.objects.bulk_create([
+            Question(text=f"Question {i}", question_type='TX', section='post_event')
+            for i in range(args.questions)
+        ])
+        form = {'gender': 'F', 'ethnicity': 'C', 'age': '25-34'}
+        form.update({f'q_{q.id}': f"answer to {q.id}" for q in questions})
+
+        for kiosks in args.kiosks:
+            before, before_errors = run(legacy_submission, kiosks, args.per_kiosk, form)
+            after, after_errors = run(save_submission, kiosks, args.per_kiosk, form)
+            rows.append((kiosks, f'{before:.1f}', before_errors, f'{after:.1f}', after_errors, f'{after / before:.1f}x'))
+
+    print(f"{args.questions}-question form, {args.per_kiosk} submissions per kiosk")
+    print_table(('kiosks', 'before/s', 'errors', 'after/s', 'errors', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
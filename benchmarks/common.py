@@ -0,0 +1,59 @@
+# benchmarks/common.py
+"""Shared setup for the benchmark scripts.
+
+Each script runs against a freshly migrated scratch SQLite file, never the
+live database in database/windrush.db.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    """Configure Django the same way manage.py and the dashboard do"""
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def scratch_database():
+    """Migrate a throwaway SQLite file and point every connection at it"""
+    from django.db import connection
+
+    tmpdir = tempfile.mkdtemp(prefix='windrush-bench-')
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'bench.db')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+class Timer:
+    """Wall-clock timer usable as a context manager"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def print_table(headers, rows):
+    """Print rows as a plain fixed-width table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = '  '.join(f'{{:>{w}}}' for w in widths)
+    print(line.format(*headers))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print(line.format(*row))
@@ -4,9 +4,6 @@ from django.db.models import Count, Q, Avg, Max, Min
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from textblob import TextBlob
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
 import os
@@ -18,6 +15,7 @@ from datetime import datetime
 #from django.db.models import Count
 from django.db.models.functions import TruncDate
 from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
 
 # Load images
 
@@ -38,59 +36,110 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 import django
 django.setup()
 
-from evaluations.models import Participant, Response, Question, EvaluationSession
+from evaluations.models import Participant, Response, Question, EvaluationSession, ResponseSentiment
+from evaluations.utils.analytics import MAP_DIMENSIONS, get_engine
+from evaluations.utils.cube import DemographicCube
+from evaluations.utils.data_version import data_version
+from evaluations.utils.geocode_cache import geocode_version
+from evaluations.utils.geocoder import LEVELS
+from evaluations.utils.incremental import IncrementalTable
+from evaluations.utils.question_registry import questions as question_registry
+from evaluations.utils.snapshot import load_snapshot
+from evaluations.utils.spatial_bins import bin_points
 
 # ========================
 # CACHED DATA FUNCTIONS
 # ========================
+# Cached functions take the part of data_version() they depend on as an
+# argument, so they recompute exactly when new data arrives rather than on
+# a timer.
 
-@st.cache_data(ttl=3600)
-def get_public_data():
+@st.cache_data(max_entries=2, show_spinner=False)
+def get_public_data(version):
     """Aggregate public-facing data"""
+    feedback = Response.objects.filter(question__question_type='TX').values_list('answer', flat=True)
+    text = ' '.join(answer for answer in feedback if isinstance(answer, str))
     return {
-        'participants': Participant.objects.values('gender', 'ethnicity', 'age'),
-        'responses': Response.objects.values('question__text', 'answer'),
-        'sessions': EvaluationSession.objects.filter(completed=True)
+        'wordcloud': WordCloud(width=2400, height=600).generate(text).to_array() if text.strip() else None, #1700
+    }
+
+@st.cache_resource(show_spinner=False)
+def private_tables():
+    """Full participant and response tables, kept in memory and refreshed
+    by appending rows added since the last read"""
+    return {
+        'participants': IncrementalTable(Participant),
+        'responses': IncrementalTable(Response),
     }
 
-@st.cache_data(ttl=300)
 def get_private_data():
     """Secure sensitive data access"""
     if st.session_state.get('authenticated'):
+        tables = private_tables()
         return {
-            'participants': pd.DataFrame(list(Participant.objects.all().values())),
-            'responses': pd.DataFrame(list(Response.objects.all().values())),
+            'participants': tables['participants'].refresh(),
+            'responses': tables['responses'].refresh(),
             'sessions': EvaluationSession.objects.all()
         }
     return None
 
-@st.cache_data(ttl=86400, show_spinner=False)
-def get_geospatial_data():
-    """Cache geocoding results"""
-    postcodes = Participant.objects.exclude(postcode__exact='').values_list('postcode', flat=True).distinct()
-    
-    geolocator = Nominatim(user_agent="windrush_geo")
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
-    
-    locations = []
-    for postcode in postcodes:
-        try:
-            location = geocode(postcode)
-            if location:
-                locations.append({
-                    "postcode": postcode,
-                    "lat": location.latitude,
-                    "lon": location.longitude,
-                    "count": Participant.objects.filter(postcode=postcode).count()
-                })
-        except Exception as e:
-            continue
-    return pd.DataFrame(locations)
+@st.cache_data(max_entries=2, show_spinner=False)
+def get_geospatial_data(start_date, end_date, version, geocoded):
+    """Participants by stored postcode position and demographic slice, from one grouped query.
+    Postcodes are geocoded by `manage.py geocode_postcodes`, never while rendering;
+    ones without a position yet are left off the map."""
+    cells = get_engine().map_cells(start_date, end_date)
+    df = pd.DataFrame(
+        [key + (count,) for key, count in cells.items()],
+        columns=['postcode', 'lat', 'lon', 'precision', *MAP_DIMENSIONS, 'count'],
+    )
+    df['precision'] = pd.Categorical(df['precision'], categories=LEVELS)
+    return df
+
+# Map zoom for each "Map detail" setting
+MAP_DETAIL = {"Country": 5, "Region": 7, "City": 9, "Neighbourhood": 11}
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_map_cells(start_date, end_date, version, geocoded, zoom, by=None):
+    """get_geospatial_data() summed into map cells for this zoom, per value of
+    the `by` column if given; cells under EVALUATION_MAP_MIN_COUNT are dropped"""
+    df = get_geospatial_data(start_date, end_date, version, geocoded)
+    values = pd.Categorical(df[by]) if by else None
+    lat, lon, count, group = bin_points(
+        df['lat'], df['lon'], df['count'], zoom,
+        groups=values.codes if by else None, min_count=settings.EVALUATION_MAP_MIN_COUNT,
+    )
+    cells = pd.DataFrame({'lat': lat, 'lon': lon, 'count': count})
+    if by:
+        cells[by] = values.categories[group]
+    return cells
+
+def map_cells(zoom, by=None):
+    """get_map_cells() for the selected dates, or None before any postcode is geocoded"""
+    geocoded = geocode_version()
+    if not geocoded[0]:
+        st.warning("No postcodes geocoded yet: run `python manage.py geocode_postcodes`")
+        return None
+    start_date, end_date = st.session_state.date_range
+    return get_map_cells(start_date, end_date, data_version().participants, geocoded, zoom, by)
+
+def map_zoom(key):
+    """Zoom picked with a "Map detail" slider; the map starts there and is binned for it"""
+    detail = st.select_slider("Map detail", options=list(MAP_DETAIL), value="Region", key=key)
+    return MAP_DETAIL[detail]
 
 # ========================
 # VISUALIZATION COMPONENTS
 # ========================
 
+def answer_counts(question, label='answer'):
+    """Answer counts for a choice question in the picked dates, from the daily rollup"""
+    rows = get_engine().answer_totals(question.id, *st.session_state.date_range)
+    return pd.DataFrame(
+        [{label: answer, 'count': count} for answer, count in rows],
+        columns=[label, 'count']
+    )
+
 def show_public_components(data):
     """Public-facing components"""
     session_key = st.experimental_get_query_params().get('session_key', [None])[0]
@@ -104,11 +153,8 @@ def show_public_components(data):
     with st.container():
         st.markdown("<h5 style='color:blue;font-weight:bold'>Community Feedback Overview</h5>", 
                    unsafe_allow_html=True)
-        feedback_data = Response.objects.filter(question__question_type='TX').values_list('answer', flat=True)
-        if feedback_data:
-            text = ' '.join([d for d in feedback_data if isinstance(d, str)])
-            wordcloud = WordCloud(width=2400, height=600).generate(text) #1700
-            st.image(wordcloud.to_array(), caption="Most Frequent Feedback Terms")
+        if data['wordcloud'] is not None:
+            st.image(data['wordcloud'], caption="Most Frequent Feedback Terms")
         else:
             st.info("No text feedback available yet")
 
@@ -145,29 +191,44 @@ def handle_dates():
     if len(new_dates) == 2:
         st.session_state.date_range = new_dates
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def demographic_cube(start_date, end_date, version):
+    """Participant counts by day and demographic for the picked dates"""
+    return DemographicCube(get_engine().cube_cells(start_date, end_date))
+
+
+def selected_cube():
+    """The demographic cube every participant widget slices and rolls up"""
+    return demographic_cube(*st.session_state.date_range, data_version().participants)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _snapshot(start_date, end_date, version):
+    return load_snapshot(start_date, end_date, version)
+
+
+def selected_snapshot():
+    """Participants, responses and sessions for the picked dates, loaded once
+    per data version and shared read-only by the widgets that need rows"""
+    start_date, end_date = st.session_state.date_range
+    return _snapshot(start_date, end_date, data_version())
+
+
 def show_participant_metrics():
     """Participant metrics component"""
     st.subheader("Participant Metrics")
     
     try:
-        participants = Participant.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-        count = participants.count()
+        cube = selected_cube()
+        count = cube.total()
         
         st.metric("Total Participants", count,
                  help="Includes all participants in selected date range")
         
         # Show timeline
-        df = pd.DataFrame(
-            participants.values('created_at')
-            .annotate(date=TruncDate('created_at'))
-            .values('date')
-            .annotate(count=Count('id'))
-        )
+        df = pd.DataFrame(cube.rollup('date'), columns=['date', 'count'])
         if not df.empty:
-            st.line_chart(df.set_index('date'))
+            st.line_chart(df.sort_values('date').set_index('date'))
         else:
             st.warning("No participants in selected date range")
     except Exception as e:
@@ -178,31 +239,22 @@ def show_recommendation_metrics():
     st.subheader("Recommendation Metrics")
     
     try:
-        question = Question.objects.get(
-            text__icontains="recommend this event to a friend"
-        )
-        responses = Response.objects.filter(
-            question=question,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
+        question = question_registry.get("recommend_event")
+        totals = dict(get_engine().answer_totals(question.id, *st.session_state.date_range))
         
-        if responses.exists():
-            df = pd.DataFrame(
-                responses.values('answer', 'created_at')
-                .annotate(date=TruncDate('created_at'))
-                .values('date', 'answer')
-            )
-            
-            yes_count = df[df['answer'].str.contains("Yes", case=False)].shape[0]
-            total = df.shape[0]
+        if totals:
+            yes_count = totals.get("Yes", 0)
+            total = sum(totals.values())
             rate = (yes_count / total) * 100 if total > 0 else 0
             
             col1, col2 = st.columns(2)
             col1.metric("Recommendation Rate", f"{rate:.1f}%")
             col2.metric("Total Responses", total)
             
-            daily = df.groupby('date').size()
+            daily = pd.DataFrame(
+                get_engine().daily_totals(question.id, *st.session_state.date_range),
+                columns=['date', 'count']
+            ).set_index('date')['count']
             st.line_chart(daily.rename("Daily Responses"),color='#d4af37')
         else:
             st.warning("No responses in selected date range")
@@ -216,27 +268,17 @@ def show_preferred_event_format():
     st.subheader("Preferred Event Formats")
     
     try:
-        question = Question.objects.get(
-            text__icontains="What type of events do you prefer"
-        )
-        responses = Response.objects.filter(
-            question=question,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
+        question = question_registry.get("preferred_event_type")
+        format_data = get_engine().answer_totals(question.id, *st.session_state.date_range)
         
-        if responses.exists():
-            format_data = responses.values('answer') \
-                .annotate(count=Count('id')) \
-                .order_by('-count')
-            
+        if format_data:
             cols = st.columns(len(format_data))
-            for idx, fmt in enumerate(format_data):
+            for idx, (answer, count) in enumerate(format_data):
                 with cols[idx]:
-                    st.metric(label=fmt['answer'], value=fmt['count'])
+                    st.metric(label=answer, value=count)
                     
-            labels = [fmt['answer'] for fmt in format_data]
-            values = [fmt['count'] for fmt in format_data]     
+            labels = [answer for answer, _ in format_data]
+            values = [count for _, count in format_data]     
             colours = ['#1E3A8A', '#C4A747', '#94A3B8']
             plt.figure(figsize=(6, 4))
             plt.bar(labels, values, color=colours[:len(labels)])  
@@ -269,19 +311,12 @@ def show_age_data():
     #st.subheader("Age Distribution Metrics")
     
     try:
-        participants = Participant.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
+        cube = selected_cube()
         
-        count = participants.count()
+        count = cube.total()
         
         if count > 0:  
-            df = pd.DataFrame(
-                participants.annotate(date=TruncDate('created_at'))
-                .annotate(count=Count('id'))
-                .values('date', 'age', 'count')
-            )
+            df = pd.DataFrame(cube.rollup('age'))
 
             if not df.empty:  
                 fig = px.bar(df, x='age', y='count', 
@@ -315,7 +350,8 @@ def show_age_data():
                 df_clean = df.dropna(subset=['age_midpoint'])
 
                 if not df_clean.empty:
-                    avg_age = df_clean['age_midpoint'].mean()
+                    # Each row is an age range, weighted by its participant count
+                    avg_age = (df_clean['age_midpoint'] * df_clean['count']).sum() / df_clean['count'].sum()
                     max_age = df_clean['age_midpoint'].max()
                     min_age = df_clean['age_midpoint'].min()
                 else:
@@ -342,18 +378,10 @@ def show_age_data():
 def show_demographic_breakdown():
     '''Gender-Ethnicity Sunburst'''
     try:
-        participants = Participant.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-        if participants.exists():  
-            df = pd.DataFrame(
-                participants.annotate(date=TruncDate('created_at'))
-                .values('gender', 'ethnicity')
-            )
-
-            # Group by gender and ethnicity to count occurrences
-            df = df.groupby(['gender', 'ethnicity']).size().reset_index(name='count')
+        cube = selected_cube()
+        if cube.total():  
+            # Counts by gender and ethnicity, rolled up from the cube
+            df = pd.DataFrame(cube.rollup('gender', 'ethnicity'))
 
             if not df.empty:
                 fig = px.sunburst(df, path=['gender', 'ethnicity'], 
@@ -370,20 +398,11 @@ def show_demographic_breakdown():
 def show_gender_data():
     """Gender Distribution"""
     try:
-        participants = Participant.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        if participants.exists():
-            # Create DataFrame with gender counts
-            df = pd.DataFrame(
-                participants.annotate(date=TruncDate('created_at'))
-                .values('gender')
-            )
+        cube = selected_cube()
 
-            # Group by gender and count occurrences
-            df = df.groupby(['gender']).size().reset_index(name='count')
+        if cube.total():
+            # Gender counts, rolled up from the cube
+            df = pd.DataFrame(cube.rollup('gender'))
 
             if not df.empty:
                 # Display gender metrics
@@ -409,19 +428,11 @@ def show_gender_data():
 def show_completion():
     '''Showing the evaluation Form completition rate.'''
     try:
-        sessions=EvaluationSession.objects.filter(
-            completed_at__date__gte=st.session_state.date_range[0],
-            completed_at__date__lte=st.session_state.date_range[1])
+        total_sessions, completed_sessions = get_engine().completion(*st.session_state.date_range)
         
-        if sessions.exists():
-            total_sessions=sessions.count()
-            completed_sessions=sessions.filter(completed=True).count()
-        
-            if total_sessions > 0:
-                rate = (completed_sessions / total_sessions) * 100
-                st.metric("Form Completion Rate", f"{rate:.1f}%")
-            else:
-                st.warning("No sessions found in the selected date range.")
+        if total_sessions > 0:
+            rate = (completed_sessions / total_sessions) * 100
+            st.metric("Form Completion Rate", f"{rate:.1f}%")
         else:
             st.warning("No sessions found in the selected date range.")
     
@@ -433,20 +444,12 @@ def show_completion():
 def show_accessibility_needs():
     """This function shows accessibility needs."""
     try:
-        participants = Participant.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
+        # Accessibility need counts, rolled up from the cube
         df = pd.DataFrame(
-            participants.annotate(date=TruncDate('created_at'))
-            .values('accessibility_needs')
+            selected_cube().rollup('accessibility_needs'),
+            columns=['accessibility_needs', 'count']
         )
 
-        # Group by accessibility needs and count occurrences
-        df = df.groupby(['accessibility_needs']).size().reset_index(name='count')
-
         if not df.empty:
             # Display accessibility needs metrics
             needs = ['Not sure',
@@ -480,20 +483,12 @@ def show_accessibility_needs():
 def show_marketing_referrals():
     """General Marketing Referrals"""
     try:
-        referrals = Participant.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
+        # Referral source counts, rolled up from the cube
         df = pd.DataFrame(
-            referrals.annotate(date=TruncDate('created_at'))
-            .values('referral_source')
+            selected_cube().rollup('referral_source'),
+            columns=['referral_source', 'count']
         )
 
-        # Group by referral source and count occurrences
-        df = df.groupby(['referral_source']).size().reset_index(name='count')
-
         if not df.empty:
             # Pie chart visualization
             fig = px.pie(df, names='referral_source', values='count',
@@ -510,85 +505,16 @@ def show_social_media_question():
     """Social Media Preference"""
     try:
         # Get the relevant question
-        social_media_question = Question.objects.filter(text__icontains="If you chose Social Media").first()
-
-        if not social_media_question:
-            st.error("Social media question not found.")
-            return
-
-        # Filter responses based on the question and date range
-        responses = Response.objects.filter(
-            question=social_media_question,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(
-            responses.annotate(date=TruncDate('created_at'))
-            .values('response')
-        )
-
-        if not df.empty:
-            # Group by response and count occurrences
-            df = df.groupby(['response']).size().reset_index(name='count')
-
-            # Calculate percentages
-            total = df['count'].sum()
-            df['Percentage'] = (df['count'] / total * 100).round(1)
-
-            # Create pie chart
-            fig = px.pie(df, names='response', values='count',
-                         title="Social Media Platform Distribution",
-                         hole=0.3)
-
-            # Position legend and labels
-            fig.update_layout(
-                legend=dict(
-                    orientation="v",
-                    yanchor="top",
-                    y=0.95,
-                    xanchor="left",
-                    x=1.05
-                ),
-                showlegend=True
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-        else:
-            st.error("No social media answers found for chosen dates.")
-
-    except Exception as e:
-        st.error(f"Error loading data for Social Media: {str(e)}")
-
-def show_social_media_question():
-    """Social Media Preference"""
-    try:
-        # Get the relevant question
-        social_media_question = Question.objects.filter(text__icontains="If you chose Social Media").first()
+        social_media_question = question_registry.find("social_media_source")
 
         if not social_media_question:
             st.error("Social media question not found.")
             return
 
-        # Filter responses based on the question and date range
-        responses = Response.objects.filter(
-            question=social_media_question,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(
-            responses.annotate(date=TruncDate('created_at'))
-            .values('answer')
-        )
+        # Answer counts from the daily rollup
+        df = answer_counts(social_media_question)
 
         if not df.empty:
-            # Group by answer and count occurrences
-            df = df.groupby(['answer']).size().reset_index(name='count')
-
             # Calculate percentages
             total = df['count'].sum()
             df['Percentage'] = (df['count'] / total * 100).round(1)
@@ -624,10 +550,10 @@ def show_sentiments():
         # Get the relevant question
         #sentiment_question = Question.objects.filter(id=15).first()
         
-        sentiment_question_1 = Question.objects.filter(text__icontains="How has Windrush Foundation influenced your understanding of heritage?").first()
-        sentiment_question_2 = Question.objects.filter(text__icontains="What was the most valuable part of the event?").first()
-        sentiment_question_3 = Question.objects.filter(text__icontains="What could we improve?").first()
-        sentiment_question_4 = Question.objects.filter(text__icontains="Any further comment on the overall event will be greatly appreciated.").first()
+        sentiment_question_1 = question_registry.find("heritage_influence")
+        sentiment_question_2 = question_registry.find("most_valuable_part")
+        sentiment_question_3 = question_registry.find("improvements")
+        sentiment_question_4 = question_registry.find("further_comments")
         sentiment_question_all=[sentiment_question_1,sentiment_question_2,sentiment_question_3,sentiment_question_4]
 
         for question in sentiment_question_all:
@@ -637,27 +563,16 @@ def show_sentiments():
             st.error("Sentiment question not found.")
             return
 
-        # Filter responses based on the question and date range
-        sentiment_response = Response.objects.filter(
-            question=sentiment_question,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(
-            sentiment_response.values('answer')
-        )
-        if not df.empty:
-            # Group by answer and count occurrences
-            df = df.groupby(['answer']).size().reset_index(name='count')
+        # Stored sentiment counts for the question in the date range
+        counts = dict(get_engine().sentiment_counts(sentiment_question.id, *st.session_state.date_range))
+        if counts:
 
             
 
             st.subheader("Sentiment Analysis")
 
             # Get analysis results
-            #st.dataframe(df)
-            sentiment_results = sentiment_analysis(df['answer'])
+            sentiment_results = sentiment_percentages(counts)
 
             # Display in two columns for better layout
             col1, col2 = st.columns([1, 3])
@@ -691,7 +606,8 @@ def show_sentiments():
 
                 st.plotly_chart(fig, use_container_width=True)
         else:
-            st.warning("No text responses available for sentiment analysis.")
+            st.warning("No scored text responses available for sentiment analysis "
+                       "(responses are scored by `python manage.py score_sentiments`).")
 
     except Exception as e:
         st.error(f"Error loading data for sentiment analysis: {str(e)}")
@@ -706,15 +622,13 @@ def get_all_my_data():
             return
 
         # Use private['responses'] instead of passing full dictionary
-        private_data = Response.objects.filter(
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
+        responses = selected_snapshot().responses
+        df = responses[['question_id', 'answer', 'participant_id', 'created_at']].rename(
+            columns={'question_id': 'question', 'participant_id': 'participant'}
         )
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(list(private_data.values('question','answer','participant','created_at')))
         if not df.empty:
             # Group by answer and count occurrences
-            df = df.groupby(['question','answer','participant','created_at']).size().reset_index(name='count')
+            df = df.groupby(['question','answer','participant','created_at'], observed=True).size().reset_index(name='count')
             st.write("Private Data")
             st.dataframe(df, width=1200)  # Adjust width dynamically
 
@@ -729,26 +643,16 @@ def show_Presentation_Format():
     """Shows the distribution of preferred event formats."""
     try:
         # Fetch the relevant question
-        event_format = Question.objects.filter(text__icontains="What events interest you?").first()
+        event_format = question_registry.find("events_of_interest")
 
         if not event_format:
             st.error("Question not found.")
             return
 
-        # Fetch responses to the question
-        event_format_counts = Response.objects.filter(
-            question=event_format,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(list(event_format_counts.values('answer', 'created_at')))
+        # Answer counts from the daily rollup
+        df = answer_counts(event_format)
 
         if not df.empty:
-            # Group by answer and count occurrences
-            df = df.groupby(['answer']).size().reset_index(name='count')
-
             # Calculate percentages
             total = df['count'].sum()
             df['percentage'] = (df['count'] / total * 100).round(1)
@@ -788,29 +692,16 @@ def show_windrush_loyalty():
     """Shows how long supporters have been following Windrush Foundation."""
     try:
         # Fetch the relevant question
-        loyalty_question = Question.objects.filter(text__icontains="How long have you been following Windrush Foundation?").first()
+        loyalty_question = question_registry.find("following_duration")
 
         if not loyalty_question:
             st.error("Question not found.")
             return
             
-        # Fetch responses to the question
-        loyalty_answer = Response.objects.filter(
-            question=loyalty_question,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(list(loyalty_answer.values('answer', 'created_at')))
+        # Answer counts from the daily rollup
+        df = answer_counts(loyalty_question, label='Windrush Foundation Loyalty Levels')
 
         if not df.empty:
-            # Group by answer and count occurrences
-            df = df.groupby(['answer']).size().reset_index(name="count")
-
-            # Rename columns for clarity
-            df = df.rename(columns={'answer': 'Windrush Foundation Loyalty Levels'})
-
             # Calculate percentages
             total = df['count'].sum()
             df['percentage'] = (df['count'] / total * 100).round(1)
@@ -850,23 +741,16 @@ def show_preferred_session():
     """Shows how long supporters have been following Windrush Foundation."""
     try:
         # Fetch the relevant question
-        preferred_session = Question.objects.filter(text__icontains="Which sessions did you find most valuable?").first()
+        preferred_session = question_registry.find("valuable_sessions")
 
         if not preferred_session:
             st.error("Question not found.")
             return
             
-        # Fetch responses to the question
-        preferred_session_answer = Response.objects.filter(
-            question=preferred_session,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1])
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(list(preferred_session_answer.values('answer', 'created_at')))
+        # Answer counts from the daily rollup
+        df = answer_counts(preferred_session, label='Preferred Session Format')
 
         if not df.empty:
-            df = df.groupby(['answer']).size().reset_index(name="count")
-            df = df.rename(columns={'answer': 'Preferred Session Format'})
             # Calculate percentages
             total = df['count'].sum()
             df['Percentage'] = (df['count'] / total * 100).round(1)
@@ -899,29 +783,16 @@ def show_speaker_rating():
     """Shows ratings for the keynote speaker."""
     try:
         # Fetch the relevant question
-        speaker_rating = Question.objects.filter(text__icontains="What did you think of the keynote speaker?").first()
+        speaker_rating = question_registry.find("keynote_speaker_rating")
 
         if not speaker_rating:
             st.error("Question not found.")
             return
 
-        # Fetch responses to the question
-        speaker_rating_answer = Response.objects.filter(
-            question=speaker_rating,
-            created_at__date__gte=st.session_state.date_range[0],
-            created_at__date__lte=st.session_state.date_range[1]
-        )
-
-        # Convert queryset to DataFrame
-        df = pd.DataFrame(list(speaker_rating_answer.values('answer', 'created_at')))
+        # Answer counts from the daily rollup
+        df = answer_counts(speaker_rating, label='Speaker Rating')
 
         if not df.empty:
-            # Group by answer and count occurrences
-            df = df.groupby(['answer']).size().reset_index(name='count')
-
-            # Rename columns for clarity
-            df = df.rename(columns={'answer': 'Speaker Rating'})
-
             # Calculate percentages
             total = df['count'].sum()
             df['percentage'] = (df['count'] / total * 100).round(1)
@@ -955,159 +826,179 @@ def show_speaker_rating():
         st.error(f"Sorry, can't load speaker rating data: {str(e)}")
 
 
-def show_private_insights(_private_data):
+# ========================
+# LAZY SECTIONS
+# ========================
+# Streamlit runs the body of every expander and tab on each rerun, open or
+# not. section() computes only the picked tab of a section, and a collapsed
+# section only once "Show" is ticked. Where this Streamlit has fragments
+# each section is one, so a widget inside a section reruns that section
+# alone. The rerun log lists the sections each run actually computed.
+
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+RERUN_LOG_SIZE = 50
+
+def log_section(name):
+    """Record in the rerun log that a section was computed"""
+    log = st.session_state.setdefault('rerun_log', [])
+    log.append({
+        'run': st.session_state.get('run_number', 0),
+        'time': datetime.now().strftime('%H:%M:%S.%f')[:-3],
+        'section': name,
+    })
+    del log[:-RERUN_LOG_SIZE]
+
+def section(title, tabs, expanded=True):
+    """An expander of tabs ({label: render function}); only the picked tab is computed"""
+    with st.expander(title, expanded=expanded):
+        section_body(title, tabs, expanded)
+
+@fragment
+def section_body(title, tabs, expanded):
+    if not expanded and not st.checkbox("Show", key=f"show:{title}"):
+        return
+    labels = list(tabs)
+    label = labels[0]
+    if len(labels) > 1:
+        label = st.radio(title, labels, horizontal=True, key=f"tab:{title}", label_visibility="collapsed")
+    log_section(f"{title} / {label}" if len(labels) > 1 else title)
+    tabs[label]()
+
+def show_rerun_log():
+    """Sections computed by recent runs, newest first"""
+    with st.expander("Rerun Log"):
+        log = st.session_state.get('rerun_log', [])
+        if log:
+            st.dataframe(pd.DataFrame(log[::-1]), use_container_width=True, hide_index=True)
+        else:
+            st.info("No sections computed yet")
+
+
+def show_engagement_metrics():
+    col1, col2, col3 = st.columns([1, 1, 1])
+    
+    with col1:
+        show_participant_metrics()
+    
+    with col2:
+        show_recommendation_metrics()
+
+    with col3:
+        show_preferred_event_format()
+
+def show_demographic_insights():
+    col1, col2, col3 = st.columns(3)
+    
+    # Age Distribution
+    with col1:
+        show_age_data()
+    
+    # Gender-Ethnicity Sunburst
+    with col2:
+        show_demographic_breakdown()
+
+    with col3:
+        #st.subheader("Gender Distribution")
+        show_gender_data()
+
+def show_geo_heatmap():
+    zoom = map_zoom('heatmap_detail')
+    cells = map_cells(zoom)
+    if cells is None:
+        return
+    if not cells.empty:
+        fig = px.density_mapbox(
+            cells, lat='lat', lon='lon', z='count',
+            radius=20, zoom=zoom, mapbox_style="carto-positron",
+            title="Participant Density by Location"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.warning("No geographic data available")
+
+def show_demographic_overlay():
+    zoom = map_zoom('overlay_detail')
+    cells = map_cells(zoom, by='ethnicity')
+    if cells is None:
+        return
+    if not cells.empty:
+        # Each row is one ethnicity in one map cell
+        overlay_df = cells.rename(columns={'count': 'demographic_count'})
+        overlay_df['location_count'] = overlay_df.groupby(['lat', 'lon'])['demographic_count'].transform('sum')
+        fig = px.scatter_mapbox(
+            overlay_df,
+            lat='lat',
+            lon='lon',
+            color='ethnicity',
+            size='demographic_count',
+            hover_data=['location_count'],
+            zoom=zoom,
+            title="Demographic Distribution by Location",
+            mapbox_style="carto-positron"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("Geographic data required for overlay")
+
+def show_marketing():
+    col1,col2=st.columns(2)
+    with col1:
+        show_marketing_referrals()
+    with col2:
+        show_social_media_question()
+
+def show_data_export():
+    private_data = get_private_data()
+    st.download_button(label="Export Full Dataset", data=private_data['responses'].to_csv(), file_name="windrush_data_export.csv")
+
+
+def show_private_insights():
     """Admin analytics dashboard"""
     st.header("Administrator Dashboard")
     
     # Persistent date picker at top
     handle_dates()
     
-    with st.expander("Community Engagement Metrics", expanded=True):
-        col1, col2, col3 = st.columns([1, 1, 1])
-        
-        with col1:
-            show_participant_metrics()
-        
-        with col2:
-            show_recommendation_metrics()
-
-            # In the Community Engagement Metrics expander
-        with col3:
-            show_preferred_event_format()
-          
+    section("Community Engagement Metrics", {"Engagement": show_engagement_metrics})
 
     # Demographic Analysis
-    with st.expander("Demographic Insights", expanded=True):
-        col1, col2, col3 = st.columns(3)
-        
-        # Age Distribution
-        with col1:
-            show_age_data()
-        
-        # Gender-Ethnicity Sunburst
-        with col2:
-            show_demographic_breakdown()
-
-        with col3:
-            #st.subheader("Gender Distribution")
-            show_gender_data()
+    section("Demographic Insights", {"Demographics": show_demographic_insights})
 
     # Geographic Analysis
-    with st.expander("Visitor Origins Analysis", expanded=True):
-        tab1, tab2 = st.tabs(["Heatmap", "Demographic Overlay"])
-        
-        # Heatmap Tab
-        with tab1:
-            geo_df = get_geospatial_data()
-            if not geo_df.empty:
-                fig = px.density_mapbox(
-                    geo_df, lat='lat', lon='lon', z='count',
-                    radius=20, zoom=5, mapbox_style="carto-positron",
-                    title="Participant Density by Location"
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.warning("No geographic data available")
-        
-        # In the Demographic Overlay section
-    with tab2:
-        if 'geo_df' in locals() and not geo_df.empty:
-            # Get demographic data with count
-            demo_geo_data = Participant.objects.values('postcode', 'age', 'gender', 'ethnicity').annotate(demographic_count=Count('id'))  # Changed alias
-        
-            # Merge with geographic data
-            merged_df = pd.merge(pd.DataFrame(list(demo_geo_data)),
-                                 geo_df.rename(columns={'count': 'location_count'}),  # Rename geo count
-                                 on='postcode'
-                                 )
-        
-            # Create visualization with correct column names
-            if not merged_df.empty:
-                fig = px.scatter_mapbox(
-                    merged_df,
-                    lat='lat',
-                    lon='lon',
-                    color='ethnicity',
-                    size='demographic_count',  # Use correct column name
-                    hover_data=['age', 'gender', 'location_count'],
-                    title="Demographic Distribution by Location",
-                    mapbox_style="carto-positron"
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.warning("Could not merge demographic and location data")
-        else:
-            st.info("Geographic data required for overlay")
+    section("Visitor Origins Analysis", {
+        "Heatmap": show_geo_heatmap,
+        "Demographic Overlay": show_demographic_overlay,
+    })
 
     # Performance Metrics
-    with st.expander("Performance Analytics", expanded=True):
-        tab1, tab2, tab3 = st.tabs(["Completion", "Accessibility", "Marketing"])
-        
-        # Completion Rates
-        with tab1:
-            show_completion()
-        
-        # Accessibility Needs
-        with tab2:
-            show_accessibility_needs()
-
-        # Referral Sources
-        with tab3:
-            col1,col2=st.columns(2)
-            with col1:
-                show_marketing_referrals()
-            with col2:
-                #with col2:
-                show_social_media_question()
-     
+    section("Performance Analytics", {
+        "Completion": show_completion,
+        "Accessibility": show_accessibility_needs,
+        "Marketing": show_marketing,
+    })
     
 #################################################
-    with st.expander("Private Data", expanded=True):
-        tab1, tab2 = st.tabs(["Sentiment Analysis","Private Data"])
-        with tab1:
-            # Perform sentiment analysis
-            show_sentiments()
-          
-        with tab2:
-            get_all_my_data()
+    section("Private Data", {
+        "Sentiment Analysis": show_sentiments,
+        "Private Data": get_all_my_data,
+    })
     
-    with st.expander("Other Metrics"):
-        tab1, tab2, tab3, tab4 = st.tabs(["Presentation Format","About Windrush Foundation","Preferred Session Format", "Speaker Rating"])
-        with tab1:
-             show_Presentation_Format()
-
-        with tab2:
-            show_windrush_loyalty()
-        
-        with tab3:
-            show_preferred_session()
-
-        with tab4:
-            show_speaker_rating()
+    section("Other Metrics", {
+        "Presentation Format": show_Presentation_Format,
+        "About Windrush Foundation": show_windrush_loyalty,
+        "Preferred Session Format": show_preferred_session,
+        "Speaker Rating": show_speaker_rating,
+    }, expanded=False)
 # Add force refresh button
     if st.button("Refresh All Data"):
         st.session_state.clear()
         st.rerun()
 
-
-from textblob import TextBlob  # Requires textblob package
-
-def sentiment_analysis(responses):
-    analysis = {'positive': 0, 'neutral': 0, 'negative': 0}
-    
-    for text in responses:
-        if isinstance(text, str):  # Handle potential non-string values
-            polarity = TextBlob(text).sentiment.polarity
-            if polarity > 0.2:
-                analysis['positive'] += 1
-            elif polarity < -0.2:
-                analysis['negative'] += 1
-            else:
-                analysis['neutral'] += 1
-    
-    # Convert counts to percentages
-    total = sum(analysis.values()) or 1  # Prevent division by zero
-    return {k: round((v/total)*100, 1) for k, v in analysis.items()}
+def sentiment_percentages(counts):
+    """Share of responses with each sentiment label, as percentages"""
+    total = sum(counts.values()) or 1  # Prevent division by zero
+    return {label: round(counts.get(label, 0) / total * 100, 1) for label, _ in ResponseSentiment.LABELS}
 
 # ========================
 # MAIN APPLICATION
@@ -1124,6 +1015,8 @@ def main():
 
     # Add this to force session handling via Streamlit Cloud
     st.session_state.disable_embedded_session = True  # 👈 Critical line
+    # Full runs, numbered for the rerun log (fragment reruns keep the number)
+    st.session_state.run_number = st.session_state.get('run_number', 0) + 1
    
     # Custom CSS
     # css = """
@@ -1219,7 +1112,7 @@ def main():
 
     st.markdown(custom_css, unsafe_allow_html=True)
 
-    show_public_components(get_public_data())
+    show_public_components(get_public_data(data_version().responses))
 
     # Authentication
     if 'authenticated' not in st.session_state:
@@ -1249,15 +1142,14 @@ def main():
 
     # Private dashboard
     if st.session_state.authenticated:
-        private_data = get_private_data()
-        show_private_insights(private_data)
+        show_private_insights()
 
         # Logout and data export
         col1, col2 = st.columns([6, 1])
         col2.button("🔒 Logout", on_click=lambda: st.session_state.update(authenticated=False))
         
-        with st.expander("Raw Data Export"):
-            st.download_button(label="Export Full Dataset", data=private_data['responses'].to_csv(), file_name="windrush_data_export.csv")
+        section("Raw Data Export", {"Export": show_data_export}, expanded=False)
+        show_rerun_log()
     st.title("")
     st.title("")
     st.write("Designed by BIS Smart Digital Solutions")
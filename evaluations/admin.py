@@ -1,5 +1,7 @@
 # evaluations/admin.py
 from django.contrib import admin
+from django.core.cache import cache
+from django.template.response import TemplateResponse
 from .models import Question, Response, Participant, EvaluationSession
 
 from django.contrib import admin
@@ -7,15 +9,15 @@ from .models import Question
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('text', 'question_type', 'section', 'section_order', 'is_active')
+    list_display = ('text', 'key', 'question_type', 'section', 'section_order', 'is_active')
     list_filter = ('question_type', 'section')
-    search_fields = ('text',)
+    search_fields = ('text', 'key')
     list_editable = ('section_order', 'is_active')
     ordering = ('section', 'section_order')  # New default ordering
 
     fieldsets = (
         (None, {
-            'fields': ('text', 'question_type', 'section')
+            'fields': ('text', 'key', 'question_type', 'section')
         }),
         ('Advanced Options', {
             'fields': ('options', 'section_order', 'is_active'),
@@ -38,4 +40,19 @@ class ParticipantAdmin(admin.ModelAdmin):
 @admin.register(EvaluationSession)
 class EvaluationSessionAdmin(admin.ModelAdmin):
     list_display = ('participant', 'completed', 'started_at', 'completed_at')
-    list_filter = ('completed',)
\ No newline at end of file
+    list_filter = ('completed',)
+
+def cache_stats_view(request):
+    """Hit/miss/eviction counters for the tiered cache, summed over worker processes"""
+    stats = cache.stats() if hasattr(cache, 'stats') else None
+    hit_rate = 0
+    if stats:
+        totals = stats['totals']
+        lookups = totals['l1_hits'] + totals['l2_hits'] + totals['misses']
+        hit_rate = (totals['l1_hits'] + totals['l2_hits']) / lookups * 100 if lookups else 0
+    return TemplateResponse(request, 'admin/cache_stats.html', {
+        **admin.site.each_context(request),
+        'title': 'Cache statistics',
+        'stats': stats,
+        'hit_rate': hit_rate,
+    })
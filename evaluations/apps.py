@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class EvaluationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'evaluations'  # Must match directory name
-    # Optional: label = 'windrush_evaluations'  # Unique label if needed
\ No newline at end of file
+    # Optional: label = 'windrush_evaluations'  # Unique label if needed
+
+    def ready(self):
+        # Connect signal receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,89 @@
+# evaluations/management/commands/build_postcode_index.py
+import csv
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from evaluations.utils.geocoder import LEVELS, POSTCODE_KEY, PREFIX_KEY, postcode_keys
+
+
+def _save(directory, name, array):
+    # Write beside the old file and swap, so a running dashboard never maps a partial file
+    path = os.path.join(directory, f'{name}.npy')
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    os.replace(path + '.tmp', path)
+
+
+class Command(BaseCommand):
+    help = "Build the offline postcode index the dashboard map geocodes with, from a postcode directory CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="CSV of postcodes and coordinates, e.g. the ONS Postcode Directory")
+        parser.add_argument('--postcode-column', default='pcds')
+        parser.add_argument('--lat-column', default='lat')
+        parser.add_argument('--lon-column', default='long')
+        parser.add_argument('--output', default=settings.EVALUATION_POSTCODE_INDEX,
+                            help="Index directory (default: settings.EVALUATION_POSTCODE_INDEX)")
+
+    def handle(self, *args, **options):
+        columns = options['postcode_column'], options['lat_column'], options['lon_column']
+        keys, coords, skipped = [], [], 0
+        try:
+            with open(options['source'], newline='', encoding='utf-8-sig') as f:
+                reader = csv.DictReader(f)
+                missing = [column for column in columns if column not in (reader.fieldnames or [])]
+                if missing:
+                    raise CommandError(f"{options['source']} has no column(s): {', '.join(missing)}")
+                for row in reader:
+                    row_keys = postcode_keys(row[columns[0]])
+                    try:
+                        lat, lon = float(row[columns[1]]), float(row[columns[2]])
+                    except ValueError:
+                        lat = lon = None
+                    # Postcodes without a grid reference carry placeholder coordinates
+                    if not row_keys[0] or lat is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                        skipped += 1
+                        continue
+                    keys.append(row_keys)
+                    coords.append((lat, lon))
+        except OSError as e:
+            raise CommandError(f"Can't read {options['source']}: {e}")
+        if not keys:
+            raise CommandError(f"No usable postcodes in {options['source']}")
+
+        keys = np.array(keys)
+        coords = np.array(coords, dtype='f8')
+
+        # One row per postcode, the last one listed winning
+        postcode_keys_, first = np.unique(keys[::-1, 0].astype(POSTCODE_KEY), return_index=True)
+        postcode_coords = coords[::-1][first].astype('<f4')
+
+        # Each sector, district and area at the mean of its postcodes
+        prefix_keys, prefix_coords = [], []
+        for number in range(1, len(LEVELS)):
+            level_keys = keys[:, number]
+            present = level_keys != ''
+            names, inverse = np.unique(level_keys[present], return_inverse=True)
+            counts = np.bincount(inverse)
+            prefix_keys.append(names)
+            prefix_coords.append(np.column_stack([
+                np.bincount(inverse, weights=coords[present, axis]) / counts for axis in (0, 1)
+            ]))
+        prefix_keys = np.concatenate(prefix_keys).astype(PREFIX_KEY)
+        prefix_coords = np.concatenate(prefix_coords)
+        order = np.argsort(prefix_keys, kind='stable')
+
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+        _save(output, 'postcode_keys', postcode_keys_)
+        _save(output, 'postcode_coords', postcode_coords)
+        _save(output, 'prefix_keys', prefix_keys[order])
+        _save(output, 'prefix_coords', prefix_coords[order].astype('<f4'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(postcode_keys_)} postcodes and {len(order)} sectors, districts and areas "
+            f"in {output} (skipped {skipped} rows)"
+        ))
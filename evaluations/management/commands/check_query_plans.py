@@ -0,0 +1,27 @@
+# evaluations/management/commands/check_query_plans.py
+from django.core.management.base import BaseCommand, CommandError
+
+from evaluations.utils.query_plans import checked_queries, table_scans
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the dashboard and view queries and fail if any reads a whole table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', action='store_true',
+                            help="Print the full query plan of every query")
+
+    def handle(self, *args, **options):
+        failed = []
+        for description, queryset in checked_queries():
+            scans = table_scans(queryset)
+            status = self.style.ERROR('SCAN') if scans else self.style.SUCCESS('ok')
+            self.stdout.write(f"{status:>4}  {description}")
+            if options['plans'] or scans:
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f"      {line}")
+            if scans:
+                failed.append(description)
+
+        if failed:
+            raise CommandError(f"{len(failed)} queries fall back to a table scan: {', '.join(failed)}")
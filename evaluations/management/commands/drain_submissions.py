@@ -0,0 +1,75 @@
+# evaluations/management/commands/drain_submissions.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from evaluations.utils.spool import get_spool
+from evaluations.utils.submissions import save_submissions
+
+
+class Command(BaseCommand):
+    help = "Commit spooled evaluation submissions into the main database in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Submissions committed per transaction")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Seconds to wait when the spool is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain what is spooled now and exit")
+        parser.add_argument('--retries', type=int, default=5,
+                            help="Attempts per batch before --once gives up")
+        parser.add_argument('--status', action='store_true',
+                            help="Print spool depth and drain lag, then exit")
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+
+        if options['status']:
+            self.print_status(spool.stats())
+            return
+
+        # Anything left over from a previous run is replayed first; the
+        # submission keys stop already-committed entries being written twice.
+        failures = 0
+        while True:
+            try:
+                drained = self.drain_batch(spool, options['batch_size'])
+            except DatabaseError as exc:
+                # The batch stays spooled until it commits, so it is retried
+                # as a whole; a long-running drainer never gives up on it.
+                failures += 1
+                if options['once'] and failures >= options['retries']:
+                    raise CommandError(f"Batch failed {failures} times: {exc}")
+                self.stderr.write(f"Batch failed ({exc}); retrying in {options['interval']}s")
+                connection.close()
+                time.sleep(options['interval'])
+                continue
+            failures = 0
+            if drained:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def drain_batch(self, spool, batch_size):
+        entries = spool.pending(batch_size)
+        if not entries:
+            return 0
+        save_submissions([submission for _, submission, _ in entries])
+        spool.acknowledge(entries)
+
+        stats = spool.stats()
+        self.stdout.write(
+            f"Drained {len(entries)} submissions "
+            f"(depth {stats['depth']}, lag {stats['last_drain_lag']:.2f}s)"
+        )
+        return len(entries)
+
+    def print_status(self, stats):
+        lag = stats['last_drain_lag']
+        self.stdout.write(f"Spool depth: {stats['depth']}")
+        self.stdout.write(f"Oldest entry: {stats['oldest_age']:.1f}s")
+        self.stdout.write(f"Drained total: {stats['drained_total']}")
+        self.stdout.write(f"Last drain lag: {f'{lag:.2f}s' if lag is not None else 'n/a'}")
@@ -0,0 +1,44 @@
+# evaluations/management/commands/geocode_postcodes.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from evaluations.models import GeocodedPostcode
+from evaluations.utils.geocode_cache import geocode, missing_postcodes
+from evaluations.utils.geocoder import get_geocoder
+
+
+class Command(BaseCommand):
+    help = "Store map positions for participant postcodes that have none, as participants arrive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Postcodes geocoded and stored per transaction")
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help="Seconds to wait when every postcode has a position")
+        parser.add_argument('--once', action='store_true',
+                            help="Geocode the postcodes missing now and exit")
+        parser.add_argument('--refresh', action='store_true',
+                            help="First redo every stored postcode, e.g. after rebuilding the index")
+
+    def handle(self, *args, **options):
+        try:
+            geocoder = get_geocoder()
+        except FileNotFoundError as e:
+            raise CommandError(f"No postcode index ({e}); run build_postcode_index first")
+        batch_size = options['batch_size']
+
+        if options['refresh']:
+            keys = list(GeocodedPostcode.objects.order_by('postcode').values_list('postcode', flat=True))
+            for start in range(0, len(keys), batch_size):
+                geocode(geocoder, keys[start:start + batch_size])
+            self.stdout.write(f"Regeocoded {len(keys)} postcodes")
+
+        while True:
+            written = geocode(geocoder, missing_postcodes()[:batch_size])
+            if written:
+                self.stdout.write(f"Geocoded {written} new postcodes")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,185 @@
+# evaluations/management/commands/import_submissions.py
+import csv
+import hashlib
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries
+
+from evaluations.utils.form_schema import build_form_schema
+from evaluations.utils.question_registry import questions as question_registry
+from evaluations.utils.submissions import ingest_batch
+
+FINGERPRINT_BYTES = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = "Import keyed-in paper evaluations from a CSV or JSONL file in bulk-insert chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row, or JSONL with one object per line")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Input format (default: from the file extension)")
+        parser.add_argument('--map', action='append', default=[], metavar='COLUMN=FIELD',
+                            help="Rename an input column to a Participant field or q_<id>; repeatable")
+        parser.add_argument('--multi-separator', default=';',
+                            help="Separator between ticked options in CSV multiple choice cells")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Rows committed per transaction")
+        parser.add_argument('--checkpoint',
+                            help="Progress file used to resume (default: <path>.checkpoint)")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore an existing checkpoint and start from the first row")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        columns = self.parse_map(options['map'])
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        fingerprint = self.fingerprint(path)
+        done = 0 if options['restart'] else self.read_checkpoint(checkpoint_path, fingerprint)
+        if done:
+            self.stdout.write(f"Resuming after {done} rows")
+
+        questions = question_registry.active_map()
+        schema = build_form_schema(questions.values())
+        multi_fields = {f'q_{qid}' for qid, question in questions.items() if question.question_type == 'MC'}
+
+        totals = {'created': 0, 'duplicate': 0, 'rejected': 0}
+        start = time.perf_counter()
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            rows = self.read_rows(source, input_format, columns, options['multi_separator'], multi_fields)
+            # Rows committed by an earlier run are read past, not written again
+            rows = islice(rows, done, None)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                valid = []
+                for row_number, fields, errors in chunk:
+                    if errors:
+                        self.reject(totals, row_number, errors)
+                    else:
+                        valid.append((row_number, fields))
+                items = [self.to_item(row_number, fields) for row_number, fields in valid]
+                for (row_number, _), result in zip(valid, ingest_batch(items, schema, questions)):
+                    if result['status'] == 'rejected':
+                        self.reject(totals, row_number, result['errors'])
+                    else:
+                        totals[result['status']] += 1
+
+                # DEBUG keeps every statement; don't let that grow with the file
+                reset_queries()
+                done += len(chunk)
+                self.write_checkpoint(checkpoint_path, fingerprint, done)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{done} rows, {totals['created']} imported ({self.rate(totals, elapsed):.0f} rows/s)")
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['created']} submissions "
+            f"({totals['duplicate']} already imported, {totals['rejected']} rejected)"
+        ))
+
+    def parse_map(self, mappings):
+        columns = {}
+        for mapping in mappings:
+            column, sep, field = mapping.partition('=')
+            if not sep or not field:
+                raise CommandError(f"--map expects COLUMN=FIELD, got {mapping!r}")
+            columns[column] = field
+        return columns
+
+    def reject(self, totals, row_number, errors):
+        totals['rejected'] += 1
+        self.stderr.write(f"Row {row_number}: {json.dumps(errors)}")
+
+    def read_jsonl(self, source):
+        """Yield (line number, object or None, errors) for each non-blank line"""
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, None, {'row': f"Not valid JSON: {e}"}
+                continue
+            if not isinstance(record, dict):
+                yield number, None, {'row': "Expected a JSON object of form fields"}
+                continue
+            yield number, record, None
+
+    def read_rows(self, source, input_format, columns, separator, multi_fields):
+        """Yield (row number, form fields, errors) one row at a time; blank rows are skipped.
+
+        Rows that cannot be read come with errors instead of fields, so they
+        are reported and counted like rows that fail validation.
+        """
+        if input_format == 'csv':
+            records = ((number, record, None) for number, record in enumerate(csv.DictReader(source), start=1))
+        else:
+            records = self.read_jsonl(source)
+        for row_number, record, errors in records:
+            if errors:
+                yield row_number, None, errors
+                continue
+            fields = {}
+            for column, value in record.items():
+                # Blank cells fall back to the form defaults; cells beyond
+                # the header row (column None) are ignored
+                if column is None or value in ('', None):
+                    continue
+                name = columns.get(column, column)
+                if name.isdigit():
+                    name = f'q_{name}'
+                if name in multi_fields and isinstance(value, str):
+                    value = [option.strip() for option in value.split(separator) if option.strip()]
+                fields[name] = value
+            if fields:
+                yield row_number, fields, None
+
+    def to_item(self, row_number, fields):
+        # Without a submission_key column the key comes from the row itself,
+        # so an edit elsewhere in the file (then --restart) leaves the keys
+        # of unchanged rows alone and they are not stored twice. The row
+        # number keeps two identical paper forms apart.
+        key = fields.pop('submission_key', None)
+        if not key:
+            content = json.dumps([row_number, fields], sort_keys=True, separators=(',', ':'))
+            key = f'import-{hashlib.sha256(content.encode()).hexdigest()[:32]}'
+        return {'submission_key': str(key), 'fields': fields}
+
+    def rate(self, totals, elapsed):
+        return sum(totals.values()) / elapsed if elapsed else 0.0
+
+    def fingerprint(self, path):
+        digest = hashlib.sha256(str(os.path.getsize(path)).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read(FINGERPRINT_BYTES))
+        return digest.hexdigest()
+
+    def read_checkpoint(self, checkpoint_path, fingerprint):
+        if not os.path.exists(checkpoint_path):
+            return 0
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('fingerprint') != fingerprint:
+            raise CommandError(
+                f"{checkpoint_path} was written for a different version of this file; "
+                "use --restart to import it from the beginning"
+            )
+        return checkpoint['rows']
+
+    def write_checkpoint(self, checkpoint_path, fingerprint, rows):
+        # Written only after the chunk has committed, and replaced atomically
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'rows': rows}, f)
+        os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,74 @@
+# evaluations/management/commands/optimize_database.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = "Refresh SQLite planner statistics and return free pages to the filesystem"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help="Run a full ANALYZE instead of PRAGMA optimize")
+        parser.add_argument('--vacuum-pages', type=int, default=1000,
+                            help="Most free pages to release per run (0 releases all)")
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help="Switch the database to auto_vacuum=INCREMENTAL (runs one full VACUUM)")
+        parser.add_argument('--every', type=float, metavar='SECONDS',
+                            help="Keep running, repeating the maintenance at this interval")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("optimize_database only supports SQLite")
+
+        if options['enable_incremental_vacuum']:
+            self.enable_incremental_vacuum()
+
+        while True:
+            self.run_once(options['analyze'], options['vacuum_pages'])
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def pragma(self, cursor, statement):
+        cursor.execute(f'PRAGMA {statement}')
+        return cursor.fetchone()
+
+    def enable_incremental_vacuum(self):
+        with connection.cursor() as cursor:
+            if self.pragma(cursor, 'auto_vacuum')[0] == AUTO_VACUUM_INCREMENTAL:
+                self.stdout.write("Incremental vacuum already enabled")
+                return
+            # The new mode only takes effect after a full rebuild of the file
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS("Incremental vacuum enabled"))
+
+    def run_once(self, analyze, vacuum_pages):
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            if analyze:
+                cursor.execute('ANALYZE')
+            else:
+                # Only re-analyzes tables whose statistics have drifted
+                cursor.execute('PRAGMA optimize')
+
+            freed = 0
+            if self.pragma(cursor, 'auto_vacuum')[0] == AUTO_VACUUM_INCREMENTAL:
+                before = self.pragma(cursor, 'freelist_count')[0]
+                cursor.execute(f'PRAGMA incremental_vacuum({vacuum_pages or before})')
+                cursor.fetchall()
+                freed = before - self.pragma(cursor, 'freelist_count')[0]
+
+            # Fold the WAL back into the main file so it does not keep growing
+            if self.pragma(cursor, 'journal_mode')[0] == 'wal':
+                self.pragma(cursor, 'wal_checkpoint(TRUNCATE)')
+
+        self.stdout.write(
+            f"{'ANALYZE' if analyze else 'PRAGMA optimize'} done, "
+            f"{freed} free pages released in {time.perf_counter() - start:.2f}s"
+        )
@@ -0,0 +1,26 @@
+# evaluations/management/commands/rebuild_demographic_cube.py
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from evaluations.utils.cube import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the participant counts by day and demographic that the dashboard reads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', metavar='YYYY-MM-DD',
+                            help="Only recompute this day and later (default: every day)")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"--since expects YYYY-MM-DD, got {options['since']!r}")
+
+        rows = rebuild(since)
+        scope = f"from {since}" if since else "for every day"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} demographic cube cells {scope}"))
@@ -0,0 +1,35 @@
+# evaluations/management/commands/score_sentiments.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from evaluations.utils.sentiment import prune, score, unscored_responses
+
+
+class Command(BaseCommand):
+    help = "Score the sentiment of text responses that have no current score, as they arrive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Responses scored and stored per transaction")
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help="Seconds to wait when every text response is scored")
+        parser.add_argument('--once', action='store_true',
+                            help="Score the responses waiting now, e.g. to backfill older ones, and exit")
+
+    def handle(self, *args, **options):
+        # Only text questions are scored; a question changed to another type
+        # in the admin leaves its old scores behind
+        pruned = prune()
+        if pruned:
+            self.stdout.write(f"Deleted {pruned} scores of responses that are no longer free text")
+        scored = 0
+        while True:
+            written = score(unscored_responses().values_list('id', 'answer')[:options['batch_size']])
+            if written:
+                scored += written
+                self.stdout.write(f"Scored {scored} responses")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:00
+import json
+
+from django.db import migrations, transaction
+
+# Rows are rewritten in id-ordered batches, each in its own short transaction,
+# so neither the table nor the write lock is held all at once.
+BATCH_SIZE = 500
+
+
+def _batches(Response):
+    last_id = 0
+    while True:
+        batch = list(
+            Response.objects.filter(id__gt=last_id).order_by('id').only('id', 'question_id', 'answer')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+
+
+def _coerce(question_type, answer):
+    """The native answer submissions.coerce_answer() stores for this question type"""
+    if question_type == 'MC':
+        return list(answer) if isinstance(answer, (list, tuple)) else [answer]
+    if question_type == 'RT':
+        try:
+            number = float(answer)
+        except (TypeError, ValueError):
+            return answer
+        # Ratings were posted as "3" and later stored as "3.0"
+        return int(number) if number.is_integer() else number
+    return answer
+
+
+def decode_answers(apps, schema_editor):
+    """Unwrap answers that were stored as json.dumps() strings, then give
+    ratings and multiple choice answers the types new submissions store"""
+    Question = apps.get_model('evaluations', 'Question')
+    Response = apps.get_model('evaluations', 'Response')
+    question_types = dict(Question.objects.values_list('id', 'question_type'))
+
+    for batch in _batches(Response):
+        changed = []
+        for response in batch:
+            answer = response.answer
+            if isinstance(answer, str):
+                try:
+                    answer = json.loads(answer)
+                except ValueError:
+                    # Already a native string
+                    pass
+            answer = _coerce(question_types.get(response.question_id), answer)
+            if answer != response.answer or type(answer) is not type(response.answer):
+                response.answer = answer
+                changed.append(response)
+        with transaction.atomic():
+            Response.objects.bulk_update(changed, ['answer'])
+
+
+def encode_answers(apps, schema_editor):
+    """Reverse: store every answer as a JSON-encoded string again"""
+    Response = apps.get_model('evaluations', 'Response')
+
+    for batch in _batches(Response):
+        for response in batch:
+            response.answer = json.dumps(response.answer)
+        with transaction.atomic():
+            Response.objects.bulk_update(batch, ['answer'])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('evaluations', '0011_alter_participant_accessibility_needs'),
+    ]
+
+    operations = [
+        migrations.RunPython(decode_answers, encode_answers),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0012_native_json_answers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='submission_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0013_participant_submission_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluationsession',
+            index=models.Index(fields=['completed_at'], name='session_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['created_at'], name='participant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['session_key'], name='participant_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['postcode'], name='participant_postcode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['question', 'created_at'], name='response_question_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['created_at'], name='response_created_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:52
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+# Keys for the questions the dashboard looks up, matched on the wording it
+# used to search for
+KNOWN_QUESTIONS = [
+    ('recommend this event to a friend', 'recommend_event'),
+    ('What type of events do you prefer', 'preferred_event_type'),
+    ('If you chose Social Media', 'social_media_source'),
+    ('How has Windrush Foundation influenced your understanding of heritage?', 'heritage_influence'),
+    ('What was the most valuable part of the event?', 'most_valuable_part'),
+    ('What could we improve?', 'improvements'),
+    ('Any further comment on the overall event', 'further_comments'),
+    ('What events interest you?', 'events_of_interest'),
+    ('How long have you been following Windrush Foundation?', 'following_duration'),
+    ('Which sessions did you find most valuable?', 'valuable_sessions'),
+    ('What did you think of the keynote speaker?', 'keynote_speaker_rating'),
+]
+
+
+def assign_keys(apps, schema_editor):
+    Question = apps.get_model('evaluations', 'Question')
+    taken = set(Question.objects.exclude(key=None).values_list('key', flat=True))
+
+    for question in Question.objects.filter(key=None).order_by('id'):
+        text = question.text.lower()
+        key = next((key for phrase, key in KNOWN_QUESTIONS if phrase.lower() in text and key not in taken), None)
+        if key is None:
+            # Same rule as Question.unique_key()
+            lines = question.text.strip().splitlines() or ['']
+            base = slugify(lines[0]).replace('-', '_')[:56].strip('_') or 'question'
+            key, n = base, 1
+            while key in taken:
+                n += 1
+                key = f'{base}_{n}'
+        taken.add(key)
+        question.key = key
+        question.save(update_fields=['key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0014_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='key',
+            field=models.SlugField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(assign_keys, migrations.RunPython.noop),
+    ]
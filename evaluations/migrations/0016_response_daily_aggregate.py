@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:53
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def fill_rollup(apps, schema_editor):
+    """Count the responses already stored (same rules as utils.rollup.rebuild)"""
+    Response = apps.get_model('evaluations', 'Response')
+    ResponseDailyAggregate = apps.get_model('evaluations', 'ResponseDailyAggregate')
+
+    counts = Counter()
+    grouped = (
+        Response.objects.filter(question__question_type__in=('SC', 'MC', 'TF', 'RT'))
+        .annotate(date=TruncDate('created_at'))
+        .values_list('date', 'question_id', 'answer')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for date, question_id, answer, count in grouped.iterator():
+        # Each ticked option of a multiple choice answer is counted once
+        options = answer if isinstance(answer, list) else [answer]
+        for label in dict.fromkeys(str(option).strip()[:255] for option in options):
+            counts[(date, question_id, label)] += count
+
+    ResponseDailyAggregate.objects.bulk_create([
+        ResponseDailyAggregate(date=date, question_id=question_id, answer=answer, count=count)
+        for (date, question_id, answer), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0015_question_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseDailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('answer', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.question')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='responsedailyaggregate',
+            constraint=models.UniqueConstraint(fields=('question', 'date', 'answer'), name='response_daily_aggregate_key'),
+        ),
+        migrations.RunPython(fill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:55
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+DIMENSIONS = ('gender', 'ethnicity', 'age', 'country', 'accessibility_needs', 'referral_source')
+
+
+def fill_cube(apps, schema_editor):
+    """Count the participants already stored (same rules as utils.cube.rebuild)"""
+    Participant = apps.get_model('evaluations', 'Participant')
+    ParticipantDailyCube = apps.get_model('evaluations', 'ParticipantDailyCube')
+
+    grouped = (
+        Participant.objects.annotate(date=TruncDate('created_at'))
+        .values_list('date', *DIMENSIONS)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    ParticipantDailyCube.objects.bulk_create([
+        ParticipantDailyCube(count=row[-1], **dict(zip(('date',) + DIMENSIONS, row)))
+        for row in grouped.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0016_response_daily_aggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantDailyCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('gender', models.CharField(max_length=2)),
+                ('ethnicity', models.CharField(max_length=2)),
+                ('age', models.CharField(max_length=7)),
+                ('country', models.CharField(max_length=50)),
+                ('accessibility_needs', models.CharField(max_length=100)),
+                ('referral_source', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='participantdailycube',
+            constraint=models.UniqueConstraint(fields=('date', 'gender', 'ethnicity', 'age', 'country', 'accessibility_needs', 'referral_source'), name='participant_daily_cube_key'),
+        ),
+        migrations.RunPython(fill_cube, migrations.RunPython.noop),
+    ]
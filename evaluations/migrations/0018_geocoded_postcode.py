@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0017_participant_daily_cube'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodedPostcode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('postcode', models.CharField(max_length=10, unique=True)),
+                ('lat', models.FloatField(null=True)),
+                ('lon', models.FloatField(null=True)),
+                ('precision', models.CharField(blank=True, choices=[('postcode', 'Postcode'), ('sector', 'Sector'), ('district', 'District'), ('area', 'Area'), ('', 'Not found')], max_length=8)),
+                ('source', models.CharField(max_length=50)),
+                ('geocoded_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0018_geocoded_postcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseSentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('polarity', models.FloatField()),
+                ('subjectivity', models.FloatField()),
+                ('label', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=8)),
+                ('scorer_version', models.PositiveSmallIntegerField()),
+                ('scored_at', models.DateTimeField(auto_now=True)),
+                ('response', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sentiment', to='evaluations.response')),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 # evaluations/models.py
 from django.db import models
+from django.utils.text import slugify
 from django.contrib.auth.models import User  # Add this import
 
 
@@ -24,6 +25,9 @@ class Question(models.Model):
     
 
     text = models.TextField()
+    # Stable name the dashboard and reports find a question by; unlike the
+    # text it survives rewording in the admin. Filled in from the text on save.
+    key = models.SlugField(max_length=64, unique=True, null=True, blank=True)
     question_type = models.CharField(max_length=2, choices=QUESTION_TYPES)
     options = models.JSONField(null=True, blank=True)
     section = models.CharField(max_length=50)
@@ -31,6 +35,22 @@ class Question(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.unique_key(self.text)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def unique_key(cls, text):
+        """A key made from the first line of the text, not used by another question"""
+        lines = (text or '').strip().splitlines() or ['']
+        base = slugify(lines[0]).replace('-', '_')[:56].strip('_') or 'question'
+        key, n = base, 1
+        while cls.objects.filter(key=key).exists():
+            n += 1
+            key = f'{base}_{n}'
+        return key
+
 class Participant(models.Model):
     GENDER_CHOICES = [('M','Male'),('F','Female'),('NS','Not Specified')]
     ETHNICITY_CHOICES = [
@@ -75,6 +95,8 @@ class Participant(models.Model):
     
     
     session_key = models.CharField(max_length=40)
+    # Idempotency key for spooled, uploaded or imported submissions
+    submission_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
     gender = models.CharField(max_length=2, choices=GENDER_CHOICES, default='NS')
     age = models.CharField(max_length=7,choices=AGE_RANGES, default='18-24')
     #age = models.PositiveIntegerField(null=True)
@@ -88,6 +110,14 @@ class Participant(models.Model):
     books_requested = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Access paths of the dashboard date filters, download_pdf and the map
+        indexes = [
+            models.Index(fields=['created_at'], name='participant_created_idx'),
+            models.Index(fields=['session_key'], name='participant_session_idx'),
+            models.Index(fields=['postcode'], name='participant_postcode_idx'),
+        ]
+
 class Response(models.Model):
     #session_key = models.CharField(max_length=40, default='', null=False)
     participant = models.ForeignKey(Participant, on_delete=models.CASCADE)
@@ -95,12 +125,85 @@ class Response(models.Model):
     answer = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'created_at'], name='response_question_created_idx'),
+            models.Index(fields=['created_at'], name='response_created_idx'),
+        ]
+
 class EvaluationSession(models.Model):
     participant = models.ForeignKey(Participant, on_delete=models.CASCADE)
     completed = models.BooleanField(default=False)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['completed_at'], name='session_completed_idx'),
+        ]
+
+
+class ResponseDailyAggregate(models.Model):
+    """Choice-question answer counts per day, updated with every submission"""
+    date = models.DateField()
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    # Display label of the answer; each multiple choice option is counted separately
+    answer = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'date', 'answer'], name='response_daily_aggregate_key'),
+        ]
+
+
+class ParticipantDailyCube(models.Model):
+    """Participant counts per day and combination of demographic answers"""
+    date = models.DateField()
+    gender = models.CharField(max_length=2)
+    ethnicity = models.CharField(max_length=2)
+    age = models.CharField(max_length=7)
+    country = models.CharField(max_length=50)
+    accessibility_needs = models.CharField(max_length=100)
+    referral_source = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'gender', 'ethnicity', 'age', 'country', 'accessibility_needs', 'referral_source'],
+                name='participant_daily_cube_key',
+            ),
+        ]
+
+
+class GeocodedPostcode(models.Model):
+    """Map position of a postcode participants entered, filled in by `manage.py geocode_postcodes`"""
+    PRECISIONS = [
+        ('postcode', 'Postcode'), ('sector', 'Sector'), ('district', 'District'), ('area', 'Area'),
+        ('', 'Not found'),
+    ]
+    # Participant.postcode upper-cased without spaces; see utils.geocode_cache
+    postcode = models.CharField(max_length=10, unique=True)
+    lat = models.FloatField(null=True)
+    lon = models.FloatField(null=True)
+    # How closely the position matches the postcode, coarser for partial input
+    precision = models.CharField(max_length=8, choices=PRECISIONS, blank=True)
+    source = models.CharField(max_length=50)
+    geocoded_at = models.DateTimeField(auto_now=True)
+
+
+class ResponseSentiment(models.Model):
+    """Sentiment of a free-text Response, filled in by `manage.py score_sentiments`"""
+    LABELS = [('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')]
+    response = models.OneToOneField(Response, on_delete=models.CASCADE, related_name='sentiment')
+    polarity = models.FloatField()
+    subjectivity = models.FloatField()
+    label = models.CharField(max_length=8, choices=LABELS)
+    # utils.sentiment.SCORER_VERSION when scored; older rows are scored again
+    scorer_version = models.PositiveSmallIntegerField()
+    scored_at = models.DateTimeField(auto_now=True)
+
 
 # class Response(models.Model):
 #     user = models.ForeignKey(
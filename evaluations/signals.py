@@ -0,0 +1,41 @@
+# evaluations/signals.py
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Participant, Question, Response
+from .utils.form_cache import bump_question_set_version
+from .utils.data_version import bump_edit_version
+
+_PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+
+
+@receiver(connection_created)
+def apply_sqlite_profile(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if not _PRAGMA_NAME.match(name):
+                raise ValueError(f"Invalid SQLite pragma name: {name!r}")
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, **kwargs):
+    """Any edit to the question set invalidates the cached form"""
+    bump_question_set_version()
+
+
+@receiver(post_save, sender=Participant)
+@receiver(post_save, sender=Response)
+def submission_edited(sender, created, **kwargs):
+    """Saving an existing row makes incrementally loaded frames of its table reload"""
+    if not created:
+        bump_edit_version(sender)
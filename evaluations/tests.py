@@ -1,3 +1,977 @@
-from django.test import TestCase
+import datetime
+import importlib
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.apps import apps as django_apps
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .models import (
+    Question, Response, Participant, EvaluationSession, ResponseDailyAggregate, ParticipantDailyCube,
+    GeocodedPostcode, ResponseSentiment,
+)
+from .utils.analytics import DuckDBEngine, OrmEngine
+from .utils.cube import DemographicCube
+from .utils.data_version import data_version
+from .utils.date_range import in_date_range
+from .utils.form_cache import CSRF_PLACEHOLDER
+from .utils.form_schema import build_form_schema
+from .utils.geocode_cache import geocode_version, missing_postcodes
+from .utils.geocoder import LEVELS, PostcodeGeocoder, postcode_keys
+from .utils.incremental import IncrementalTable
+from .utils.query_plans import table_scans
+from .utils.question_registry import QuestionRegistry
+from .utils.rollup import answer_totals, daily_totals
+from .utils.sentiment import unscored_responses
+from .utils.snapshot import load_snapshot
+from .utils.spatial_bins import bin_points
+from .utils.spool import get_spool
+from .utils.submissions import active_question_map, ingest_batch, save_submission, save_submissions
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+def scratch_cache(test_case, **options):
+    """Point the default cache at a throwaway tiered cache file for one test"""
+    tmpdir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmpdir.cleanup)
+    cache_settings = override_settings(CACHES={'default': {
+        'BACKEND': 'evaluations.utils.tiered_cache.TieredCache',
+        'LOCATION': os.path.join(tmpdir.name, 'cache.db'),
+        'OPTIONS': options,
+    }})
+    cache_settings.enable()
+    test_case.addCleanup(cache_settings.disable)
+
+
+class ScratchCacheMixin:
+    """Gives every test its own cache file, away from the development cache and other tests"""
+
+    def setUp(self):
+        super().setUp()
+        scratch_cache(self)
+
+
+# The views run their ORM work on a thread pool, so tests that go through
+# them need real commits rather than TestCase's wrapping transaction.
+class EvaluationFormSubmissionTests(ScratchCacheMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.questions = [
+            Question.objects.create(text=f"Question {i}", question_type='TX', section='post_event')
+            for i in range(5)
+        ]
+        self.inactive = Question.objects.create(
+            text="Retired question", question_type='TX', section='post_event', is_active=False
+        )
+
+    def post_form(self, **extra):
+        data = {'gender': 'F', 'ethnicity': 'C', 'age': '25-34', 'postcode': 'SW2 1AA'}
+        data.update({f'q_{q.id}': f"answer {q.id}" for q in self.questions})
+        data.update(extra)
+        return self.client.post('/', data)
+
+    def test_submission_writes_participant_responses_and_session(self):
+        response = self.post_form()
+
+        self.assertEqual(response.status_code, 302)
+        participant = Participant.objects.get()
+        self.assertEqual(participant.gender, 'F')
+        self.assertEqual(Response.objects.filter(participant=participant).count(), len(self.questions))
+        self.assertTrue(EvaluationSession.objects.get(participant=participant).completed)
+
+    def test_unknown_and_inactive_questions_are_skipped(self):
+        self.post_form(**{'q_99999': 'ghost', f'q_{self.inactive.id}': 'old', 'q_abc': 'junk'})
+
+        self.assertEqual(Response.objects.count(), len(self.questions))
+        self.assertFalse(Response.objects.filter(question=self.inactive).exists())
+
+    def test_responses_are_written_with_one_insert(self):
+        data = {f'q_{q.id}': f"answer {q.id}" for q in self.questions}
+        with CaptureQueriesContext(connection) as queries:
+            save_submission('kiosk-1', data)
+
+        response_inserts = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('INSERT INTO "evaluations_response"')
+        ]
+        question_reads = [
+            q for q in queries.captured_queries
+            if 'FROM "evaluations_question"' in q['sql']
+        ]
+        self.assertEqual(len(response_inserts), 1)
+        self.assertEqual(len(question_reads), 1)
+
+    def test_answers_are_stored_as_native_json(self):
+        events = Question.objects.create(
+            text="What events interest you?", question_type='MC', section='pre_event',
+            options=["Workshops", "Lectures", "Exhibitions"]
+        )
+        speaker = Question.objects.create(text="Keynote speaker", question_type='RT', section='post_event')
+
+        self.client.post('/', {
+            f'q_{events.id}': ["Workshops", "Lectures"],
+            f'q_{speaker.id}': "4",
+            f'q_{self.questions[0].id}': "Great day",
+        })
+
+        self.assertEqual(Response.objects.get(question=events).answer, ["Workshops", "Lectures"])
+        self.assertEqual(Response.objects.get(question=speaker).answer, 4)
+        self.assertEqual(Response.objects.get(question=self.questions[0]).answer, "Great day")
+        self.assertEqual(Response.objects.filter(answer="Great day").count(), 1)
+
+
+class FormCacheTests(ScratchCacheMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        Question.objects.create(text="Would you attend another event?", question_type='SC',
+                                section='post_event', options=["Yes", "No"])
+
+    def test_form_is_served_with_caching_headers_and_a_real_csrf_token(self):
+        response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertIn('Last-Modified', response)
+        self.assertNotIn(CSRF_PLACEHOLDER, response.content.decode())
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+
+    def test_reload_is_answered_with_304(self):
+        etag = self.client.get('/')['ETag']
+
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_question_change_invalidates_the_cached_form(self):
+        etag = self.client.get('/')['ETag']
+
+        Question.objects.create(text="Which sessions did you find most valuable?", question_type='TX',
+                                section='post_event')
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, "Which sessions did you find most valuable?")
+
+
+class QuestionRegistryTests(ScratchCacheMixin, TestCase):
+    def test_keys_are_made_unique_from_the_text(self):
+        first = Question.objects.create(text="What could we improve?\n(up to 500 words)", question_type='TX',
+                                        section='post_event')
+        second = Question.objects.create(text="What could we improve?", question_type='TX', section='post_event')
+
+        self.assertEqual(first.key, 'what_could_we_improve')
+        self.assertEqual(second.key, 'what_could_we_improve_2')
+
+    def test_registry_loads_once_and_follows_question_changes(self):
+        registry = QuestionRegistry()
+        question = Question.objects.create(text="Would you recommend this event to a friend?", key='recommend_event',
+                                           question_type='SC', section='post_event', options=["Yes", "No"])
+        self.assertEqual(registry.get('recommend_event'), question)
+
+        with self.assertNumQueries(0):
+            registry.get('recommend_event')
+            registry.active_map()
+
+        question.is_active = False
+        question.save()
+        self.assertEqual(registry.active(), [])
+        self.assertIsNone(registry.find('missing'))
+        with self.assertRaises(Question.DoesNotExist):
+            registry.get('missing')
+
+
+class TieredCacheTests(ScratchCacheMixin, TestCase):
+    def test_set_get_add_delete(self):
+        cache.set('colour', ['gold', 'blue'])
+
+        self.assertEqual(cache.get('colour'), ['gold', 'blue'])
+        self.assertFalse(cache.add('colour', 'red'))
+        self.assertTrue(cache.add('shape', 'square'))
+        self.assertTrue(cache.delete('colour'))
+        self.assertIsNone(cache.get('colour'))
+
+    def test_per_key_ttl(self):
+        cache.set('short', 1, timeout=0)
+        cache.set('forever', 2, timeout=None)
+
+        self.assertIsNone(cache.get('short'))
+        self.assertEqual(cache.get('forever'), 2)
+        self.assertTrue(cache.add('short', 3))
+
+    def test_writes_from_another_process_are_read_from_l2(self):
+        scratch_cache(self, L1_TTL=0)
+        cache.set('version', 1)
+        # Stand-in for another worker writing straight to the shared file
+        cache._db.execute(
+            'UPDATE cache SET value = ? WHERE key = ?',
+            (pickle.dumps(2), cache.make_and_validate_key('version'))
+        )
+
+        self.assertEqual(cache.get('version'), 2)
+
+    def test_size_based_eviction_and_counters(self):
+        scratch_cache(self, L1_MAX_BYTES=2000, MAX_BYTES=5000)
+        for i in range(10):
+            cache.set(f'blob-{i}', 'x' * 900)
+        cache.cull()
+        cache.get('blob-9')
+        cache.get('missing')
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['l2_bytes'], 5000)
+        self.assertLessEqual(stats['l1_bytes'], 2000)
+        self.assertGreater(stats['totals']['l1_evictions'], 0)
+        self.assertGreater(stats['totals']['l2_evictions'], 0)
+        self.assertEqual(stats['totals']['l1_hits'], 1)
+        self.assertEqual(stats['totals']['misses'], 1)
+
+    def test_admin_page_shows_counters(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+
+        response = self.client.get('/admin/cache-stats/')
+
+        self.assertContains(response, 'L1 hits')
+
+
+class AsyncViewTests(ScratchCacheMixin, TransactionTestCase):
+    async def test_validate_field_checks_age_ranges(self):
+        valid = await self.async_client.post('/api/validate-field/', {'field': 'age', 'value': '25-34'})
+        invalid = await self.async_client.post('/api/validate-field/', {'field': 'age', 'value': '42'})
+
+        self.assertEqual(valid.json(), {'valid': True})
+        self.assertFalse(invalid.json()['valid'])
+
+    def test_form_schema_is_served_immutable_under_its_hash(self):
+        question = Question.objects.create(text="Would you attend another event?", question_type='SC',
+                                           section='post_event', options=["Yes", "No"])
+
+        stale = self.client.get('/form-schema/0000000000000000.json')
+        response = self.client.get(stale['Location'])
+
+        self.assertEqual(stale.status_code, 302)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.json()['fields'][f'q_{question.id}']['choices'], ["Yes", "No"])
+
+    def test_validate_page_checks_every_field_in_one_request(self):
+        question = Question.objects.create(text="Which sessions did you attend?", question_type='MC',
+                                           section='post_event', options=["Talks", "Workshops"])
+
+        response = self.client.post('/api/validate-page/', {'fields': {
+            'age': '42', 'gender': 'M', f'q_{question.id}': ["Talks", "Dancing"],
+        }}, content_type='application/json')
+
+        self.assertEqual(response.json(), {'valid': False, 'errors': {
+            'age': 'Please select a valid age range',
+            f'q_{question.id}': 'Please select a valid option',
+        }})
+
+    def test_download_pdf_for_latest_submission(self):
+        question = Question.objects.create(text="What could we improve?", question_type='TX', section='post_event')
+        save_submission('kiosk-1', {f'q_{question.id}': "Earlier start"})
+        save_submission('kiosk-1', {f'q_{question.id}': "More breaks"})
+
+        response = self.client.get('/download-pdf/kiosk-1/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(self.client.get('/download-pdf/unknown/').status_code, 404)
+
+
+class BulkSubmissionTests(ScratchCacheMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text="Would you attend another event?", question_type='SC',
+                                                section='post_event', options=["Yes", "No"])
+
+    def upload(self, submissions):
+        return self.client.post('/api/submissions/', {'submissions': submissions}, content_type='application/json')
+
+    def test_batch_is_stored_with_a_result_per_submission(self):
+        field = f'q_{self.question.id}'
+        response = self.upload([
+            {'submission_key': 'tablet-3-0001', 'fields': {'age': '25-34', field: "Yes"}},
+            {'submission_key': 'tablet-3-0002', 'fields': {'age': '42', field: "Yes"}},
+            {'fields': {field: "No"}},
+        ])
+
+        body = response.json()
+        self.assertEqual((body['created'], body['duplicate'], body['rejected']), (1, 0, 2))
+        self.assertEqual([r['status'] for r in body['results']], ['created', 'rejected', 'rejected'])
+        self.assertEqual(body['results'][1]['errors'], {'age': 'Please select a valid age range'})
+        participant = Participant.objects.get(submission_key='tablet-3-0001')
+        self.assertEqual(participant.session_key, 'tablet-3-0001')
+        self.assertEqual(Response.objects.get(participant=participant).answer, "Yes")
+
+    def test_retried_batch_is_not_stored_twice(self):
+        batch = [{'submission_key': f'tablet-4-{i:04}', 'fields': {'gender': 'F'}} for i in range(3)]
+        first = self.upload(batch).json()
+
+        retry = self.upload(batch + [{'submission_key': 'tablet-4-0003', 'fields': {}}]).json()
+
+        self.assertEqual(retry['created'], 1)
+        self.assertEqual(retry['duplicate'], 3)
+        self.assertEqual([r['participant_id'] for r in retry['results'][:3]],
+                         [r['participant_id'] for r in first['results']])
+        self.assertEqual(Participant.objects.count(), 4)
+        self.assertEqual(EvaluationSession.objects.count(), 4)
+
+    def test_racing_uploads_of_the_same_keys(self):
+        questions = active_question_map()
+        schema = build_form_schema(questions.values())
+        workers = 8
+        start = threading.Barrier(workers)
+
+        def upload(_):
+            # Every thread sends the same ten keys, one call each, on its own connection
+            start.wait()
+            try:
+                return [result['status']
+                        for n in range(10)
+                        for result in ingest_batch([{'submission_key': f'tablet-6-{n:04}', 'fields': {'gender': 'F'}}],
+                                                   schema, questions)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = [status for batch in pool.map(upload, range(workers)) for status in batch]
+
+        self.assertEqual(statuses.count('created'), 10)
+        self.assertEqual(statuses.count('duplicate'), 70)
+        self.assertEqual(Participant.objects.count(), 10)
+
+    def test_locked_database_is_reported_per_submission(self):
+        with mock.patch('evaluations.utils.submissions.write_submissions',
+                        side_effect=OperationalError('database is locked')):
+            response = self.upload([{'submission_key': 'tablet-7-0001', 'fields': {'gender': 'F'}},
+                                    {'fields': {'gender': 'M'}}])
+
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in body['results']], ['busy', 'rejected'])
+        self.assertEqual(body['busy'], 1)
+        self.assertFalse(Participant.objects.exists())
+
+
+class NativeAnswerMigrationTests(ScratchCacheMixin, TestCase):
+    def test_legacy_answers_get_the_submitted_types(self):
+        rating = Question.objects.create(text="How would you rate the speakers?", question_type='RT',
+                                         section='post_event')
+        sessions = Question.objects.create(text="Which sessions did you find most valuable?",
+                                           question_type='MC', section='post_event', options=["Talks", "Music"])
+        participant = Participant.objects.create(session_key='kiosk-1')
+        # As the old view stored them: json.dumps() text inside the JSON column
+        legacy = {
+            'rating': Response.objects.create(participant=participant, question=rating, answer='"4"'),
+            'float rating': Response.objects.create(participant=participant, question=rating, answer=3.0),
+            'choice': Response.objects.create(participant=participant, question=sessions, answer='"Talks"'),
+            'choices': Response.objects.create(participant=participant, question=sessions,
+                                               answer='["Talks", "Music"]'),
+        }
+
+        migration = importlib.import_module('evaluations.migrations.0012_native_json_answers')
+        migration.decode_answers(django_apps, None)
+
+        answers = {name: Response.objects.get(id=response.id).answer for name, response in legacy.items()}
+        self.assertEqual(answers, {'rating': 4, 'float rating': 3, 'choice': ["Talks"],
+                                   'choices': ["Talks", "Music"]})
+        self.assertIs(type(answers['float rating']), int)
+
+
+class ImportSubmissionsTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text="Which sessions did you attend?", question_type='MC',
+                                                section='post_event', options=["Talks", "Workshops", "Music"])
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'paper_forms.csv')
+        with open(self.path, 'w', newline='') as f:
+            f.write(f"Age range,gender,{self.question.id}\n")
+            f.write("25-34,F,Talks;Music\n")
+            f.write("42,M,Talks\n")
+            f.write("45-54,NS,Workshops\n")
+
+    def import_file(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_submissions', self.path, '--map', 'Age range=age', '--chunk-size', '1', *args,
+                     stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_rows_are_mapped_validated_and_imported(self):
+        out, err = self.import_file()
+
+        self.assertIn("Imported 2 submissions (0 already imported, 1 rejected)", out)
+        self.assertIn("Row 2:", err)
+        participant = Participant.objects.get(age='25-34')
+        self.assertEqual(participant.gender, 'F')
+        self.assertEqual(Response.objects.get(participant=participant).answer, ["Talks", "Music"])
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_import_resumes_from_checkpoint_and_never_duplicates(self):
+        self.import_file()
+        with open(f'{self.path}.checkpoint', 'w') as f:
+            json.dump({'fingerprint': 'from-an-older-file', 'rows': 1}, f)
+        with self.assertRaises(CommandError):
+            self.import_file()
+
+        with open(f'{self.path}.checkpoint', 'w') as f:
+            json.dump({'fingerprint': self.fingerprint(), 'rows': 2}, f)
+        out, _ = self.import_file()
+
+        self.assertIn("Resuming after 2 rows", out)
+        self.assertIn("Imported 0 submissions (1 already imported, 0 rejected)", out)
+        self.assertEqual(Participant.objects.count(), 2)
+
+    def test_corrected_file_reimports_only_the_changed_rows(self):
+        self.import_file()
+        with open(self.path, 'w', newline='') as f:
+            f.write(f"Age range,gender,{self.question.id}\n")
+            f.write("25-34,F,Talks;Music\n")
+            f.write("35-44,M,Talks\n")
+            f.write("45-54,NS,Workshops\n")
+
+        out, _ = self.import_file('--restart')
+
+        self.assertIn("Imported 1 submissions (2 already imported, 0 rejected)", out)
+        self.assertEqual(Participant.objects.count(), 3)
+
+    def test_unreadable_jsonl_lines_are_rejected_and_skipped(self):
+        self.path = os.path.join(os.path.dirname(self.path), 'paper_forms.jsonl')
+        with open(self.path, 'w') as f:
+            f.write(json.dumps({'age': '25-34', str(self.question.id): ["Talks"]}) + "\n")
+            f.write('{"age": "45-54", \n')
+            f.write("[1, 2]\n")
+            f.write(json.dumps({'age': '45-54', 'gender': 'F'}) + "\n")
+
+        out, err = self.import_file()
+
+        self.assertIn("Imported 2 submissions (0 already imported, 2 rejected)", out)
+        self.assertIn("Row 2: {\"row\": \"Not valid JSON", err)
+        self.assertIn("Row 3: {\"row\": \"Expected a JSON object", err)
+        self.assertEqual(Participant.objects.count(), 2)
+
+    def fingerprint(self):
+        from .management.commands.import_submissions import Command
+        return Command().fingerprint(self.path)
+
+
+class ResponseRollupTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.recommend = Question.objects.create(text="Would you recommend this event to a friend?",
+                                                 question_type='SC', section='post_event', options=["Yes", "No"])
+        self.sessions = Question.objects.create(text="Which sessions did you find most valuable?",
+                                                question_type='MC', section='post_event',
+                                                options=["Talks", "Music"])
+        self.comments = Question.objects.create(text="What could we improve?", question_type='TX',
+                                                section='post_event')
+
+    def submit(self, recommend, sessions):
+        save_submission('kiosk-1', {
+            f'q_{self.recommend.id}': recommend,
+            f'q_{self.sessions.id}': sessions,
+            f'q_{self.comments.id}': "Longer breaks",
+        })
+
+    def test_submissions_update_the_daily_counts(self):
+        self.submit("Yes", ["Talks", "Music"])
+        self.submit("Yes", ["Talks"])
+        self.submit("No", ["Talks", "Music"])
+        today = datetime.date.today()
+
+        self.assertEqual(answer_totals(self.recommend, today, today), [("Yes", 2), ("No", 1)])
+        # Two-option answers count once towards each option
+        self.assertEqual(answer_totals(self.sessions, today, today), [("Talks", 3), ("Music", 2)])
+        self.assertEqual(daily_totals(self.recommend, today, today, answer="Yes"), [(today, 2)])
+        self.assertFalse(ResponseDailyAggregate.objects.filter(question=self.comments).exists())
+
+    def test_rebuild_matches_the_incremental_counts(self):
+        self.submit("Yes", ["Talks"])
+        self.submit("No", ["Talks", "Music"])
+        incremental = set(ResponseDailyAggregate.objects.values_list('date', 'question', 'answer', 'count'))
+        ResponseDailyAggregate.objects.update(count=0)
+
+        out = StringIO()
+        call_command('rebuild_response_rollup', stdout=out)
+
+        self.assertIn("Rebuilt 4 daily answer counts", out.getvalue())
+        self.assertEqual(set(ResponseDailyAggregate.objects.values_list('date', 'question', 'answer', 'count')),
+                         incremental)
+
+    def test_migration_backfill_counts_each_option(self):
+        self.submit("Yes", ["Talks", "Music"])
+        self.submit("No", ["Music"])
+        incremental = set(ResponseDailyAggregate.objects.values_list('date', 'question', 'answer', 'count'))
+        ResponseDailyAggregate.objects.all().delete()
+
+        migration = importlib.import_module('evaluations.migrations.0016_response_daily_aggregate')
+        migration.fill_rollup(django_apps, None)
+
+        self.assertEqual(set(ResponseDailyAggregate.objects.values_list('date', 'question', 'answer', 'count')),
+                         incremental)
+        self.assertEqual(dict(answer_totals(self.sessions, datetime.date.today(), datetime.date.today())),
+                         {"Music": 2, "Talks": 1})
+
+
+class DemographicCubeTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for gender, age, referral in [('F', '25-34', 'email'), ('F', '25-34', 'radio'), ('M', '65-74', 'email')]:
+            save_submission('kiosk-1', {'gender': gender, 'age': age, 'ethnicity': 'C', 'referral_source': referral})
+        self.today = datetime.date.today()
+
+    def test_submissions_are_counted_and_rolled_up(self):
+        cube = DemographicCube.load(self.today, self.today)
+
+        self.assertEqual(cube.total(), 3)
+        self.assertEqual(cube.rollup('gender'), [{'gender': 'F', 'count': 2}, {'gender': 'M', 'count': 1}])
+        self.assertEqual(cube.slice(referral_source='email').rollup('gender', 'age'), [
+            {'gender': 'F', 'age': '25-34', 'count': 1},
+            {'gender': 'M', 'age': '65-74', 'count': 1},
+        ])
+        self.assertEqual(cube.slice(age=['25-34', '35-44']).total(), 2)
+        self.assertEqual(DemographicCube.load(self.today - datetime.timedelta(days=7),
+                                              self.today - datetime.timedelta(days=1)).total(), 0)
+
+    def test_rebuild_matches_the_incremental_cube(self):
+        incremental = DemographicCube.load(self.today, self.today).cells
+        ParticipantDailyCube.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_demographic_cube', '--since', self.today.isoformat(), stdout=out)
+
+        self.assertIn("Rebuilt 3 demographic cube cells", out.getvalue())
+        self.assertEqual(DemographicCube.load(self.today, self.today).cells, incremental)
+
+
+class AnalyticsEngineTests(ScratchCacheMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recommend = Question.objects.create(text="Would you recommend this event to a friend?",
+                                                 question_type='SC', section='post_event', options=["Yes", "No"])
+        self.comments = Question.objects.create(text="What could we improve?", question_type='TX',
+                                                section='post_event')
+        for gender, postcode, recommend, comment in [('F', 'SW2 1AA', "Yes", "Longer breaks"),
+                                                     ('M', 'SW2 1AA', "Yes", "More music"),
+                                                     ('F', '', "No", "Longer breaks")]:
+            save_submission('kiosk-1', {'gender': gender, 'postcode': postcode,
+                                        f'q_{self.recommend.id}': recommend, f'q_{self.comments.id}': comment})
+        GeocodedPostcode.objects.create(postcode='SW21AA', lat=51.45, lon=-0.12, precision='postcode',
+                                        source='test')
+        call_command('score_sentiments', '--once', stdout=StringIO())
+        self.today = datetime.date.today()
+
+    def results(self, engine):
+        return {
+            'answer_totals': engine.answer_totals(self.recommend.id, self.today, self.today),
+            'daily_totals': engine.daily_totals(self.recommend.id, self.today, self.today, answer="Yes"),
+            'answer_counts': engine.answer_counts(self.comments.id, self.today, self.today),
+            'cube_cells': engine.cube_cells(self.today, self.today),
+            'completion': engine.completion(self.today, self.today),
+            'map_cells': engine.map_cells(self.today, self.today),
+            'sentiment_counts': engine.sentiment_counts(self.comments.id, self.today, self.today),
+        }
+
+    def test_orm_engine(self):
+        results = self.results(OrmEngine())
+
+        self.assertEqual(results['answer_totals'], [("Yes", 2), ("No", 1)])
+        self.assertEqual(results['daily_totals'], [(self.today, 2)])
+        self.assertEqual(results['answer_counts'], [("Longer breaks", 2), ("More music", 1)])
+        self.assertEqual(sum(results['cube_cells'].values()), 3)
+        self.assertEqual(results['completion'], (3, 3))
+        self.assertEqual(results['map_cells'], {
+            ('SW21AA', 51.45, -0.12, 'postcode', '12-17', 'F', 'NS'): 1,
+            ('SW21AA', 51.45, -0.12, 'postcode', '12-17', 'M', 'NS'): 1,
+        })
+        self.assertEqual(results['sentiment_counts'], [("neutral", 2), ("positive", 1)])
+
+    @skipUnless(duckdb, "duckdb is not installed")
+    def test_duckdb_engine_matches_the_orm(self):
+        # DuckDB reads a file, so copy the in-memory test database into one
+        path = os.path.join(tempfile.mkdtemp(), 'analytics.db')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with sqlite3.connect(path) as copy:
+            connection.connection.backup(copy)
+        try:
+            engine = DuckDBEngine(path, extension=settings.EVALUATION_DUCKDB_SQLITE_EXTENSION)
+        except duckdb.Error as e:
+            self.skipTest(f"DuckDB sqlite extension unavailable: {e}")
+
+        self.assertEqual(self.results(engine), self.results(OrmEngine()))
+
+
+class DataVersionTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.participant = save_submission('kiosk-1', {'gender': 'F'})
+
+    def test_version_moves_only_when_data_changes(self):
+        with self.assertNumQueries(1):
+            version = data_version()
+        self.assertEqual(data_version(), version)
+
+        changes = [
+            lambda: save_submission('kiosk-1', {'gender': 'M'}),
+            lambda: Participant.objects.filter(gender='M').delete(),
+            lambda: self.participant.save(),
+        ]
+        for change in changes:
+            change()
+            self.assertNotEqual(data_version(), version)
+            version = data_version()
+
+
+class IncrementalTableTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        save_submission('kiosk-1', {'gender': 'F'})
+        self.participants = IncrementalTable(Participant)
+        self.loaded = self.participants.refresh()
+
+    def test_new_rows_are_appended_without_a_reload(self):
+        self.assertIs(self.participants.refresh(), self.loaded)
+
+        save_submission('kiosk-1', {'gender': 'M'})
+        frame = self.participants.refresh()
+
+        self.assertEqual(list(frame['gender']), ['F', 'M'])
+        self.assertEqual(self.participants.full_loads, 1)
+
+    def test_deletes_and_edits_force_a_full_reload(self):
+        second = save_submission('kiosk-1', {'gender': 'M'})
+        self.participants.refresh()
+
+        second.delete()
+        self.assertEqual(list(self.participants.refresh()['gender']), ['F'])
+        self.assertEqual(self.participants.full_loads, 2)
+
+        first = Participant.objects.get()
+        first.gender = 'NS'
+        first.save()
+        self.assertEqual(list(self.participants.refresh()['gender']), ['NS'])
+        self.assertEqual(self.participants.full_loads, 3)
+
+
+class PostcodeGeocoderTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, 'onspd.csv')
+        with open(source, 'w') as f:
+            f.write("pcds,lat,long\n"
+                    "SW1A 1AA,51.5010,-0.1416\n"
+                    "SW1A 2AA,51.5034,-0.1276\n"
+                    "SW9 8AA,51.4700,-0.1100\n"
+                    "N18 1AA,51.6100,-0.0600\n"
+                    "N18 2AA,51.6200,-0.0700\n"
+                    "ZZ99 9ZZ,99.999999,0.000000\n"
+                    "not a postcode,51.0,0.0\n")
+        self.index = os.path.join(directory, 'index')
+        out = StringIO()
+        call_command('build_postcode_index', source, '--output', self.index, stdout=out)
+        self.assertIn("Indexed 5 postcodes", out.getvalue())
+        self.assertIn("skipped 2 rows", out.getvalue())
+        self.geocoder = PostcodeGeocoder(self.index)
+
+    def test_postcode_keys(self):
+        self.assertEqual(postcode_keys(" sw1a 1aa"), ("SW1A1AA", "SW1A 1", "SW1A", "SW"))
+        self.assertEqual(postcode_keys("n18"), ("", "", "N18", "N"))
+        self.assertEqual(postcode_keys("N1 1"), ("", "N1 1", "N1", "N"))
+        self.assertEqual(postcode_keys("London"), ("", "", "", ""))
+
+    def test_column_lookup_falls_back_to_coarser_centroids(self):
+        lat, lon, level = self.geocoder.lookup(["sw1a1aa", "SW1A 2ZZ", "n18", "SW2 4XX", "London", None, "sw1a1aa"])
+
+        self.assertEqual([LEVELS[n] if n >= 0 else None for n in level],
+                         ['postcode', 'sector', 'district', 'area', None, None, 'postcode'])
+        self.assertAlmostEqual(lat[0], 51.5010, places=4)
+        self.assertAlmostEqual(lat[1], 51.5034, places=4)
+        self.assertAlmostEqual(lon[2], -0.0650, places=4)
+        self.assertAlmostEqual(lat[3], (51.5010 + 51.5034 + 51.4700) / 3, places=4)
+        self.assertTrue(np.isnan(lat[4]) and np.isnan(lat[5]))
+        self.assertIsNone(self.geocoder.geocode("XX1 1XX"))
+
+
+class GeocodedPostcodeTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, 'onspd.csv')
+        with open(source, 'w') as f:
+            f.write("pcds,lat,long\n"
+                    "SW1A 1AA,51.5010,-0.1416\n"
+                    "N18 1AA,51.6100,-0.0600\n")
+        self.index = os.path.join(directory, 'index')
+        call_command('build_postcode_index', source, '--output', self.index, stdout=StringIO())
+        for number, postcode in enumerate(["sw1a 1aa", "SW1A1AA", "N18 9ZZ", "London", ""]):
+            Participant.objects.create(session_key=f'kiosk-{number}', postcode=postcode)
+
+    def test_missing_postcodes_are_stored_once(self):
+        self.assertEqual(list(missing_postcodes()), ["LONDON", "N189ZZ", "SW1A1AA"])
+        with self.settings(EVALUATION_POSTCODE_INDEX=self.index):
+            call_command('geocode_postcodes', '--once', '--batch-size', '2', stdout=StringIO())
+
+        rows = {row.postcode: row for row in GeocodedPostcode.objects.all()}
+        self.assertEqual(set(rows), {"LONDON", "N189ZZ", "SW1A1AA"})
+        self.assertEqual(rows["SW1A1AA"].precision, 'postcode')
+        self.assertAlmostEqual(rows["SW1A1AA"].lat, 51.5010, places=4)
+        self.assertEqual(rows["N189ZZ"].precision, 'district')
+        # Unresolved postcodes keep a row so they are not retried every pass
+        self.assertEqual(rows["LONDON"].precision, '')
+        self.assertIsNone(rows["LONDON"].lat)
+        self.assertEqual(list(missing_postcodes()), [])
+
+        Participant.objects.create(session_key='kiosk-new', postcode="N18 1AA")
+        version = geocode_version()
+        with self.settings(EVALUATION_POSTCODE_INDEX=self.index):
+            call_command('geocode_postcodes', '--once', stdout=StringIO())
+        self.assertEqual(GeocodedPostcode.objects.get(postcode="N181AA").precision, 'postcode')
+        self.assertNotEqual(geocode_version(), version)
+
+    def test_missing_index_is_a_command_error(self):
+        with self.settings(EVALUATION_POSTCODE_INDEX=os.path.join(self.index, 'missing')):
+            with self.assertRaises(CommandError):
+                call_command('geocode_postcodes', '--once', stdout=StringIO())
+
+
+class ResponseSentimentTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.comments = Question.objects.create(text="What could we improve?", question_type='TX',
+                                                section='post_event')
+        self.recommend = Question.objects.create(text="Would you recommend this event to a friend?",
+                                                 question_type='SC', section='post_event', options=["Yes", "No"])
+        for comment in ["Wonderful, inspiring talks", "Terrible sound, awful queue", "Longer breaks"]:
+            save_submission('kiosk-1', {f'q_{self.comments.id}': comment, f'q_{self.recommend.id}': "Yes"})
+
+    def test_text_responses_are_scored_once(self):
+        self.assertEqual(unscored_responses().count(), 3)
+        call_command('score_sentiments', '--once', '--batch-size', '2', stdout=StringIO())
+
+        labels = dict(ResponseSentiment.objects.values_list('response__answer', 'label'))
+        self.assertEqual(labels, {"Wonderful, inspiring talks": 'positive',
+                                  "Terrible sound, awful queue": 'negative',
+                                  "Longer breaks": 'neutral'})
+        self.assertEqual(unscored_responses().count(), 0)
+
+        out = StringIO()
+        call_command('score_sentiments', '--once', stdout=out)
+        self.assertEqual(out.getvalue(), "")
+
+    def test_new_scorer_version_rescores(self):
+        call_command('score_sentiments', '--once', stdout=StringIO())
+        with mock.patch('evaluations.utils.sentiment.SCORER_VERSION', 2):
+            self.assertEqual(unscored_responses().count(), 3)
+            call_command('score_sentiments', '--once', stdout=StringIO())
+            self.assertEqual(unscored_responses().count(), 0)
+        self.assertEqual(ResponseSentiment.objects.count(), 3)
+        self.assertEqual(set(ResponseSentiment.objects.values_list('scorer_version', flat=True)), {2})
+
+    def test_scores_are_dropped_when_a_question_stops_being_text(self):
+        call_command('score_sentiments', '--once', stdout=StringIO())
+        self.comments.question_type = 'SC'
+        self.comments.save()
+        today = datetime.date.today()
+
+        self.assertEqual(OrmEngine().sentiment_counts(self.comments.id, today, today), [])
+        out = StringIO()
+        call_command('score_sentiments', '--once', stdout=out)
+        self.assertIn("Deleted 3 scores", out.getvalue())
+        self.assertFalse(ResponseSentiment.objects.exists())
+
+
+class SpatialBinsTests(TestCase):
+    # Two postcodes ~700 m apart in Westminster and one in Edmonton
+    lat = [51.5010, 51.5034, 51.6100]
+    lon = [-0.1416, -0.1276, -0.0600]
+
+    def test_cells_follow_the_zoom(self):
+        lat, lon, count, group = bin_points(self.lat, self.lon, [3, 4, 5], zoom=7)
+        self.assertEqual(sorted(count), [12])
+        self.assertIsNone(group)
+
+        lat, lon, count, _ = bin_points(self.lat, self.lon, [3, 4, 5], zoom=14)
+        self.assertEqual(sorted(count), [3, 4, 5])
+        # Cell centres stay within a cell of the points
+        self.assertTrue(np.allclose(sorted(lat), sorted(self.lat), atol=0.01))
+        self.assertTrue(np.allclose(sorted(lon), sorted(self.lon), atol=0.02))
+
+    def test_groups_and_minimum_count(self):
+        lat, lon, count, group = bin_points(self.lat, self.lon, [3, 4, 5], zoom=12, groups=[0, 1, 0], min_count=4)
+        self.assertEqual(sorted(zip(group, count)), [(0, 5), (1, 4)])
+        self.assertEqual(len(bin_points([], [], [], zoom=7)[2]), 0)
+
+
+class SnapshotTests(ScratchCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sessions = Question.objects.create(text="Which sessions did you find most valuable?",
+                                                question_type='MC', section='post_event',
+                                                options=["Talks", "Music"])
+        for gender, sessions in [('F', ["Talks", "Music"]), ('M', ["Talks"])]:
+            save_submission('kiosk-1', {'gender': gender, 'age': '25-34', f'q_{self.sessions.id}': sessions})
+        self.today = datetime.date.today()
+
+    def test_tables_load_with_compact_dtypes(self):
+        snapshot = load_snapshot(self.today, self.today)
+
+        self.assertEqual(len(snapshot.participants), 2)
+        self.assertEqual(str(snapshot.participants['gender'].dtype), 'category')
+        self.assertEqual(list(snapshot.participants['gender'].cat.categories[:2]), ['M', 'F'])
+        self.assertTrue(str(snapshot.responses['created_at'].dtype).startswith('datetime64'))
+        self.assertEqual(sorted(snapshot.answers(self.sessions)['answer']), ["Talks", "Talks, Music"])
+        self.assertTrue(snapshot.sessions['completed'].all())
+        self.assertEqual(len(load_snapshot(self.today - datetime.timedelta(days=7),
+                                           self.today - datetime.timedelta(days=1)).responses), 0)
+
+    def test_data_version_moves_on_with_each_submission(self):
+        version = data_version()
+        self.assertEqual(load_snapshot(self.today, self.today).version, version)
+
+        save_submission('kiosk-1', {'gender': 'F', f'q_{self.sessions.id}': ["Music"]})
+
+        self.assertNotEqual(data_version(), version)
+
+
+class SubmissionSpoolTests(ScratchCacheMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.question = Question.objects.create(text="What could we improve?", question_type='TX', section='post_event')
+        spool_settings = override_settings(
+            EVALUATION_INGEST_MODE='spool',
+            EVALUATION_SPOOL_PATH=os.path.join(self.tmpdir.name, 'spool.db'),
+        )
+        spool_settings.enable()
+        self.addCleanup(spool_settings.disable)
+
+    def drain(self):
+        call_command('drain_submissions', once=True, stdout=StringIO())
+
+    def test_submission_is_spooled_then_drained(self):
+        response = self.client.post('/', {'gender': 'M', f'q_{self.question.id}': "More seating"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Participant.objects.exists())
+        self.assertEqual(get_spool().stats()['depth'], 1)
+
+        self.drain()
+
+        participant = Participant.objects.get()
+        self.assertEqual(participant.gender, 'M')
+        self.assertEqual(Response.objects.get(participant=participant).answer, "More seating")
+        self.assertTrue(EvaluationSession.objects.filter(participant=participant, completed=True).exists())
+        stats = get_spool().stats()
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['drained_total'], 1)
+
+    def test_spooled_submission_writes_no_session(self):
+        response = self.client.post('/', {f'q_{self.question.id}': "More seating"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Session.objects.exists())
+
+    def test_failed_batch_is_retried(self):
+        self.client.post('/', {f'q_{self.question.id}': "Shorter talks"})
+        attempts = []
+
+        def locked_once(submissions):
+            attempts.append(len(submissions))
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            return save_submissions(submissions)
+
+        with mock.patch('evaluations.management.commands.drain_submissions.save_submissions', locked_once):
+            call_command('drain_submissions', once=True, interval=0, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(attempts, [1, 1])
+        self.assertEqual(Response.objects.get().answer, "Shorter talks")
+        self.assertEqual(get_spool().stats()['depth'], 0)
+
+    def test_once_gives_up_after_retries(self):
+        self.client.post('/', {f'q_{self.question.id}': "Shorter talks"})
+
+        with mock.patch('evaluations.management.commands.drain_submissions.save_submissions',
+                        side_effect=OperationalError('database is locked')):
+            with self.assertRaises(CommandError):
+                call_command('drain_submissions', once=True, interval=0, retries=2,
+                             stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(get_spool().stats()['depth'], 1)
+
+    def test_replay_after_crash_does_not_duplicate(self):
+        self.client.post('/', {f'q_{self.question.id}': "Shorter talks"})
+        # Drainer committed the batch but died before acknowledging it
+        save_submissions([submission for _, submission, _ in get_spool().pending(10)])
+
+        self.drain()
+
+        self.assertEqual(Participant.objects.count(), 1)
+        self.assertEqual(Response.objects.count(), 1)
+        self.assertEqual(get_spool().stats()['depth'], 0)
+
+
+class SqliteProfileTests(ScratchCacheMixin, TransactionTestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_profile_is_applied_to_connections(self):
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        # 2 == MEMORY
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_optimize_database_command(self):
+        out = StringIO()
+        call_command('optimize_database', stdout=out)
+        self.assertIn('PRAGMA optimize done', out.getvalue())
+
+
+class QueryPlanTests(TestCase):
+    def test_dashboard_and_view_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+
+        self.assertNotIn('SCAN', out.getvalue())
+
+    def test_date_cast_filters_are_reported_as_scans(self):
+        queryset = Participant.objects.filter(created_at__date__gte='2024-01-01')
+
+        self.assertTrue(table_scans(queryset))
+
+    def test_date_range_is_half_open_and_whole_days(self):
+        for day, hour in [(1, 0), (2, 23), (3, 0)]:
+            participant = Participant.objects.create(session_key=f'day-{day}-{hour}')
+            Participant.objects.filter(pk=participant.pk).update(created_at=datetime.datetime(2024, 6, day, hour))
+
+        selected = in_date_range(Participant.objects.all(), datetime.date(2024, 6, 1), datetime.date(2024, 6, 2))
+
+        self.assertEqual(sorted(selected.values_list('session_key', flat=True)), ['day-1-0', 'day-2-23'])
+        self.assertFalse(table_scans(selected))
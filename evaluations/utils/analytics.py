@@ -0,0 +1,248 @@
+# evaluations/utils/analytics.py
+"""The aggregate queries behind the dashboard widgets, on a choice of engine.
+
+settings.EVALUATION_ANALYTICS_ENGINE picks where they run:
+
+- 'orm' (the default) runs them through the Django ORM on SQLite;
+- 'duckdb' runs them in an embedded DuckDB, a columnar engine, attached
+  read-only to the same SQLite file. DuckDB scans and groups column-wise
+  and in parallel, which pays off once the raw tables hold years of
+  events. It needs the duckdb package and its sqlite extension; the
+  extension is downloaded on first use unless
+  settings.EVALUATION_DUCKDB_SQLITE_EXTENSION names a local copy.
+
+Both engines run the same queries on the same tables and return the same
+values, so the dashboard does not care which one it has. The daily
+answer counts and the demographic cube are read from their tables; the
+rest are grouped from Response, Participant and EvaluationSession.
+"""
+import datetime
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from ..models import (
+    Question, Response, Participant, EvaluationSession, ResponseDailyAggregate, ParticipantDailyCube, GeocodedPostcode,
+    ResponseSentiment,
+)
+from .cube import DIMENSIONS
+from .date_range import date_bounds, in_date_range
+from .geocode_cache import postcode_key_expression
+from .rollup import answer_labels, answer_totals, daily_totals, load_answer
+
+# Participant columns the map groups by besides the location
+MAP_DIMENSIONS = ('age', 'gender', 'ethnicity')
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _by_count(totals):
+    """Counter items, most common first"""
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+
+
+class OrmEngine:
+    name = 'orm'
+
+    def answer_totals(self, question_id, start_date, end_date):
+        """[(answer, count)] from the daily answer counts, most common first"""
+        return answer_totals(question_id, start_date, end_date)
+
+    def daily_totals(self, question_id, start_date, end_date, answer=None):
+        """[(date, count)] from the daily answer counts"""
+        return daily_totals(question_id, start_date, end_date, answer)
+
+    def cube_cells(self, start_date, end_date):
+        """{(date, *DIMENSIONS): count} for the demographic cube"""
+        rows = ParticipantDailyCube.objects.filter(
+            date__gte=start_date, date__lte=end_date,
+        ).values_list('date', *DIMENSIONS, 'count')
+        return {row[:-1]: row[-1] for row in rows}
+
+    def completion(self, start_date, end_date):
+        """(sessions, completed sessions) finished in the date range"""
+        totals = in_date_range(EvaluationSession.objects.all(), start_date, end_date).aggregate(
+            total=Count('id'), completed=Count('id', filter=Q(completed=True)),
+        )
+        return totals['total'], totals['completed']
+
+    def answer_counts(self, question_id, start_date, end_date):
+        """[(answer label, count)] of raw responses to any question, most common first;
+        multiple choice answers count towards each option"""
+        rows = (
+            in_date_range(Response.objects.filter(question_id=question_id), start_date, end_date)
+            .values_list('answer').annotate(count=Count('id')).order_by()
+        )
+        totals = Counter()
+        for answer, count in rows:
+            for label in answer_labels(answer):
+                totals[label] += count
+        return _by_count(totals)
+
+    def sentiment_counts(self, question_id, start_date, end_date):
+        """[(sentiment label, count)] of scored responses to a text question, most common first.
+
+        Empty for any other question type: scores left behind after a
+        question stops being free text are not counted.
+        """
+        scored = ResponseSentiment.objects.filter(response__question_id=question_id,
+                                                  response__question__question_type='TX')
+        rows = (
+            in_date_range(scored, start_date, end_date, field='response__created_at')
+            .values_list('label').annotate(count=Count('id')).order_by()
+        )
+        return _by_count(dict(rows))
+
+    def map_cells(self, start_date, end_date):
+        """{(postcode, lat, lon, precision, *MAP_DIMENSIONS): participants} who joined in the date range.
+
+        Postcodes are GeocodedPostcode keys; ones without a stored position are left out.
+        """
+        position = GeocodedPostcode.objects.filter(postcode=OuterRef('key'))
+        rows = (
+            in_date_range(Participant.objects.exclude(postcode=''), start_date, end_date)
+            .annotate(
+                key=postcode_key_expression(),
+                lat=Subquery(position.values('lat')),
+                lon=Subquery(position.values('lon')),
+                precision=Subquery(position.values('precision')),
+            )
+            .exclude(lat=None)
+            .values_list('key', 'lat', 'lon', 'precision', *MAP_DIMENSIONS)
+            .annotate(count=Count('id')).order_by()
+        )
+        return {row[:-1]: row[-1] for row in rows}
+
+
+class DuckDBEngine:
+    name = 'duckdb'
+
+    def __init__(self, path=None, extension=None):
+        import duckdb
+
+        self.path = str(path or settings.DATABASES['default']['NAME'])
+        database = duckdb.connect()
+        if extension:
+            database.execute(f"LOAD '{self._literal(extension)}'")
+        else:
+            database.execute("INSTALL sqlite")
+            database.execute("LOAD sqlite")
+        database.execute(f"ATTACH '{self._literal(self.path)}' AS windrush (TYPE sqlite, READ_ONLY)")
+        self._database = database
+        self._local = threading.local()
+
+    @staticmethod
+    def _literal(text):
+        return str(text).replace("'", "''")
+
+    @staticmethod
+    def _table(model):
+        return f'windrush.{model._meta.db_table}'
+
+    @staticmethod
+    def _bounds(start_date, end_date):
+        """date_bounds() as naive UTC, how Django stores datetimes in SQLite"""
+        return tuple(
+            timezone.make_naive(bound, datetime.timezone.utc) if timezone.is_aware(bound) else bound
+            for bound in date_bounds(start_date, end_date)
+        )
+
+    def _query(self, sql, params=()):
+        # A DuckDB connection is not for concurrent use; each thread gets a cursor
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._database.cursor()
+        return cursor.execute(sql, list(params)).fetchall()
+
+    def answer_totals(self, question_id, start_date, end_date):
+        return [(answer, int(count)) for answer, count in self._query(
+            f'SELECT answer, SUM(count) AS total FROM {self._table(ResponseDailyAggregate)} '
+            'WHERE question_id = ? AND date >= ? AND date <= ? '
+            'GROUP BY answer ORDER BY total DESC, answer',
+            (question_id, start_date, end_date),
+        )]
+
+    def daily_totals(self, question_id, start_date, end_date, answer=None):
+        sql = (f'SELECT date, SUM(count) FROM {self._table(ResponseDailyAggregate)} '
+               'WHERE question_id = ? AND date >= ? AND date <= ?')
+        params = [question_id, start_date, end_date]
+        if answer is not None:
+            sql += ' AND answer = ?'
+            params.append(answer)
+        return [(date, int(count)) for date, count in self._query(sql + ' GROUP BY date ORDER BY date', params)]
+
+    def cube_cells(self, start_date, end_date):
+        columns = ', '.join(('date',) + DIMENSIONS)
+        rows = self._query(
+            f'SELECT {columns}, count FROM {self._table(ParticipantDailyCube)} WHERE date >= ? AND date <= ?',
+            (start_date, end_date),
+        )
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    def completion(self, start_date, end_date):
+        [(total, completed)] = self._query(
+            f'SELECT COUNT(*), COUNT(*) FILTER (WHERE completed) FROM {self._table(EvaluationSession)} '
+            'WHERE completed_at >= ? AND completed_at < ?',
+            self._bounds(start_date, end_date),
+        )
+        return total, completed
+
+    def answer_counts(self, question_id, start_date, end_date):
+        rows = self._query(
+            f'SELECT answer, COUNT(*) FROM {self._table(Response)} '
+            'WHERE question_id = ? AND created_at >= ? AND created_at < ? GROUP BY answer',
+            (question_id, *self._bounds(start_date, end_date)),
+        )
+        totals = Counter()
+        for answer, count in rows:
+            for label in answer_labels(load_answer(answer)):
+                totals[label] += count
+        return _by_count(totals)
+
+    def sentiment_counts(self, question_id, start_date, end_date):
+        rows = self._query(
+            f'SELECT s.label, COUNT(*) FROM {self._table(ResponseSentiment)} s '
+            f'JOIN {self._table(Response)} r ON r.id = s.response_id '
+            f'JOIN {self._table(Question)} q ON q.id = r.question_id '
+            "WHERE r.question_id = ? AND q.question_type = 'TX' "
+            'AND r.created_at >= ? AND r.created_at < ? GROUP BY s.label',
+            (question_id, *self._bounds(start_date, end_date)),
+        )
+        return _by_count(dict(rows))
+
+    def map_cells(self, start_date, end_date):
+        dimensions = ', '.join(f'p.{name}' for name in MAP_DIMENSIONS)
+        rows = self._query(
+            f'SELECT g.postcode, g.lat, g.lon, g.precision, {dimensions}, COUNT(*) '
+            f'FROM {self._table(Participant)} p JOIN {self._table(GeocodedPostcode)} g '
+            "ON g.postcode = upper(replace(p.postcode, ' ', '')) "
+            "WHERE p.postcode <> '' AND g.lat IS NOT NULL AND p.created_at >= ? AND p.created_at < ? "
+            f'GROUP BY g.postcode, g.lat, g.lon, g.precision, {dimensions}',
+            self._bounds(start_date, end_date),
+        )
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+ENGINES = {
+    OrmEngine.name: OrmEngine,
+    DuckDBEngine.name: DuckDBEngine,
+}
+
+
+def get_engine():
+    """Process-wide engine for settings.EVALUATION_ANALYTICS_ENGINE"""
+    global _engine
+    name = getattr(settings, 'EVALUATION_ANALYTICS_ENGINE', 'orm')
+    if name not in ENGINES:
+        raise ValueError(f"Unknown analytics engine: {name!r}")
+    with _engine_lock:
+        if _engine is None or _engine.name != name:
+            if name == DuckDBEngine.name:
+                _engine = DuckDBEngine(extension=getattr(settings, 'EVALUATION_DUCKDB_SQLITE_EXTENSION', None))
+            else:
+                _engine = ENGINES[name]()
+        return _engine
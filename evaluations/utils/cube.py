@@ -0,0 +1,100 @@
+# evaluations/utils/cube.py
+"""Participant counts by day and demographic answers.
+
+ParticipantDailyCube has one row per day and combination of gender,
+ethnicity, age range, country, accessibility need and referral source.
+save_submissions() adds new participants to it in the submission
+transaction. The dashboard loads the rows for the picked dates once into
+a DemographicCube and slices and rolls that up for every participant
+widget, instead of each widget reading Participant rows into pandas.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from ..models import Participant, ParticipantDailyCube
+from .date_range import date_bounds
+from .rollup import REBUILD_BATCH_SIZE, add_counts, response_date
+
+DIMENSIONS = ('gender', 'ethnicity', 'age', 'country', 'accessibility_needs', 'referral_source')
+
+
+def record_participants(participants):
+    """Add newly saved participants to the cube, inside the transaction that saved them"""
+    counts = Counter(
+        (response_date(participant.created_at),) + tuple(getattr(participant, name) for name in DIMENSIONS)
+        for participant in participants
+    )
+    if counts:
+        add_counts(ParticipantDailyCube, ('date',) + DIMENSIONS, counts)
+
+
+def rebuild(since=None):
+    """Recompute the cube from Participant, for every day or from `since` on.
+
+    Returns the number of rows written.
+    """
+    participants = Participant.objects.all()
+    cells = ParticipantDailyCube.objects.all()
+    if since is not None:
+        participants = participants.filter(created_at__gte=date_bounds(since, since)[0])
+        cells = cells.filter(date__gte=since)
+
+    with transaction.atomic():
+        cells.delete()
+        grouped = (
+            participants.annotate(date=TruncDate('created_at'))
+            .values_list('date', *DIMENSIONS)
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        rows = [
+            ParticipantDailyCube(count=row[-1], **dict(zip(('date',) + DIMENSIONS, row)))
+            for row in grouped.iterator()
+        ]
+        ParticipantDailyCube.objects.bulk_create(rows, batch_size=REBUILD_BATCH_SIZE)
+    return len(rows)
+
+
+class DemographicCube:
+    """Cube cells held in memory: (date, *DIMENSIONS) keys with counts"""
+
+    dimensions = ('date',) + DIMENSIONS
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def load(cls, start_date, end_date):
+        """The cells for whole days start_date..end_date, in one query"""
+        rows = ParticipantDailyCube.objects.filter(
+            date__gte=start_date, date__lte=end_date,
+        ).values_list(*cls.dimensions, 'count')
+        return cls({row[:-1]: row[-1] for row in rows})
+
+    def slice(self, **criteria):
+        """Cells matching every criterion; a value may be one item or a collection"""
+        positions = []
+        for name, wanted in criteria.items():
+            allowed = set(wanted) if isinstance(wanted, (list, tuple, set, frozenset)) else {wanted}
+            positions.append((self.dimensions.index(name), allowed))
+        return DemographicCube({
+            key: count for key, count in self.cells.items()
+            if all(key[position] in allowed for position, allowed in positions)
+        })
+
+    def rollup(self, *dimensions):
+        """[{dimension: value, ..., 'count': n}] summed over the other dimensions, largest first"""
+        positions = [self.dimensions.index(name) for name in dimensions]
+        totals = Counter()
+        for key, count in self.cells.items():
+            totals[tuple(key[position] for position in positions)] += count
+        return [
+            dict(zip(dimensions, values), count=count)
+            for values, count in sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        ]
+
+    def total(self):
+        return sum(self.cells.values())
@@ -0,0 +1,59 @@
+# evaluations/utils/data_version.py
+"""A cheap probe that moves whenever the submission data changes.
+
+data_version() reads, for each submission table, the newest id and the
+row count, in one statement. MAX(id) is a single primary-key lookup.
+COUNT(*) still visits every row, but SQLite scans the table's smallest
+index rather than the rows, so it grows with the table far more slowly
+than recomputing the frames it guards. The dashboard keys its caches on
+the result and recomputes exactly when data arrives, instead of on fixed
+TTLs.
+
+New submissions move the newest id and the count; deletes move the count.
+Edits to existing rows are rare (the admin, the shell) and move an edit
+version in the shared cache, which the post_save signal bumps. Edits made
+with QuerySet.update() or raw SQL send no signal; call bump_edit_version()
+after them.
+"""
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection
+
+from ..models import Response, Participant, EvaluationSession
+
+EDIT_VERSION_KEY = 'evaluations:edit_version:{table}'
+
+TABLES = {
+    'participants': Participant,
+    'responses': Response,
+    'sessions': EvaluationSession,
+}
+
+# One (newest id, row count, edit version) triple per table
+DataVersion = namedtuple('DataVersion', TABLES)
+
+
+def bump_edit_version(model):
+    """Mark rows of model's table as edited"""
+    cache.set(EDIT_VERSION_KEY.format(table=model._meta.db_table), time.time_ns(), None)
+
+
+def edit_version(model):
+    return cache.get(EDIT_VERSION_KEY.format(table=model._meta.db_table), 0)
+
+
+def data_version():
+    """The current DataVersion; equal versions mean unchanged data"""
+    selects = []
+    for model in TABLES.values():
+        table = connection.ops.quote_name(model._meta.db_table)
+        selects += [f'(SELECT MAX(id) FROM {table})', f'(SELECT COUNT(*) FROM {table})']
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(selects))
+        row = cursor.fetchone()
+    return DataVersion(*(
+        (row[2 * i] or 0, row[2 * i + 1], edit_version(model))
+        for i, model in enumerate(TABLES.values())
+    ))
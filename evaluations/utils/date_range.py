@@ -0,0 +1,41 @@
+# evaluations/utils/date_range.py
+"""Date-range filtering that SQLite can answer from an index.
+
+The dashboard picks whole days, start to end inclusive. Comparing
+`created_at__date` against them wraps the column in a cast, so every row
+has to be read; instead the days become a half-open datetime range,
+[start 00:00, day after end 00:00), compared against the raw column.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Response, Participant, EvaluationSession
+
+# The timestamp each model is filtered on by the dashboard
+DATE_FIELDS = {
+    Participant: 'created_at',
+    Response: 'created_at',
+    EvaluationSession: 'completed_at',
+}
+
+
+def date_bounds(start_date, end_date):
+    """Half-open [start, end) datetimes covering start_date..end_date inclusive.
+
+    With USE_TZ each bound is midnight in the current time zone, so days
+    that cross a clock change are still whole days.
+    """
+    start = datetime.datetime.combine(start_date, datetime.time.min)
+    end = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+
+def in_date_range(queryset, start_date, end_date, field=None):
+    """Filter a Participant, Response or EvaluationSession queryset to whole days"""
+    field = field or DATE_FIELDS[queryset.model]
+    start, end = date_bounds(start_date, end_date)
+    return queryset.filter(**{f'{field}__gte': start, f'{field}__lt': end})
@@ -0,0 +1,57 @@
+# evaluations/utils/form_cache.py
+"""Rendered evaluation form, cached per question-set version.
+
+The version is a millisecond timestamp held in the shared cache and bumped
+by the Question post_save/post_delete signals, so it doubles as the form's
+Last-Modified time. The cached HTML carries a placeholder in place of the
+CSRF token, which is filled in per request.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+VERSION_KEY = 'evaluations:question_set_version'
+HTML_KEY = 'evaluations:form_html:{version}'
+HTML_TIMEOUT = 7 * 24 * 3600
+
+# Swapped for the request's masked token when the cached form is served
+CSRF_PLACEHOLDER = 'csrf-token-placeholder-8c41e07b'
+
+
+def bump_question_set_version():
+    """Start a new question-set version; old rendered forms are no longer used"""
+    # Strictly increasing even when two edits land in the same millisecond
+    version = max(time.time_ns() // 1_000_000, (cache.get(VERSION_KEY) or 0) + 1)
+    cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def question_set_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns() // 1_000_000, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def form_etag(version, csrf_secret):
+    """ETag for one browser's copy of the form.
+
+    The page embeds a CSRF token derived from the browser's CSRF cookie, so
+    a browser whose cookie changed must not revalidate an old copy.
+    """
+    secret_digest = hashlib.sha256((csrf_secret or '').encode()).hexdigest()[:12]
+    return f'"form-{version}-{secret_digest}"'
+
+
+def cached_form_html(version, context_func):
+    """Rendered form HTML (with the CSRF placeholder) for a question-set version"""
+    key = HTML_KEY.format(version=version)
+    html = cache.get(key)
+    if html is None:
+        context = dict(context_func(), csrf_token=CSRF_PLACEHOLDER)
+        html = render_to_string('evaluations/form.html', context)
+        cache.set(key, html, HTML_TIMEOUT)
+    return html
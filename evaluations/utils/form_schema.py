@@ -0,0 +1,104 @@
+# evaluations/utils/form_schema.py
+"""Validation schema for the evaluation form, shared by browser and server.
+
+The schema is built from the Participant choice lists and the active
+questions' options, serialised once per question-set version and served
+under a content hash, so kiosks can cache it forever and validate locally.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from ..models import Participant
+from .form_cache import question_set_version
+
+SCHEMA_KEY = 'evaluations:form_schema:{version}'
+SCHEMA_TIMEOUT = 7 * 24 * 3600
+
+RATING_RANGE = (1, 5)
+
+
+def _choice_field(label, choices, required=True):
+    return {'type': 'choice', 'label': label, 'choices': [value for value, _ in choices], 'required': required}
+
+
+def build_form_schema(questions):
+    """Describe every form field the browser can validate on its own"""
+    fields = {
+        'gender': _choice_field('gender', Participant.GENDER_CHOICES),
+        'ethnicity': _choice_field('ethnicity', Participant.ETHNICITY_CHOICES),
+        'age': _choice_field('age range', Participant.AGE_RANGES),
+        'accessibility_needs': _choice_field('accessibility need', Participant.ACCESSIBILITY_NEEDS),
+        'referral_source': _choice_field('referral source', Participant.REFERRAL_SOURCE_CHOICES, required=False),
+        'country': {'type': 'text', 'label': 'country',
+                    'max_length': Participant._meta.get_field('country').max_length},
+        'postcode': {'type': 'text', 'label': 'postcode',
+                     'max_length': Participant._meta.get_field('postcode').max_length},
+    }
+    for question in questions:
+        name = f'q_{question.id}'
+        options = list(question.options or [])
+        if question.question_type == 'MC':
+            fields[name] = {'type': 'multi', 'label': 'option', 'choices': options, 'required': False}
+        elif question.question_type == 'SC':
+            fields[name] = {'type': 'choice', 'label': 'option', 'choices': options, 'required': True}
+        elif question.question_type == 'RT':
+            fields[name] = {'type': 'rating', 'label': 'rating', 'min': RATING_RANGE[0], 'max': RATING_RANGE[1],
+                            'required': False}
+        else:
+            fields[name] = {'type': 'text', 'label': 'answer', 'required': False}
+    return {'fields': fields}
+
+
+def cached_form_schema(questions_func):
+    """(JSON body, content hash) of the schema for the current question set"""
+    key = SCHEMA_KEY.format(version=question_set_version())
+    cached = cache.get(key)
+    if cached is None:
+        body = json.dumps(build_form_schema(questions_func()), sort_keys=True, separators=(',', ':'))
+        cached = (body, hashlib.sha256(body.encode()).hexdigest()[:16])
+        cache.set(key, cached, SCHEMA_TIMEOUT)
+    return cached
+
+
+def validate_fields(schema, values):
+    """Check submitted values against the schema; returns {field: error message}.
+
+    Fields the schema does not know about are ignored, as the form view
+    ignores them. Multiple choice values may be given as lists.
+    """
+    errors = {}
+    for name, value in values.items():
+        field = schema['fields'].get(name)
+        if field is None:
+            continue
+        error = _field_error(field, value)
+        if error:
+            errors[name] = error
+    return errors
+
+
+def _field_error(field, value):
+    values = value if isinstance(value, list) else [value]
+    empty = all(v in ('', None) for v in values)
+    if empty:
+        return f"Please select a {field['label']}" if field.get('required') and field['type'] != 'text' else None
+
+    if field['type'] in ('choice', 'multi'):
+        if field['type'] == 'choice' and len(values) > 1:
+            return f"Please select only one {field['label']}"
+        if any(v not in field['choices'] for v in values):
+            return f"Please select a valid {field['label']}"
+    elif field['type'] == 'rating':
+        try:
+            rating = float(values[-1])
+        except (TypeError, ValueError):
+            return "Please select a rating"
+        if not field['min'] <= rating <= field['max']:
+            return f"Ratings run from {field['min']} to {field['max']}"
+    elif field['type'] == 'text':
+        max_length = field.get('max_length')
+        if max_length and len(str(values[-1])) > max_length:
+            return f"Please keep the {field['label']} to {max_length} characters"
+    return None
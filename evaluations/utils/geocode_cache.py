@@ -0,0 +1,73 @@
+# evaluations/utils/geocode_cache.py
+"""Participant postcodes geocoded once and kept in GeocodedPostcode.
+
+The dashboard reads map positions from GeocodedPostcode only; it never
+geocodes while rendering, and the positions survive restarts and deploys.
+`manage.py geocode_postcodes` fills the table from the offline postcode
+index for postcodes participants have entered that have no row yet, and
+keeps doing so as participants arrive.
+
+Rows are keyed by the postcode upper-cased with spaces removed, which SQL
+can compute as well (postcode_key_expression()), so "sw1a 1aa" and
+"SW1A1AA" share a row. Postcodes the index cannot place get a row without
+a position, so they are not retried on every pass; --refresh redoes every
+row after the index is rebuilt.
+"""
+import math
+
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Replace, Upper
+
+from ..models import Participant, GeocodedPostcode
+from .geocoder import LEVELS
+
+SOURCE = 'postcode_index'
+
+
+def postcode_key(postcode):
+    """The GeocodedPostcode key for a Participant.postcode"""
+    return postcode.replace(' ', '').upper()
+
+
+def postcode_key_expression(field='postcode'):
+    """postcode_key() as a database expression"""
+    return Upper(Replace(field, Value(' '), Value('')))
+
+
+def missing_postcodes():
+    """Keys of participant postcodes with no GeocodedPostcode row, in order"""
+    return (
+        Participant.objects.exclude(postcode='')
+        .annotate(key=postcode_key_expression())
+        .exclude(key__in=GeocodedPostcode.objects.values('postcode'))
+        .values_list('key', flat=True).distinct().order_by('key')
+    )
+
+
+def geocode(geocoder, keys):
+    """Look up postcode keys in one pass and store the results; returns rows written"""
+    keys = list(keys)
+    if not keys:
+        return 0
+    lat, lon, level = geocoder.lookup(keys)
+    rows = [
+        GeocodedPostcode(
+            postcode=key,
+            lat=None if math.isnan(key_lat) else float(key_lat),
+            lon=None if math.isnan(key_lon) else float(key_lon),
+            precision=LEVELS[key_level] if key_level >= 0 else '',
+            source=SOURCE,
+        )
+        for key, key_lat, key_lon, key_level in zip(keys, lat, lon, level)
+    ]
+    GeocodedPostcode.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['postcode'],
+        update_fields=['lat', 'lon', 'precision', 'source', 'geocoded_at'],
+    )
+    return len(rows)
+
+
+def geocode_version():
+    """Moves whenever GeocodedPostcode rows are added or redone"""
+    totals = GeocodedPostcode.objects.aggregate(rows=Count('id'), latest=Max('geocoded_at'))
+    return totals['rows'], totals['latest']
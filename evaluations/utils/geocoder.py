@@ -0,0 +1,139 @@
+# evaluations/utils/geocoder.py
+"""Offline UK postcode geocoding from a local centroid index.
+
+`manage.py build_postcode_index` turns a postcode directory (the ONS
+Postcode Directory by default) into two sorted tables of NumPy arrays in
+settings.EVALUATION_POSTCODE_INDEX:
+
+- postcode_keys.npy and postcode_coords.npy: every postcode, as its
+  compact form ("SW1A1AA"), and its (latitude, longitude);
+- prefix_keys.npy and prefix_coords.npy: the mean position of every
+  sector ("SW1A 1"), district ("SW1A") and area ("SW"), for input that is
+  partial, mistyped or not in the directory.
+
+The arrays are memory-mapped, so opening the index costs nothing and a
+lookup reads only the pages its binary searches touch. lookup() resolves
+a whole column of postcodes at once, trying each input's postcode, then
+its sector, district and area.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+from django.conf import settings
+
+POSTCODE_KEY = 'S7'
+PREFIX_KEY = 'S6'
+
+# How precisely lookup() placed each input, coarsest last
+LEVELS = ('postcode', 'sector', 'district', 'area')
+UNRESOLVED = -1
+
+_OUTWARD = re.compile(r'^([A-Z]{1,2})[0-9][A-Z0-9]?$')
+_FULL = re.compile(r'^([A-Z]{1,2}[0-9][A-Z0-9]?)([0-9])([A-Z]{2})$')
+_LEADING_OUTWARD = re.compile(r'^[A-Z]{1,2}[0-9][A-Z0-9]?')
+_NOT_ALNUM = re.compile(r'[^A-Z0-9]')
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def postcode_keys(text):
+    """The postcode, sector, district and area keys for some input, '' where unknown.
+
+    "sw1a 1aa" gives ("SW1A1AA", "SW1A 1", "SW1A", "SW"); a bare district
+    such as "n18" gives ("", "", "N18", "N"); text that starts with no
+    valid outward code gives four empty keys.
+    """
+    if not isinstance(text, str):
+        return '', '', '', ''
+    parts = text.upper().split()
+    compact = _NOT_ALNUM.sub('', ''.join(parts))
+
+    full = _FULL.match(compact)
+    if full:
+        outward, sector, unit = full.groups()
+        return outward + sector + unit, f'{outward} {sector}', outward, _OUTWARD.match(outward).group(1)
+
+    # Partial input: the first word if it was typed separately, else the
+    # longest valid outward code at the start
+    first = _NOT_ALNUM.sub('', parts[0]) if parts else ''
+    if len(parts) > 1 and _OUTWARD.match(first):
+        outward = first
+    else:
+        leading = _LEADING_OUTWARD.match(compact)
+        outward = leading.group(0) if leading else ''
+    if not outward:
+        return '', '', '', ''
+    area = _OUTWARD.match(outward).group(1)
+    rest = compact[len(outward):]
+    sector = f'{outward} {rest[0]}' if rest[:1].isdigit() else ''
+    return '', sector, outward, area
+
+
+class PostcodeGeocoder:
+    """A memory-mapped postcode index; see the module docstring"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {
+            name: (
+                np.load(os.path.join(directory, f'{name}_keys.npy'), mmap_mode='r'),
+                np.load(os.path.join(directory, f'{name}_coords.npy'), mmap_mode='r'),
+            )
+            for name in ('postcode', 'prefix')
+        }
+
+    @staticmethod
+    def _search(table_keys, keys):
+        """Row of each key in sorted table_keys, or -1"""
+        if not len(table_keys) or not len(keys):
+            return np.full(len(keys), -1)
+        rows = np.searchsorted(table_keys, keys).clip(max=len(table_keys) - 1)
+        return np.where(table_keys[rows] == keys, rows, -1)
+
+    def lookup(self, postcodes):
+        """(lat, lon, level) arrays for a sequence of postcodes.
+
+        Unresolved inputs get NaN coordinates and level UNRESOLVED; the
+        others an index into LEVELS.
+        """
+        postcodes = list(postcodes)
+        distinct = {text: index for index, text in enumerate(dict.fromkeys(postcodes))}
+        # Normalise each distinct input once, then search column-wise
+        keys = np.array([postcode_keys(text) for text in distinct], dtype=POSTCODE_KEY).reshape(-1, 4)
+
+        lat = np.full(len(distinct), np.nan, dtype='f4')
+        lon = np.full(len(distinct), np.nan, dtype='f4')
+        level = np.full(len(distinct), UNRESOLVED, dtype='i1')
+        for number, name in enumerate(LEVELS):
+            todo = np.flatnonzero((level == UNRESOLVED) & (keys[:, number] != b''))
+            table_keys, coords = self.tables['postcode' if name == 'postcode' else 'prefix']
+            rows = self._search(table_keys, keys[todo, number].astype(table_keys.dtype))
+            found = rows >= 0
+            lat[todo[found]] = coords[rows[found], 0]
+            lon[todo[found]] = coords[rows[found], 1]
+            level[todo[found]] = number
+
+        positions = np.array([distinct[text] for text in postcodes], dtype=np.intp)
+        return lat[positions], lon[positions], level[positions]
+
+    def geocode(self, postcode):
+        """(lat, lon, level name) for one postcode, or None"""
+        lat, lon, level = self.lookup([postcode])
+        if level[0] == UNRESOLVED:
+            return None
+        return float(lat[0]), float(lon[0]), LEVELS[level[0]]
+
+
+def get_geocoder():
+    """Process-wide geocoder for settings.EVALUATION_POSTCODE_INDEX.
+
+    Raises FileNotFoundError until the index has been built.
+    """
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None or _geocoder.directory != settings.EVALUATION_POSTCODE_INDEX:
+            _geocoder = PostcodeGeocoder(settings.EVALUATION_POSTCODE_INDEX)
+        return _geocoder
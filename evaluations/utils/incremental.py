@@ -0,0 +1,67 @@
+# evaluations/utils/incremental.py
+"""DataFrames of whole tables, refreshed by appending new rows.
+
+An IncrementalTable keeps the rows it has read and, on refresh(), fetches
+only rows with an id above the highest one it holds: submissions only ever
+add rows, so after the first load a refresh reads just what is new. A
+cheap checksum catches the rarer deletes and edits and falls back to a
+full reload:
+
+- the table's row count, which SQLite answers from its smallest index
+  without reading rows, must equal the rows held plus the rows fetched;
+  new rows always land above the mark, so any delete breaks the sum;
+- the table's edit version (see data_version.py) must not have moved.
+
+Requires pandas, which only the dashboard installs.
+"""
+import threading
+
+import pandas as pd
+from django.db import transaction
+
+from .data_version import edit_version
+
+
+class IncrementalTable:
+    """A model's rows as a DataFrame of .values(*fields), kept current by refresh().
+
+    `fields` must include 'id'; by default every column is loaded.
+    """
+
+    def __init__(self, model, fields=()):
+        self.model = model
+        self.fields = fields
+        self.columns = list(fields) or [field.attname for field in model._meta.concrete_fields]
+        self.frame = None
+        self.high_water = 0
+        self.version = None
+        self.full_loads = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self, queryset):
+        rows = list(queryset.order_by('id').values(*self.fields))
+        return pd.DataFrame(rows, columns=self.columns)
+
+    def _reload(self, version):
+        self.frame = self._fetch(self.model.objects.all())
+        self.high_water = int(self.frame['id'].max()) if len(self.frame) else 0
+        self.version = version
+        self.full_loads += 1
+
+    def refresh(self):
+        """The table's current rows; the returned frame is shared, do not modify it"""
+        # One transaction, so the count and the fetch see the same rows
+        with self._lock, transaction.atomic():
+            total = self.model.objects.count()
+            version = edit_version(self.model)
+            if self.frame is None or version != self.version:
+                self._reload(version)
+                return self.frame
+
+            new = self._fetch(self.model.objects.filter(id__gt=self.high_water))
+            if len(self.frame) + len(new) != total:
+                self._reload(version)
+            elif len(new):
+                self.frame = pd.concat([self.frame, new], ignore_index=True)
+                self.high_water = int(new['id'].max())
+            return self.frame
@@ -0,0 +1,62 @@
+# evaluations/utils/query_plans.py
+"""The queries the dashboard and views run against the large tables.
+
+`manage.py check_query_plans` runs EXPLAIN QUERY PLAN on each of them and
+fails if SQLite would read a whole table, so an index that stops matching
+its query is caught before an event rather than during one.
+"""
+import datetime
+import re
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from ..models import Response, Participant, EvaluationSession
+from .date_range import in_date_range
+
+LARGE_TABLES = {model._meta.db_table for model in (Participant, Response, EvaluationSession)}
+
+_SCAN = re.compile(r'\bSCAN (\w+)(.*)')
+
+
+def checked_queries(start_date=None, end_date=None):
+    """(description, queryset) for each query whose plan must use an index.
+
+    Dates are filtered through in_date_range(), as the dashboard widgets do.
+    """
+    start_date = start_date or datetime.date(2024, 1, 1)
+    end_date = end_date or start_date + datetime.timedelta(days=30)
+    question_id = 1
+    participants = in_date_range(Participant.objects.all(), start_date, end_date)
+    responses = in_date_range(Response.objects.filter(question_id=question_id), start_date, end_date)
+
+    return [
+        ("participants in date range", participants),
+        ("participants per day", participants.annotate(date=TruncDate('created_at'))
+            .values('date').annotate(count=Count('id'))),
+        ("participant breakdown", participants.values('gender').annotate(count=Count('id'))),
+        ("responses to a question in date range", responses),
+        ("answer counts for a question", responses.values('answer').annotate(count=Count('id'))),
+        ("responses to a question per day", responses.annotate(date=TruncDate('created_at'))
+            .values('date').annotate(count=Count('id'))),
+        ("all responses in date range", in_date_range(Response.objects.all(), start_date, end_date)
+            .values('question', 'answer', 'participant', 'created_at')),
+        ("sessions completed in date range", in_date_range(EvaluationSession.objects.all(), start_date, end_date)),
+        ("first participant date", Participant.objects.order_by('created_at')[:1]),
+        ("latest participant for a session", Participant.objects.filter(session_key='kiosk')
+            .order_by('-id')[:1]),
+        ("responses of a participant", Response.objects.filter(participant_id=1)
+            .values('question__text', 'answer')),
+        ("participants at a postcode", Participant.objects.filter(postcode='SW2 1AA')),
+        ("stored submission keys", Participant.objects.filter(submission_key__in=['key'])),
+    ]
+
+
+def table_scans(queryset):
+    """Lines of the query plan that read a large table from end to end"""
+    scans = []
+    for line in queryset.explain().splitlines():
+        match = _SCAN.search(line)
+        if match and match.group(1) in LARGE_TABLES and 'INDEX' not in match.group(2):
+            scans.append(line.strip())
+    return scans
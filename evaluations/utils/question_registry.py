@@ -0,0 +1,68 @@
+# evaluations/utils/question_registry.py
+"""Every question, loaded once per process and question-set version.
+
+The form, the submission paths, PDF generation and the dashboard all look
+questions up here rather than querying for them on each request or rerun.
+The registry reloads when the question-set version in the shared cache
+moves on, which the Question signals do on every save and delete, so an
+edit in the admin reaches every worker process.
+"""
+import threading
+
+from ..models import Question
+from .form_cache import question_set_version
+
+
+class QuestionRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_id = {}
+        self._by_key = {}
+        self._active = []
+
+    def _load(self, force=False):
+        version = question_set_version()
+        if version == self._version and not force:
+            return
+        with self._lock:
+            if version == self._version and not force:
+                return
+            questions = list(Question.objects.order_by('section'))
+            self._by_id = {question.id: question for question in questions}
+            self._by_key = {question.key: question for question in questions if question.key}
+            self._active = [question for question in questions if question.is_active]
+            self._version = version
+
+    def active(self):
+        """Active questions in form order"""
+        self._load()
+        return list(self._active)
+
+    def active_map(self):
+        """Active questions keyed by id, as parse_answers() expects"""
+        self._load()
+        return {question.id: question for question in self._active}
+
+    def by_id(self, question_id):
+        """The question with this id, active or not, or None"""
+        self._load()
+        if question_id not in self._by_id:
+            # Another process may have added it before the version reached us
+            self._load(force=True)
+        return self._by_id.get(question_id)
+
+    def find(self, key):
+        """The question with this key, or None"""
+        self._load()
+        return self._by_key.get(key)
+
+    def get(self, key):
+        """The question with this key; raises Question.DoesNotExist like the ORM"""
+        question = self.find(key)
+        if question is None:
+            raise Question.DoesNotExist(f"No question with key {key!r}")
+        return question
+
+
+questions = QuestionRegistry()
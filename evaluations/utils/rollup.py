@@ -0,0 +1,169 @@
+# evaluations/utils/rollup.py
+"""Daily answer counts for the choice questions.
+
+A multiple choice answer counts once towards each option it ticks, so a
+question has one count per option, not per combination of options.
+
+save_submissions() adds each batch of responses to ResponseDailyAggregate
+in its own transaction, so the dashboard's choice widgets read a few rows
+per day and option instead of grouping every Response on each rerun.
+`manage.py rebuild_response_rollup` recomputes the table from Response
+after imports that bypass save_submissions(), or after responses are
+deleted.
+"""
+import datetime
+import json
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import Question, Response, ResponseDailyAggregate
+from .date_range import date_bounds
+from .question_registry import questions as question_registry
+
+# Question types whose answers come from a fixed set of options
+ROLLUP_TYPES = ('SC', 'MC', 'TF', 'RT')
+
+ANSWER_LENGTH = ResponseDailyAggregate._meta.get_field('answer').max_length
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def normalize_answer(answer):
+    """The label an answer is counted under; multiple choice lists are joined"""
+    if isinstance(answer, list):
+        answer = ", ".join(str(item).strip() for item in answer)
+    return str(answer).strip()[:ANSWER_LENGTH]
+
+
+def answer_labels(answer):
+    """The labels an answer is counted under: each ticked option of a
+    multiple choice list once, otherwise the answer itself"""
+    if isinstance(answer, list):
+        return list(dict.fromkeys(normalize_answer(item) for item in answer))
+    return [normalize_answer(answer)]
+
+
+def load_answer(text):
+    """An answer as stored, in JSON text, back as its value"""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return text
+
+
+def decode_answer(text):
+    """normalize_answer() for an answer as stored, in JSON text"""
+    return normalize_answer(load_answer(text))
+
+
+def response_date(created_at):
+    """The day a response counts towards, in the current time zone"""
+    if timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return created_at.date()
+
+
+def add_counts(model, key_columns, counts):
+    """Add {key tuple: n} to a count table, creating rows that do not exist yet.
+
+    `model` needs a `count` field and a unique constraint over exactly
+    `key_columns`; date values are dates.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(key_columns)
+    placeholders = ', '.join(['%s'] * (len(key_columns) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({columns}, count) VALUES ({placeholders}) '
+            f'ON CONFLICT ({columns}) DO UPDATE SET count = {table}.count + excluded.count',
+            [
+                tuple(connection.ops.adapt_datefield_value(value) if isinstance(value, datetime.date) else value
+                      for value in key) + (count,)
+                for key, count in counts.items()
+            ]
+        )
+
+
+def record_responses(responses):
+    """Add newly saved responses to the daily counts.
+
+    Call inside the transaction that saved them, so the counts commit or
+    roll back with the responses.
+    """
+    types = {}
+    for question_id in {response.question_id for response in responses}:
+        question = question_registry.by_id(question_id)
+        types[question_id] = question.question_type if question else None
+
+    counts = Counter(
+        (response_date(response.created_at), response.question_id, label)
+        for response in responses
+        if types[response.question_id] in ROLLUP_TYPES
+        for label in answer_labels(response.answer)
+    )
+    if not counts:
+        return
+
+    add_counts(ResponseDailyAggregate, ('date', 'question_id', 'answer'), counts)
+
+def rebuild(since=None):
+    """Recompute the counts from Response, for every day or from `since` on.
+
+    Responses are grouped in SQL, so the work in Python depends on the
+    number of distinct answers, not responses. The old counts are deleted
+    first, which takes the write lock, so no submission can land between
+    the read and the write. Returns the number of rows written.
+    """
+    responses = Response.objects.filter(question__question_type__in=ROLLUP_TYPES)
+    aggregates = ResponseDailyAggregate.objects.all()
+    if since is not None:
+        responses = responses.filter(created_at__gte=date_bounds(since, since)[0])
+        aggregates = aggregates.filter(date__gte=since)
+
+    with transaction.atomic():
+        aggregates.delete()
+        counts = Counter()
+        grouped = (
+            responses.annotate(date=TruncDate('created_at'))
+            .values_list('date', 'question_id', 'answer')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for date, question_id, answer, count in grouped.iterator():
+            for label in answer_labels(answer):
+                counts[(date, question_id, label)] += count
+
+        ResponseDailyAggregate.objects.bulk_create([
+            ResponseDailyAggregate(date=date, question_id=question_id, answer=answer, count=count)
+            for (date, question_id, answer), count in counts.items()
+        ], batch_size=REBUILD_BATCH_SIZE)
+    return len(counts)
+
+
+def _question_counts(question, start_date, end_date):
+    question_id = question.id if isinstance(question, Question) else question
+    return ResponseDailyAggregate.objects.filter(
+        question_id=question_id, date__gte=start_date, date__lte=end_date,
+    )
+
+
+def answer_totals(question, start_date, end_date):
+    """[(answer, count)] for a question over whole days, most common first"""
+    rows = (
+        _question_counts(question, start_date, end_date)
+        .values('answer').annotate(total=Sum('count')).order_by('-total', 'answer')
+    )
+    return [(row['answer'], row['total']) for row in rows]
+
+
+def daily_totals(question, start_date, end_date, answer=None):
+    """[(date, count)] of responses to a question, optionally for one answer"""
+    rows = _question_counts(question, start_date, end_date)
+    if answer is not None:
+        rows = rows.filter(answer=answer)
+    rows = rows.values('date').annotate(total=Sum('count')).order_by('date')
+    return [(row['date'], row['total']) for row in rows]
@@ -0,0 +1,66 @@
+# evaluations/utils/sentiment.py
+"""Sentiment of free-text answers, scored once and kept in ResponseSentiment.
+
+`manage.py score_sentiments` scores text responses that have no row yet,
+as they arrive, so the dashboard only counts stored labels. Each row
+records the SCORER_VERSION it was scored with; raise it whenever
+score_text() changes and the command scores every older row again.
+
+Requires textblob, which only the dashboard installs.
+"""
+from textblob import TextBlob
+
+from ..models import Response, ResponseSentiment
+
+SCORER_VERSION = 1
+
+# Polarity beyond these is positive or negative, otherwise neutral
+POSITIVE_POLARITY = 0.2
+NEGATIVE_POLARITY = -0.2
+
+
+def sentiment_label(polarity):
+    if polarity > POSITIVE_POLARITY:
+        return 'positive'
+    if polarity < NEGATIVE_POLARITY:
+        return 'negative'
+    return 'neutral'
+
+
+def score_text(text):
+    """(polarity, subjectivity, label) for an answer; anything but text is neutral"""
+    if not isinstance(text, str):
+        text = ''
+    sentiment = TextBlob(text).sentiment
+    return sentiment.polarity, sentiment.subjectivity, sentiment_label(sentiment.polarity)
+
+
+def unscored_responses():
+    """Text responses without a score from this SCORER_VERSION, oldest first"""
+    return (
+        Response.objects.filter(question__question_type='TX')
+        .exclude(sentiment__scorer_version=SCORER_VERSION)
+        .order_by('id')
+    )
+
+
+def prune():
+    """Delete scores of responses whose question is no longer free text; returns rows deleted"""
+    deleted, _ = ResponseSentiment.objects.exclude(response__question__question_type='TX').delete()
+    return deleted
+
+
+def score(responses):
+    """Score (id, answer) pairs and store the results; returns rows written"""
+    rows = []
+    for response_id, answer in responses:
+        polarity, subjectivity, label = score_text(answer)
+        rows.append(ResponseSentiment(
+            response_id=response_id, polarity=polarity, subjectivity=subjectivity, label=label,
+            scorer_version=SCORER_VERSION,
+        ))
+    ResponseSentiment.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['response'],
+        update_fields=['polarity', 'subjectivity', 'label', 'scorer_version', 'scored_at'],
+    )
+    return len(rows)
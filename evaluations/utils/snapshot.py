@@ -0,0 +1,115 @@
+# evaluations/utils/snapshot.py
+"""Columnar snapshot of the submission tables for the admin dashboard.
+
+Participants, responses and sessions for a date range are read once per
+data version, with one query per table and no per-row model or field
+conversion, into DataFrames with compact dtypes:
+
+- choice fields are categoricals built from the model choice lists
+  (values outside the list, from older forms, are kept as extra categories);
+- answers are a categorical of their display labels, decoded once per
+  distinct answer rather than once per row;
+- timestamps are datetime64, in the current time zone when USE_TZ is on.
+
+Every widget on a page reads the same snapshot, so the frames must be
+treated as read-only. Requires pandas, which only the dashboard installs.
+"""
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ..models import Response, Participant, EvaluationSession
+from .data_version import data_version
+from .date_range import in_date_range
+from .rollup import decode_answer
+
+PARTICIPANT_CHOICES = {
+    'gender': Participant.GENDER_CHOICES,
+    'ethnicity': Participant.ETHNICITY_CHOICES,
+    'age': Participant.AGE_RANGES,
+    'accessibility_needs': Participant.ACCESSIBILITY_NEEDS,
+    'referral_source': Participant.REFERRAL_SOURCE_CHOICES,
+}
+PARTICIPANT_COLUMNS = ('id', 'created_at', *PARTICIPANT_CHOICES, 'country', 'postcode')
+RESPONSE_COLUMNS = ('id', 'participant_id', 'question_id', 'answer', 'created_at')
+SESSION_COLUMNS = ('id', 'participant_id', 'completed', 'started_at', 'completed_at')
+
+
+def _raw_frame(queryset, columns):
+    """Run a queryset's SQL directly, keeping the database's own values"""
+    sql, params = queryset.values_list(*columns).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _datetimes(values):
+    values = pd.to_datetime(values, format='ISO8601')
+    if settings.USE_TZ:
+        values = values.dt.tz_localize('UTC').dt.tz_convert(timezone.get_current_timezone_name())
+    return values
+
+
+def _choices(values, choices):
+    categories = [code for code, _ in choices]
+    extras = sorted(set(values.dropna().unique()) - set(categories))
+    return pd.Categorical(values, categories=categories + extras)
+
+
+def _answer_labels(values):
+    """Stored JSON answers as a categorical of display labels"""
+    stored = pd.Categorical(values)
+    labels = pd.Index([decode_answer(text) for text in stored.categories])
+    unique_labels = labels.unique()
+    codes = unique_labels.get_indexer(labels)[stored.codes]
+    return pd.Categorical.from_codes(codes, categories=unique_labels)
+
+
+class Snapshot:
+    """Participants, responses and sessions for one date range and data version"""
+
+    def __init__(self, start_date, end_date, version, participants, responses, sessions):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.version = version
+        self.participants = participants
+        self.responses = responses
+        self.sessions = sessions
+
+    def answers(self, question):
+        """Responses to one question (a Question or its id)"""
+        question_id = getattr(question, 'id', question)
+        return self.responses[self.responses['question_id'] == question_id]
+
+    def memory_usage(self):
+        """Bytes held by the three frames"""
+        return sum(
+            int(frame.memory_usage(deep=True).sum())
+            for frame in (self.participants, self.responses, self.sessions)
+        )
+
+
+def load_snapshot(start_date, end_date, version=None):
+    """Read whole days start_date..end_date of all three tables"""
+    if version is None:
+        version = data_version()
+
+    participants = _raw_frame(in_date_range(Participant.objects.all(), start_date, end_date), PARTICIPANT_COLUMNS)
+    participants['created_at'] = _datetimes(participants['created_at'])
+    for name, choices in PARTICIPANT_CHOICES.items():
+        participants[name] = _choices(participants[name], choices)
+    participants['country'] = participants['country'].astype('category')
+
+    responses = _raw_frame(in_date_range(Response.objects.all(), start_date, end_date), RESPONSE_COLUMNS)
+    responses['answer'] = _answer_labels(responses['answer'])
+    responses['created_at'] = _datetimes(responses['created_at'])
+    responses['question_id'] = responses['question_id'].astype('int32')
+
+    sessions = _raw_frame(in_date_range(EvaluationSession.objects.all(), start_date, end_date), SESSION_COLUMNS)
+    sessions['completed'] = sessions['completed'].astype(bool)
+    sessions['started_at'] = _datetimes(sessions['started_at'])
+    sessions['completed_at'] = _datetimes(sessions['completed_at'])
+
+    return Snapshot(start_date, end_date, version, participants, responses, sessions)
@@ -0,0 +1,63 @@
+# evaluations/utils/spatial_bins.py
+"""Participant locations summed into square map cells.
+
+The dashboard maps draw cells, not postcodes: bin_points() sums the
+participants at each position into a grid of squares on the Web Mercator
+projection the map tiles use, TILE_CELLS squares across one map tile at
+the chosen zoom. A map of the UK at a given zoom therefore has a bounded
+number of cells however many distinct postcodes are collected, and the
+browser gets one point per occupied cell.
+
+Cells holding fewer than settings.EVALUATION_MAP_MIN_COUNT participants
+are dropped, so no cell on a map points at one or two people.
+"""
+import numpy as np
+
+TILE_CELLS = 8
+
+
+# Web Mercator stops at the latitude where the map is square
+MAX_LATITUDE = 85.05112878
+
+
+def cell_size(zoom):
+    """Cell side, in radians of Web Mercator, for a map at this zoom"""
+    return 2 * np.pi / 2 ** zoom / TILE_CELLS
+
+
+def bin_points(lat, lon, counts, zoom, groups=None, min_count=0):
+    """Sum counts at (lat, lon) into cells for a map at `zoom`.
+
+    With `groups` (integer codes, one per point) each cell is summed per
+    group. Returns (lat, lon, count, group) arrays with one entry per
+    occupied cell, or cell and group, at the cell centres; group is None
+    without `groups`. Entries with fewer than min_count are dropped.
+    """
+    lat = np.radians(np.clip(np.asarray(lat, dtype='f8'), -MAX_LATITUDE, MAX_LATITUDE))
+    lon = np.radians(np.asarray(lon, dtype='f8'))
+    size = cell_size(zoom)
+    side = 2 ** zoom * TILE_CELLS
+
+    # Number each cell, row by row from the south-west corner of the map,
+    # then each group within it, so one sort of integers finds them all
+    rows = np.floor(np.log(np.tan(np.pi / 4 + lat / 2)) / size).astype(np.int64).clip(-side // 2, side // 2 - 1)
+    columns = np.floor(lon / size).astype(np.int64) % side
+    keys = (rows + side // 2) * side + columns
+    group_count = 1
+    if groups is not None:
+        groups = np.asarray(groups, dtype=np.int64)
+        group_count = int(groups.max()) + 1 if len(groups) else 1
+        keys = keys * group_count + groups
+
+    keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=np.asarray(counts, dtype='f8'), minlength=len(keys))
+    keep = totals >= min_count
+    keys, totals = keys[keep], totals[keep].astype(np.int64)
+
+    cells, group = np.divmod(keys, group_count)
+    row, column = np.divmod(cells, side)
+    y = (row - side // 2 + 0.5) * size
+    x = (column + 0.5) * size
+    centre_lat = np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2)
+    centre_lon = (np.degrees(x) + 180) % 360 - 180
+    return centre_lat, centre_lon, totals, None if groups is None else group
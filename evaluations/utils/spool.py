@@ -0,0 +1,128 @@
+# evaluations/utils/spool.py
+"""Write-behind spool for event-day submission bursts.
+
+In spool mode evaluation_form appends each validated submission to a
+separate WAL-mode SQLite file and returns straight away. `manage.py
+drain_submissions` commits the spooled submissions into the main database
+in batches. Entries are only removed once their batch is committed, and
+every entry carries a submission_key, so a drainer that dies part-way
+simply replays the remaining entries on restart without duplicating rows.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spool_stats (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+class SubmissionSpool:
+    """Durable FIFO of submissions waiting to be written to the main database"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Full sync: an acknowledged submission must survive a power cut
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.executescript(SCHEMA)
+            self._local.connection = conn
+        return conn
+
+    def enqueue(self, session_key, submission):
+        """Append a submission and return its submission key"""
+        key = submission.get('submission_key') or uuid.uuid4().hex
+        payload = dict(submission, session_key=session_key, submission_key=key)
+        self.connection.execute(
+            'INSERT OR IGNORE INTO spool (submission_key, payload, enqueued_at) VALUES (?, ?, ?)',
+            (key, json.dumps(payload), time.time())
+        )
+        return key
+
+    def pending(self, limit):
+        """Oldest spooled entries as (id, submission, enqueued_at) tuples"""
+        rows = self.connection.execute(
+            'SELECT id, payload, enqueued_at FROM spool ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+        return [(row_id, json.loads(payload), enqueued_at) for row_id, payload, enqueued_at in rows]
+
+    def acknowledge(self, entries):
+        """Remove drained entries and record how far behind the drainer was"""
+        if not entries:
+            return
+        now = time.time()
+        conn = self.connection
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('DELETE FROM spool WHERE id = ?', [(row_id,) for row_id, _, _ in entries])
+            self._add_stat('drained_total', len(entries))
+            self._set_stat('last_drained_at', now)
+            self._set_stat('last_drain_lag', now - min(enqueued_at for _, _, enqueued_at in entries))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def stats(self):
+        """Spool depth, age of the oldest entry and the drainer's last reported lag"""
+        depth, oldest = self.connection.execute('SELECT COUNT(*), MIN(enqueued_at) FROM spool').fetchone()
+        values = dict(self.connection.execute('SELECT name, value FROM spool_stats').fetchall())
+        return {
+            'depth': depth,
+            'oldest_age': time.time() - oldest if oldest is not None else 0.0,
+            'drained_total': int(values.get('drained_total', 0)),
+            'last_drain_lag': values.get('last_drain_lag'),
+            'last_drained_at': values.get('last_drained_at'),
+        }
+
+    def _set_stat(self, name, value):
+        self.connection.execute(
+            'INSERT INTO spool_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = excluded.value',
+            (name, value)
+        )
+
+    def _add_stat(self, name, value):
+        self.connection.execute(
+            'INSERT INTO spool_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, value)
+        )
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def spool_enabled():
+    return getattr(settings, 'EVALUATION_INGEST_MODE', 'direct') == 'spool'
+
+
+def get_spool():
+    """Process-wide spool for settings.EVALUATION_SPOOL_PATH"""
+    global _spool
+    with _spool_lock:
+        if _spool is None or _spool.path != settings.EVALUATION_SPOOL_PATH:
+            _spool = SubmissionSpool(settings.EVALUATION_SPOOL_PATH)
+        return _spool
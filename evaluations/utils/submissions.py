@@ -0,0 +1,220 @@
+# evaluations/utils/submissions.py
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from ..models import Question, Response, Participant, EvaluationSession
+from .cube import record_participants
+from .form_schema import validate_fields
+from .question_registry import questions as question_registry
+from .rollup import record_responses
+
+# Participant form fields and the defaults used when a kiosk leaves them blank
+PARTICIPANT_DEFAULTS = {
+    'gender': 'NS',
+    'ethnicity': 'NS',
+    'country': 'England',
+    'postcode': '',
+    'age': '12-17',
+    'accessibility_needs': 'No accessibility needs',
+    'referral_source': '',
+}
+
+
+def active_question_map():
+    """Load every active question in one query, keyed by id"""
+    return {question.id: question for question in Question.objects.filter(is_active=True)}
+
+
+def coerce_answer(question, value):
+    """Turn a submitted value into the native JSON stored in Response.answer.
+
+    Multiple choice answers are lists, ratings are numbers and everything
+    else is a plain string.
+    """
+    if question.question_type == 'MC':
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+    if isinstance(value, (list, tuple)):
+        value = value[-1] if value else ''
+    if question.question_type == 'RT':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return value
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def parse_answers(data, questions):
+    """Pick the q_<id> fields that match a known question"""
+    answers = {}
+    for key in data.keys():
+        if not key.startswith('q_'):
+            continue
+        try:
+            question_id = int(key.split('_')[1])
+        except ValueError:
+            continue
+        if question_id in questions:
+            # Checkbox groups post the same name once per ticked option
+            value = data.getlist(key) if hasattr(data, 'getlist') else data[key]
+            answers[question_id] = coerce_answer(questions[question_id], value)
+    return answers
+
+
+def build_submission(data, questions):
+    """Validate posted form data into a plain, JSON-serialisable submission"""
+    return {
+        'participant': {field: data.get(field, default) for field, default in PARTICIPANT_DEFAULTS.items()},
+        'answers': parse_answers(data, questions),
+    }
+
+
+def save_submissions(submissions, question_ids=None):
+    """Write a batch of submissions with bulk inserts in one transaction.
+
+    Each submission is a dict from build_submission() plus a `session_key`
+    and an optional `submission_key`. A submission whose key is already
+    stored is not written again, which makes replays and retries safe.
+    Returns the Participant for each submission, in order.
+    """
+    return [participant for participant, _ in write_submissions(submissions, question_ids)]
+
+
+def take_write_lock():
+    """Make a write the first statement of the current transaction.
+
+    SQLite takes its write lock at the first write. A deferred transaction
+    that has already read cannot wait for that lock (its snapshot could go
+    stale) and fails at once with "database is locked", whatever the
+    busy_timeout; one that writes first waits for the lock like any writer.
+    """
+    table = connection.ops.quote_name(Participant._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {table} SET id = id WHERE 1 = 0')
+
+
+def write_submissions(submissions, question_ids=None):
+    """save_submissions(), returning (participant, created) for each submission.
+
+    `created` is False for a submission whose key was already stored, or
+    appeared earlier in the batch. The stored keys are read after the write
+    lock is taken, so two uploads of the same submission racing each other
+    cannot both report it created.
+    """
+    if question_ids is None:
+        wanted = {int(qid) for submission in submissions for qid in submission['answers']}
+        question_ids = set(Question.objects.filter(id__in=wanted).values_list('id', flat=True))
+
+    with transaction.atomic():
+        take_write_lock()
+        keys = [s['submission_key'] for s in submissions if s.get('submission_key')]
+        stored = {p.submission_key: p for p in Participant.objects.filter(submission_key__in=keys)} if keys else {}
+
+        results = []
+        new = []
+        for submission in submissions:
+            key = submission.get('submission_key')
+            if key and key in stored:
+                results.append((stored[key], False))
+                continue
+            participant = Participant(
+                session_key=submission['session_key'],
+                submission_key=key or None,
+                **submission['participant']
+            )
+            if key:
+                # Guard against the same key twice in one batch
+                stored[key] = participant
+            new.append((submission, participant))
+            results.append((participant, True))
+
+        Participant.objects.bulk_create([participant for _, participant in new])
+        record_participants([participant for _, participant in new])
+        responses = Response.objects.bulk_create([
+            Response(participant=participant, question_id=int(question_id), answer=answer)
+            for submission, participant in new
+            for question_id, answer in submission['answers'].items()
+            if int(question_id) in question_ids
+        ])
+        record_responses(responses)
+        completed_at = timezone.now()
+        EvaluationSession.objects.bulk_create([
+            EvaluationSession(participant=participant, completed=True, completed_at=completed_at)
+            for _, participant in new
+        ])
+
+    return results
+
+
+def save_submission(session_key, data, questions=None):
+    """Write one participant, their responses and the session in a single transaction.
+
+    Responses go in with one bulk insert, so the writer lock is held for three
+    statements however many questions the form has.
+    """
+    if questions is None:
+        questions = question_registry.active_map()
+    submission = build_submission(data, questions)
+    submission['session_key'] = session_key
+    return save_submissions([submission], question_ids=questions.keys())[0]
+
+
+def ingest_batch(items, schema, questions):
+    """Validate and store a batch of submissions uploaded by an offline kiosk.
+
+    Each item is {"submission_key": ..., "fields": {...}} with an optional
+    "session_key"; fields are the same names the form posts. Valid items are
+    written together by write_submissions(), and a submission_key that is
+    already stored is reported as a duplicate rather than written again. If
+    the write fails (still locked after busy_timeout, or a key conflict) the
+    valid items are reported as busy or conflict and nothing is stored.
+    Returns one result per item, in order.
+    """
+    key_length = Participant._meta.get_field('submission_key').max_length
+    session_length = Participant._meta.get_field('session_key').max_length
+    results = []
+    valid = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        key = item.get('submission_key')
+        result = {'submission_key': key}
+        results.append(result)
+        if not isinstance(key, str) or not 0 < len(key) <= key_length:
+            result.update(status='rejected', errors={
+                'submission_key': f"A submission_key of up to {key_length} characters is required"})
+            continue
+        fields = item.get('fields')
+        if not isinstance(fields, dict):
+            result.update(status='rejected', errors={'fields': "Expected an object of form fields"})
+            continue
+        errors = validate_fields(schema, fields)
+        if errors:
+            result.update(status='rejected', errors=errors)
+            continue
+
+        submission = build_submission(fields, questions)
+        submission['session_key'] = str(item.get('session_key') or key)[:session_length]
+        submission['submission_key'] = key
+        valid.append((result, submission))
+
+    if not valid:
+        return results
+
+    submissions = [submission for _, submission in valid]
+    try:
+        try:
+            written = write_submissions(submissions, question_ids=questions.keys())
+        except IntegrityError:
+            # Only a key stored without taking the lock first (the admin,
+            # say) can conflict; a second pass reads it back as a duplicate
+            written = write_submissions(submissions, question_ids=questions.keys())
+    except (IntegrityError, OperationalError) as exc:
+        # Nothing in the batch was written, so the kiosk can resend it as is
+        status = 'busy' if isinstance(exc, OperationalError) else 'conflict'
+        for result, _ in valid:
+            result.update(status=status, errors={'submission_key': str(exc)})
+        return results
+
+    for (result, _), (participant, created) in zip(valid, written):
+        result.update(status='created' if created else 'duplicate', participant_id=participant.id)
+    return results
@@ -0,0 +1,300 @@
+# evaluations/utils/tiered_cache.py
+"""Two-level cache backend: an in-process LRU (L1) in front of a SQLite file (L2).
+
+The L2 file is separate from the submissions database and runs in WAL mode,
+so cache traffic never waits on form writes. Several worker processes on
+one machine share it, while each process keeps its own L1. An L1 entry is
+trusted for at most L1_TTL seconds, which bounds how stale one process can
+be after another process writes the same key.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'evaluations.utils.tiered_cache.TieredCache',
+            'LOCATION': '/path/to/cache.db',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'L1_MAX_BYTES': 16 * 1024 * 1024,
+                'L1_TTL': 5,
+                'MAX_BYTES': 256 * 1024 * 1024,
+            },
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    size INTEGER NOT NULL,
+    written REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_written ON cache (written);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    pid INTEGER PRIMARY KEY,
+    l1_hits INTEGER NOT NULL DEFAULT 0,
+    l2_hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    l1_evictions INTEGER NOT NULL DEFAULT 0,
+    l2_evictions INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+STAT_NAMES = ('l1_hits', 'l2_hits', 'misses', 'l1_evictions', 'l2_evictions')
+
+# How often (seconds) a process writes its counters to the shared stats table
+STATS_FLUSH_INTERVAL = 10
+# How many sets between checks of the L2 size budget
+CULL_EVERY = 100
+
+
+class _LRU:
+    """Byte-bounded LRU of pickled values, shared by every thread in a process"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= now:
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, expires):
+        """Store a value; returns how many entries were evicted to make room"""
+        with self.lock:
+            self._remove(key)
+            if len(value) > self.max_bytes:
+                return 0
+            self.entries[key] = (expires, value)
+            self.size += len(value)
+            evicted = 0
+            while self.size > self.max_bytes:
+                _, (_, old) = self.entries.popitem(last=False)
+                self.size -= len(old)
+                evicted += 1
+            return evicted
+
+    def discard(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class _ProcessState:
+    """L1 and counters for one cache location in the current process"""
+
+    def __init__(self, l1_max_bytes):
+        self.pid = os.getpid()
+        self.l1 = _LRU(l1_max_bytes)
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.stats_flushed = time.monotonic()
+        self.sets = 0
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._l1_ttl = options.get('L1_TTL', 5)
+        self._l1_max_bytes = options.get('L1_MAX_BYTES', 16 * 1024 * 1024)
+        self._max_bytes = options.get('MAX_BYTES', 256 * 1024 * 1024)
+        self._local = threading.local()
+
+    # Django builds one backend instance per thread, so the L1 and the
+    # counters live at module level, one per location and process.
+    @property
+    def _state(self):
+        pid = os.getpid()
+        with _states_lock:
+            state = _states.get(self._path)
+            if state is None or state.pid != pid:
+                # New location, or we are in a forked worker
+                state = _states[self._path] = _ProcessState(self._l1_max_bytes)
+            return state
+
+    @property
+    def _db(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.connection = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, amount=1):
+        state = self._state
+        with state.stats_lock:
+            state.stats[name] += amount
+            due = time.monotonic() - state.stats_flushed >= STATS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def _l1_put(self, key, value, expires, now):
+        l1_expires = now + self._l1_ttl
+        if expires is not None:
+            l1_expires = min(l1_expires, expires)
+        evicted = self._state.l1.put(key, value, l1_expires)
+        if evicted:
+            self._count('l1_evictions', evicted)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        value = self._state.l1.get(key, now)
+        if value is not None:
+            self._count('l1_hits')
+            return pickle.loads(value)
+
+        row = self._db.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._l1_put(key, row[0], row[1], now)
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, value, timeout, only_if_missing=False)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(key, value, timeout, only_if_missing=True)
+
+    def _write(self, key, value, timeout, only_if_missing):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        sql = (
+            'INSERT INTO cache (key, value, expires, size, written) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'size = excluded.size, written = excluded.written'
+        )
+        params = [key, pickled, expires, len(pickled), now]
+        if only_if_missing:
+            # add() may only replace an entry that has expired
+            sql += ' WHERE cache.expires IS NOT NULL AND cache.expires <= ?'
+            params.append(now)
+        written = self._db.execute(sql, params).rowcount > 0
+        if written:
+            self._l1_put(key, pickled, expires, now)
+            self._maybe_cull()
+        return written
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._state.l1.discard(key)
+        return self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._state.l1.discard(key)
+        return self._db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        if self._state.l1.get(key, now) is not None:
+            return True
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+        ).fetchone() is not None
+
+    def clear(self):
+        self._state.l1.clear()
+        self._db.execute('DELETE FROM cache')
+
+    def _maybe_cull(self):
+        state = self._state
+        with state.stats_lock:
+            state.sets += 1
+            due = state.sets % CULL_EVERY == 0
+        if due:
+            self.cull()
+
+    def cull(self):
+        """Drop expired entries, then the oldest writes until L2 fits in MAX_BYTES"""
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        evicted = 0
+        while total > self._max_bytes:
+            rows = db.execute('SELECT key, size FROM cache ORDER BY written LIMIT 100').fetchall()
+            if not rows:
+                break
+            db.executemany('DELETE FROM cache WHERE key = ?', [(key,) for key, _ in rows])
+            total -= sum(size for _, size in rows)
+            evicted += len(rows)
+        if evicted:
+            self._count('l2_evictions', evicted)
+
+    def flush_stats(self):
+        """Write this process's counters to the shared stats table"""
+        state = self._state
+        with state.stats_lock:
+            values = [state.stats[name] for name in STAT_NAMES]
+            state.stats_flushed = time.monotonic()
+        self._db.execute(
+            f"INSERT OR REPLACE INTO cache_stats (pid, {', '.join(STAT_NAMES)}, updated_at) "
+            f"VALUES (?, {', '.join('?' for _ in STAT_NAMES)}, ?)",
+            [state.pid, *values, time.time()]
+        )
+
+    def stats(self):
+        """Counters for every process that has used this cache, plus L2 usage"""
+        self.flush_stats()
+        columns = ('pid', *STAT_NAMES, 'updated_at')
+        processes = [
+            dict(zip(columns, row))
+            for row in self._db.execute(f"SELECT {', '.join(columns)} FROM cache_stats ORDER BY pid")
+        ]
+        entries, size = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        return {
+            'processes': processes,
+            'totals': {name: sum(p[name] for p in processes) for name in STAT_NAMES},
+            'l2_entries': entries,
+            'l2_bytes': size,
+            'l2_max_bytes': self._max_bytes,
+            'l1_bytes': self._state.l1.size,
+            'l1_max_bytes': self._l1_max_bytes,
+        }
@@ -1,102 +1,208 @@
 # evaluations/views.py
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.middleware.csrf import get_token
 from django.shortcuts import render, redirect
 from django.http import HttpResponse, JsonResponse
-from django.utils import timezone
-from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
-from .models import Question, Response, Participant, EvaluationSession
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from .models import Response, Participant
+from .utils.form_cache import CSRF_PLACEHOLDER, cached_form_html, form_etag, question_set_version
+from .utils.form_schema import cached_form_schema, validate_fields
 from .utils.pdf import generate_pdf
+from .utils.spool import get_spool, spool_enabled
+from .utils.question_registry import questions as question_registry
+from .utils.submissions import build_submission, ingest_batch, save_submissions
 import json
 
+# The async views hand all ORM work to this bounded pool. SQLite has a single
+# writer, so a few threads (each keeping its own connection) serve many
+# concurrent kiosk connections waiting on the event loop.
+_db_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EVALUATION_DB_WORKERS', 4),
+    thread_name_prefix='evaluations-db',
+)
+
+
+def run_db(func, *args):
+    """Run blocking database work on the bounded executor"""
+    return sync_to_async(func, thread_sensitive=False, executor=_db_executor)(*args)
+
 
 def home_view(request):
     """Home view redirecting to Streamlit app."""
     return redirect('http://localhost:8501')
 
-def evaluation_form(request):
+def _store_submission(request):
+    """Validate the posted form and store (or spool) it; returns the session key"""
+    # Question map from the registry, validated before the write lock is taken
+    questions = question_registry.active_map()
+    submission = build_submission(request.POST, questions)
+
+    if spool_enabled():
+        # Write-behind: the drainer commits it to the database later. Creating
+        # a session would write django_session to the main database on every
+        # POST, so a browser without one just gets a fresh key for the report.
+        session_key = request.session.session_key or uuid.uuid4().hex
+        get_spool().enqueue(session_key, submission)
+        return session_key
+
+    # Session handling. This reads before it writes, so it stays outside the
+    # submission transaction: a deferred SQLite transaction that has read
+    # cannot wait for the write lock and fails with "database is locked".
+    if not request.session.session_key:
+        request.session.create()
+    session_key = request.session.session_key
+
+    # Participant, responses (bulk insert) and evaluation session
+    submission['session_key'] = session_key
+    save_submissions([submission], question_ids=questions.keys())
+    return session_key
+
+def _ingest_batch(items):
+    body, _ = cached_form_schema(_active_questions)
+    return ingest_batch(items, json.loads(body), question_registry.active_map())
+
+async def submit_batch(request):
+    """Bulk upload for kiosks that collected submissions while offline.
+
+    POST {"submissions": [{"submission_key": ..., "fields": {...}}, ...]}.
+    Every valid submission is written in one transaction; the response has a
+    created, duplicate, rejected, busy or conflict result per submission, so
+    a kiosk can retry the whole batch safely.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        items = json.loads(request.body).get('submissions')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(items, list):
+        return JsonResponse({'error': 'Expected a list of submissions'}, status=400)
+    limit = getattr(settings, 'EVALUATION_BULK_MAX_SUBMISSIONS', 5000)
+    if len(items) > limit:
+        return JsonResponse({'error': f'At most {limit} submissions per request'}, status=413)
+
+    results = await run_db(_ingest_batch, items)
+    counts = {status: sum(result['status'] == status for result in results)
+              for status in ('created', 'duplicate', 'rejected', 'busy', 'conflict')}
+    return JsonResponse({**counts, 'results': results})
+
+def _active_questions():
+    return question_registry.active()
+
+def _form_context():
+    _, schema_hash = cached_form_schema(_active_questions)
+    return {
+        'questions': _active_questions(),
+        'schema_hash': schema_hash,
+        'gender_choices': Participant.GENDER_CHOICES,
+        'ethnicity_choices': Participant.ETHNICITY_CHOICES,
+        'age_choices': Participant.AGE_RANGES,
+        'accessibility_needs_choices': Participant.ACCESSIBILITY_NEEDS,
+        'referral_choices': Participant.REFERRAL_SOURCE_CHOICES
+    }
+
+def _form_page(request):
+    """Serve the cached form, or a 304 if the kiosk already has this version"""
+    version = question_set_version()
+    token = get_token(request)
+    etag = form_etag(version, request.META.get('CSRF_COOKIE'))
+    last_modified = version / 1000
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        html = cached_form_html(version, _form_context)
+        response = HttpResponse(html.replace(CSRF_PLACEHOLDER, token))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Kiosks may keep the page but must revalidate it on every load
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+async def evaluation_form(request):
     if request.method == 'POST':
         try:
-            with transaction.atomic():
-                # Session handling
-                if not request.session.session_key:
-                    request.session.create()
-                
-                session_key = request.session.session_key
-                
-                # Create participant
-                participant = Participant.objects.create(
-                    session_key=session_key,
-                    gender=request.POST.get('gender', 'NS'),
-                    ethnicity=request.POST.get('ethnicity', 'NS'),
-                    country=request.POST.get('country', 'England'),
-                    postcode=request.POST.get('postcode', ''),
-                    age=request.POST.get('age','12-17'),
-                    accessibility_needs=request.POST.get('accessibility_needs', 'No accessibility needs'),
-                    referral_source=request.POST.get('referral_source', '') 
-                )
-                
-                # Process responses
-                for key, value in request.POST.items():
-                    if key.startswith('q_'):
-                        question_id = key.split('_')[1]
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            Response.objects.create(
-                                participant=participant,
-                                question=question,
-                                answer=json.dumps(value)
-                            )
-                        except Question.DoesNotExist:
-                            continue
-                
-                # Create evaluation session
-                EvaluationSession.objects.update_or_create(
-                    participant=participant,
-                    defaults={'completed': True, 'completed_at': timezone.now()}
-                )
-                
-                return redirect(f'http://localhost:8501/?session_key={session_key}')
+            session_key = await run_db(_store_submission, request)
+            return redirect(f'http://localhost:8501/?session_key={session_key}')
         
         except Exception as e:
             return HttpResponse(f"Error processing form: {str(e)}", status=500)
     
     # GET request handling
     #questions = Question.objects.filter(is_active=True).order_by('section_order')
-    return render(request, 'evaluations/form.html', {
-        'questions': Question.objects.filter(is_active=True).order_by('section'),  # Changed section_order → section
-        'gender_choices': Participant.GENDER_CHOICES,
-        'ethnicity_choices': Participant.ETHNICITY_CHOICES,
-        'age_choices': Participant.AGE_RANGES,
-        'accessibility_needs_choices': Participant.ACCESSIBILITY_NEEDS,
-        'referral_choices': Participant.REFERRAL_SOURCE_CHOICES
-    })
+    return await run_db(_form_page, request)
+
+async def form_schema(request, schema_hash):
+    """Validation schema for the form; the hash in the URL makes it immutable"""
+    body, current_hash = await run_db(cached_form_schema, _active_questions)
+    if schema_hash != current_hash:
+        return redirect('form_schema', schema_hash=current_hash)
+    response = HttpResponse(body, content_type='application/json')
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
+
+async def _schema():
+    body, _ = await run_db(cached_form_schema, _active_questions)
+    return json.loads(body)
 
 # Add AJAX validation endpoint
-@csrf_exempt
-def validate_field(request):
+async def validate_field(request):
     if request.method == 'POST':
         field_name = request.POST.get('field')
         value = request.POST.get('value')
         
-        if field_name == 'age':
-            # Validate age range selection
-            valid_ranges = [choice[0] for choice in Participant.AGE_RANGES]
-            if value not in valid_ranges:
-                return JsonResponse({
-                    'valid': False,
-                    'error': 'Please select a valid age range'
-                })
+        errors = validate_fields(await _schema(), {field_name: value})
+        if errors:
+            return JsonResponse({
+                'valid': False,
+                'error': errors[field_name]
+            })
         return JsonResponse({'valid': True})
+    return JsonResponse({'valid': False, 'error': 'POST required'}, status=405)
+
+async def validate_page(request):
+    """Validate a whole page of fields in one request.
+
+    Accepts a JSON body of {"fields": {name: value}}, or ordinary form data.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'valid': False, 'error': 'POST required'}, status=405)
+    if request.content_type == 'application/json':
+        try:
+            values = json.loads(request.body).get('fields', {})
+        except (ValueError, AttributeError):
+            return JsonResponse({'valid': False, 'error': 'Invalid JSON'}, status=400)
+    else:
+        values = {key: request.POST.getlist(key) for key in request.POST}
+        values = {key: value[0] if len(value) == 1 else value for key, value in values.items()}
+
+    errors = validate_fields(await _schema(), values)
+    return JsonResponse({'valid': not errors, 'errors': errors})
+
+# csrf_exempt() can only wrap sync views before Django 5.0
+validate_field.csrf_exempt = True
+validate_page.csrf_exempt = True
+submit_batch.csrf_exempt = True
 
-def download_pdf(request, session_key):
+def _build_pdf(session_key):
+    # A kiosk browser keeps its session, so report on its latest submission
+    participant = Participant.objects.filter(session_key=session_key).order_by('-id').first()
+    if participant is None:
+        raise Participant.DoesNotExist
+    responses = Response.objects.filter(participant=participant).values_list('question_id', 'answer')
+    return generate_pdf([
+        {'question_text': question_registry.by_id(question_id).text, 'answer_value': answer}
+        for question_id, answer in responses
+    ])
+
+async def download_pdf(request, session_key):
     try:
-        participant = Participant.objects.get(session_key=session_key)
-        responses = Response.objects.filter(participant=participant).select_related('question').values(
-            'question__text', 
-            'answer'
-        )
-        
-        pdf_buffer = generate_pdf(list(responses))
+        pdf_buffer = await run_db(_build_pdf, session_key)
         response = HttpResponse(pdf_buffer, content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="evaluation_{session_key}.pdf"'
         return response
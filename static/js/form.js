@@ -23,41 +23,143 @@ document.addEventListener('DOMContentLoaded', function() {
         submitBtn.style.display = currentPage === formPages.length - 1 ? 'block' : 'none';
     }
 
-    // Validate current page
+    // Validation schema built from the model choices and question options.
+    // Its URL carries a content hash, so the browser caches it for good and
+    // pages are checked locally instead of one AJAX call per field.
+    const form = document.getElementById('evalForm');
+    let schema = null;
+    fetch(form.dataset.schemaUrl)
+        .then(response => response.ok ? response.json() : null)
+        .then(data => { schema = data; })
+        .catch(() => { schema = null; });
+
+    // Named fields on a page as {name: value}, checkbox groups as arrays
+    function pageValues(pageEl) {
+        const values = {};
+        pageEl.querySelectorAll('input, select, textarea').forEach(input => {
+            if (!input.name) return;
+            if (input.type === 'checkbox') {
+                values[input.name] = values[input.name] || [];
+                if (input.checked) values[input.name].push(input.value);
+            } else if (input.type === 'radio') {
+                if (!(input.name in values)) values[input.name] = '';
+                if (input.checked) values[input.name] = input.value;
+            } else {
+                values[input.name] = input.value;
+            }
+        });
+        return values;
+    }
+
+    // Same rules as evaluations/utils/form_schema.py
+    function fieldError(field, value) {
+        const values = Array.isArray(value) ? value : [value];
+        if (values.every(v => v === '' || v === null)) {
+            return field.required && field.type !== 'text' ? `Please select a ${field.label}` : null;
+        }
+        const last = values[values.length - 1];
+        if (field.type === 'choice' || field.type === 'multi') {
+            if (field.type === 'choice' && values.length > 1) return `Please select only one ${field.label}`;
+            if (values.some(v => !field.choices.includes(v))) return `Please select a valid ${field.label}`;
+        } else if (field.type === 'rating') {
+            const rating = Number(last);
+            if (Number.isNaN(rating)) return 'Please select a rating';
+            if (rating < field.min || rating > field.max) return `Ratings run from ${field.min} to ${field.max}`;
+        } else if (field.type === 'text' && field.max_length && String(last).length > field.max_length) {
+            return `Please keep the ${field.label} to ${field.max_length} characters`;
+        }
+        return null;
+    }
+
+    function localErrors(values) {
+        const errors = {};
+        Object.entries(values).forEach(([name, value]) => {
+            const field = schema.fields[name];
+            const error = field && fieldError(field, value);
+            if (error) errors[name] = error;
+        });
+        return errors;
+    }
+
+    // Whole page in one request, for when the schema could not be loaded
+    function remoteErrors(values) {
+        return fetch(form.dataset.validateUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({fields: values})
+        })
+            .then(response => response.json())
+            .then(result => result.errors || {})
+            // Never hold a kiosk on a page because the event Wi-Fi dropped
+            .catch(() => ({}));
+    }
+
+    function showErrors(pageEl, errors) {
+        let isValid = true;
+        Object.entries(errors).forEach(([name, message]) => {
+            const input = pageEl.querySelector(`[name="${name}"]`);
+            if (!input) return;
+            input.setCustomValidity(message);
+            input.reportValidity();
+            isValid = false;
+        });
+        return isValid;
+    }
+
+    // An edit clears the message, or native validation would keep blocking
+    // submit; the error is set on the first input of a checkbox/radio group
+    function clearErrors(event) {
+        const name = event.target.name;
+        if (!name) return;
+        form.querySelectorAll(`[name="${name}"]`).forEach(input => input.setCustomValidity(''));
+    }
+    form.addEventListener('input', clearErrors);
+    form.addEventListener('change', clearErrors);
+
+    // Validate current page; resolves to true when it can be left
     function validatePage() {
         const currentPageEl = formPages[currentPage];
         const inputs = currentPageEl.querySelectorAll('input, select, textarea');
         let isValid = true;
 
+        inputs.forEach(input => input.setCustomValidity(''));
         inputs.forEach(input => {
             if (!input.checkValidity()) {
                 input.reportValidity();
                 isValid = false;
             }
         });
+        if (!isValid) return Promise.resolve(false);
 
-        // Special validation for age
-        const ageInput = currentPageEl.querySelector('[name="age"]');
-        if (ageInput && (ageInput.value < 18 || ageInput.value > 100)) {
-            ageInput.setCustomValidity('Must be 18-100');
-            ageInput.reportValidity();
-            isValid = false;
-        }
-
-        return isValid;
+        const values = pageValues(currentPageEl);
+        const errors = schema ? Promise.resolve(localErrors(values)) : remoteErrors(values);
+        return errors.then(pageErrors => showErrors(currentPageEl, pageErrors));
     }
 
     // Navigation handlers
     nextBtn.addEventListener('click', () => {
-        if (validatePage()) {
-            if (currentPage < formPages.length - 1) {
+        validatePage().then(isValid => {
+            if (isValid && currentPage < formPages.length - 1) {
                 formPages[currentPage].style.display = 'none';
                 currentPage++;
                 formPages[currentPage].style.display = 'block';
                 updateButtonStates();
                 updateProgress();
             }
-        }
+        });
+    });
+
+    // Check the last page before the form goes to the server
+    let submitting = false;
+    form.addEventListener('submit', event => {
+        if (submitting) return;
+        event.preventDefault();
+        validatePage().then(isValid => {
+            if (isValid) {
+                submitting = true;
+                form.submit();
+            }
+        });
     });
 
     prevBtn.addEventListener('click', () => {